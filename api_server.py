@@ -0,0 +1,294 @@
+import os
+import json
+import asyncio
+import secrets
+import logging
+import threading
+import functools
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+import numpy as np
+from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from pydantic import BaseModel
+from rag_pipeline import RAGPipeline
+from metrics import get_metrics, SIZE_BUCKETS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRequest(BaseModel):
+    question: str
+    top_k: int = Config.SIMILARITY_TOP_K
+    partitions: Optional[List[str]] = None  # sites to search; all when omitted
+
+
+class IngestRequest(BaseModel):
+    directory: Optional[str] = None
+    force: bool = False
+    workers: Optional[int] = None
+    reindex: bool = False  # rebuild everything into a new collection and swap it in; queries keep using the old one
+
+
+class QueryEmbeddingBatcher:
+    """Collects concurrent query embeddings into a single encode call.
+
+    Requests arriving within window_ms of each other (up to max_batch_size)
+    are embedded together, which costs little more than embedding one.
+    """
+
+    def __init__(self, vector_db, max_batch_size: int = None, window_ms: float = None):
+        self.vector_db = vector_db
+        self.max_batch_size = max_batch_size or Config.API_EMBED_BATCH_SIZE
+        self.window = (window_ms if window_ms is not None else Config.API_EMBED_BATCH_WINDOW_MS) / 1000.0
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def embed(self, query: str) -> Optional[np.ndarray]:
+        """Embed one query, batched with any others in flight (None in lexical search mode)"""
+        if Config.SEARCH_MODE == "lexical":
+            return None  # BM25 only: no embedding is needed
+        key = " ".join(query.split())
+        cached = self.vector_db.query_embedding_cache.get(key)
+        if cached is not None:
+            return cached
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = list(dict.fromkeys(key for key, _ in batch))
+            start = loop.time()
+            try:
+                embeddings = await loop.run_in_executor(
+                    None, functools.partial(self.vector_db.generate_embeddings, texts, use_cache=False)
+                )
+            except Exception as e:
+                logger.error(f"Query embedding batch failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            metrics = get_metrics()
+            metrics.observe("api_embed_batch_seconds", loop.time() - start)
+            metrics.observe("api_embed_batch_size", len(texts), buckets=SIZE_BUCKETS)
+            by_text = dict(zip(texts, embeddings))
+            for key, future in batch:
+                self.vector_db.query_embedding_cache.put(key, by_text[key])
+                if not future.done():
+                    future.set_result(by_text[key])
+            logger.debug(f"Embedded {len(texts)} queries in one batch")
+
+
+class ServerState:
+    """The warm pipeline and request bookkeeping shared by all endpoints"""
+
+    def __init__(self):
+        self.rag: Optional[RAGPipeline] = None
+        self.batcher: Optional[QueryEmbeddingBatcher] = None
+        self.pending = 0
+        self.ingest_lock = threading.Lock()
+        self.ingest_status: Dict = {"running": False, "success": None, "report": {}}
+
+    def check_capacity(self):
+        """Reject with 503 when the server is saturated"""
+        if self.pending >= Config.API_MAX_PENDING_REQUESTS:
+            raise HTTPException(status_code=503, detail="Server busy, please retry")
+
+    def acquire_slot(self):
+        """Reserve a query slot or reject with 503 when the server is saturated"""
+        self.check_capacity()
+        self.pending += 1
+
+    def release_slot(self):
+        self.pending -= 1
+
+
+state = ServerState()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model and vector DB once for the life of the server
+    state.rag = await run_in_threadpool(RAGPipeline)
+    await run_in_threadpool(state.rag.vector_db.warm_up)
+    if state.rag.reranker is not None:
+        await run_in_threadpool(state.rag.reranker.warm_up)
+    state.batcher = QueryEmbeddingBatcher(state.rag.vector_db)
+    state.batcher.start()
+    logger.info(f"API server ready on {Config.API_HOST}:{Config.API_PORT}")
+    yield
+    await state.batcher.stop()
+
+
+app = FastAPI(title="SitePulseX RAG API", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=Config.CORS_ORIGINS,
+    allow_methods=["*"],
+    allow_headers=["*"]
+)
+
+
+def require_api_key(x_api_key: Optional[str] = Header(default=None)):
+    """Reject requests without the configured X-API-Key when API_KEY_ENABLED"""
+    if not Config.API_KEY_ENABLED:
+        return
+    if not Config.API_KEY:
+        raise HTTPException(status_code=503, detail="API key authentication is enabled but no key is configured")
+    if not x_api_key or not secrets.compare_digest(x_api_key, Config.API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid or missing API key")
+
+
+def _allowed_ingest_directory(directory: Optional[str]) -> bool:
+    """Whether a directory lies inside KNOWLEDGE_BASE_DIR or one of INGEST_ALLOWED_DIRS.
+
+    An ingest only removes chunks of files under its own directory, and files
+    of an allowed root get ids and a partition named after it, so a root
+    named like a top-level knowledge base directory is refused: their chunk
+    ids would collide.
+    """
+    if directory is None:
+        return True  # the knowledge base itself
+    path = os.path.realpath(directory)
+    roots = [Config.KNOWLEDGE_BASE_DIR] + [
+        root for root in Config.INGEST_ALLOWED_DIRS
+        if not os.path.exists(os.path.join(Config.KNOWLEDGE_BASE_DIR, os.path.basename(os.path.normpath(root))))
+    ]
+    for root in roots:
+        root = os.path.realpath(root)
+        try:
+            if os.path.commonpath([path, root]) == root:
+                return True
+        except ValueError:
+            continue  # different drives
+    return False
+
+
+def _jsonable(result: Dict) -> Dict:
+    """Convert NumPy scalars (e.g. similarities) to plain JSON numbers"""
+    return json.loads(json.dumps(result, default=float))
+
+
+@app.post("/query", dependencies=[Depends(require_api_key)])
+async def query(request: QueryRequest) -> Dict:
+    state.acquire_slot()
+    try:
+        embedding = await state.batcher.embed(request.question)
+        result = await run_in_threadpool(
+            state.rag.query, request.question, request.top_k, embedding, request.partitions
+        )
+        return _jsonable(result)
+    finally:
+        state.release_slot()
+
+
+@app.post("/query/stream", dependencies=[Depends(require_api_key)])
+async def query_stream(request: QueryRequest) -> StreamingResponse:
+    state.check_capacity()  # while a 503 can still be sent
+
+    async def events():
+        # The slot is taken and released inside the generator, so a client that
+        # disconnects before the response body starts never holds one
+        state.pending += 1
+        try:
+            embedding = await state.batcher.embed(request.question)
+            stream = state.rag.query_stream(request.question, request.top_k, embedding, request.partitions)
+            async for event in iterate_in_threadpool(stream):
+                yield json.dumps(event, default=float) + "\n"
+        finally:
+            state.release_slot()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def _run_ingest(request: IngestRequest):
+    try:
+        if request.reindex:
+            success = state.rag.reindex(request.directory, workers=request.workers)
+        else:
+            success = state.rag.ingest_documents(request.directory, force=request.force, workers=request.workers)
+        state.ingest_status.update(success=success, report=state.rag.last_ingest_report)
+    except Exception as e:
+        logger.error(f"Background ingestion failed: {e}")
+        state.ingest_status.update(success=False, error=str(e))
+    finally:
+        state.ingest_status["running"] = False
+        state.ingest_lock.release()
+
+
+@app.post("/ingest", status_code=202, dependencies=[Depends(require_api_key)])
+async def ingest(request: IngestRequest) -> Dict:
+    if not _allowed_ingest_directory(request.directory):
+        raise HTTPException(status_code=403, detail="Directory is outside the allowed ingest roots")
+    if request.reindex and request.directory is not None:
+        # A reindex replaces the whole collection, so it must see every ingest root
+        raise HTTPException(status_code=400, detail="A reindex always covers every ingest root; omit directory")
+    if not state.ingest_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Ingestion already running")
+    state.ingest_status = {"running": True, "success": None, "report": {}}
+    threading.Thread(target=_run_ingest, args=(request,), name="api-ingest", daemon=True).start()
+    return state.ingest_status
+
+
+@app.get("/ingest", dependencies=[Depends(require_api_key)])
+async def ingest_status() -> Dict:
+    return state.ingest_status
+
+
+@app.get("/stats", dependencies=[Depends(require_api_key)])
+async def stats() -> Dict:
+    result = await run_in_threadpool(state.rag.get_stats)
+    result["pending_requests"] = state.pending
+    return _jsonable(result)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(get_metrics().to_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health")
+async def health() -> Dict:
+    return await run_in_threadpool(state.rag.health_check)
+
+
+def serve(host: str = None, port: int = None):
+    """Run the API server with uvicorn"""
+    import uvicorn
+    uvicorn.run(app, host=host or Config.API_HOST, port=port or Config.API_PORT)
+
+
+if __name__ == "__main__":
+    serve()
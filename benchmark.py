@@ -0,0 +1,393 @@
+"""
+End-to-end ingest throughput and query latency benchmark.
+
+Generates a synthetic corpus (text, DOCX, CSV and scanned-page PNG images),
+ingests it with RAGPipeline.ingest_documents and then answers batches of
+RAGPipeline.query against a local fake Ollama server with configurable
+latency, so results are reproducible without a GPU or a real model.
+Everything (knowledge base, vector DB, caches, logs) lives in a temporary
+directory; the real install is not touched.
+
+    python benchmark.py --docs 200 --queries 100 --concurrency 4 --output bench.json
+
+Reports docs/s, chunks/s, embeddings/s, p50/p95/p99 query latency and peak
+RSS as JSON, tagged with the git commit, for comparison between commits.
+
+Ingest worker processes are handed the parent's Config when they start, so
+they use the temporary directories too, also where workers are started with
+spawn (Windows, macOS).
+"""
+import os
+import sys
+import json
+import time
+import random
+import itertools
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict
+import numpy as np
+from config import Config, BASE_DIR
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DOC_TYPES = ["txt", "docx", "csv", "png"]
+
+SITES = ["Pune", "Chennai", "Noida", "Leipzig", "Monterrey", "Ohio", "Gdansk", "Penang"]
+EQUIPMENT = ["boiler", "compressor", "chiller", "conveyor", "pump", "transformer", "turbine", "kiln",
+             "press", "mixer", "dryer", "furnace"]
+TOPICS = ["maintenance schedule", "safety inspection", "energy consumption", "downtime report",
+          "vibration analysis", "spare parts inventory", "shift handover", "calibration record"]
+WORDS = ("pressure temperature flow valve bearing seal motor inverter sensor alarm threshold operator "
+         "lubrication filter coolant torque load cycle audit permit lockout tagout isolation checklist "
+         "deviation root cause corrective preventive overhaul warranty supplier batch throughput yield").split()
+
+
+class FakeOllama:
+    """Minimal Ollama API (/api/tags, /api/generate) answering after a fixed delay.
+
+    Each generation waits prefill_ms, then token_ms per generated token, and
+    reports prompt_eval/eval counts and durations like the real server.
+    """
+
+    def __init__(self, prefill_ms: float, token_ms: float, tokens: int):
+        self.prefill_ms = prefill_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-ollama", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like Ollama
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": Config.OLLAMA_MODEL}]})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, 404)
+                    return
+                with fake._lock:
+                    fake.requests += 1
+                fake.generate(self, body)
+
+            def _send_json(self, payload: Dict, status: int = 200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def generate(self, handler: BaseHTTPRequestHandler, body: Dict):
+        prompt_tokens = len(body.get("prompt", "").split())
+        start = time.perf_counter()
+        time.sleep(self.prefill_ms / 1000)
+        prefill_ns = int((time.perf_counter() - start) * 1e9)
+        final = {
+            "model": body.get("model", Config.OLLAMA_MODEL),
+            "done": True,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": prefill_ns,
+            "eval_count": self.tokens
+        }
+
+        if not body.get("stream", True):
+            time.sleep(self.tokens * self.token_ms / 1000)
+            final["response"] = " ".join(["token"] * self.tokens)
+            final["eval_duration"] = int((time.perf_counter() - start) * 1e9) - prefill_ns
+            final["total_duration"] = int((time.perf_counter() - start) * 1e9)
+            handler._send_json(final)
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def write_line(payload: Dict):
+            data = (json.dumps(payload) + "\n").encode("utf-8")
+            handler.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        for _ in range(self.tokens):
+            time.sleep(self.token_ms / 1000)
+            write_line({"model": final["model"], "response": "token ", "done": False})
+        final["response"] = ""
+        final["eval_duration"] = int((time.perf_counter() - start) * 1e9) - prefill_ns
+        final["total_duration"] = int((time.perf_counter() - start) * 1e9)
+        write_line(final)
+        handler.wfile.write(b"0\r\n\r\n")
+
+
+def sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+    words.insert(rng.randint(0, len(words)), rng.choice(EQUIPMENT))
+    return f"The {rng.choice(SITES)} site " + " ".join(words) + "."
+
+
+def section(rng: random.Random, paragraphs: int) -> List[str]:
+    return [" ".join(sentence(rng) for _ in range(rng.randint(3, 7))) for _ in range(paragraphs)]
+
+
+def write_txt(path: str, rng: random.Random, paragraphs: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(max(1, paragraphs // 3)):
+            f.write(f"{rng.choice(TOPICS).title()}\n\n")
+            f.write("\n\n".join(section(rng, 3)) + "\n\n")
+
+
+def write_docx(path: str, rng: random.Random, paragraphs: int):
+    import docx
+    document = docx.Document()
+    for _ in range(max(1, paragraphs // 3)):
+        document.add_heading(rng.choice(TOPICS).title(), level=1)
+        for text in section(rng, 3):
+            document.add_paragraph(text)
+    document.save(path)
+
+
+def write_csv(path: str, rng: random.Random, rows: int):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("date,site,equipment,reading,status,notes\n")
+        for row in range(rows):
+            f.write(f"2024-{row % 12 + 1:02d}-{row % 28 + 1:02d},{rng.choice(SITES)},{rng.choice(EQUIPMENT)},"
+                    f"{rng.uniform(0, 500):.2f},{rng.choice(['ok', 'warning', 'fault'])},"
+                    f"{' '.join(rng.choice(WORDS) for _ in range(5))}\n")
+
+
+def write_scan(path: str, rng: random.Random, lines: int):
+    """Grey, slightly noisy page image with typed text, like a scanned form"""
+    from PIL import Image, ImageDraw, ImageFont
+    width, line_height = 1700, 44
+    image = Image.new("L", (width, 120 + lines * line_height), 235)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=30)
+    draw.text((80, 40), rng.choice(TOPICS).title(), fill=20, font=font)
+    for line in range(lines):
+        text = " ".join(rng.choice(WORDS + EQUIPMENT) for _ in range(9))
+        draw.text((80, 110 + line * line_height), text, fill=30, font=font)
+    noise = np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, 12, (image.height, image.width))
+    pixels = np.clip(np.asarray(image, dtype=np.float32) + noise, 0, 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path)
+
+
+def generate_corpus(directory: str, docs: int, doc_types: List[str], size: int, seed: int) -> Dict[str, int]:
+    """Write `docs` files cycling through doc_types; returns files per type"""
+    rng = random.Random(seed)
+    counts = {doc_type: 0 for doc_type in doc_types}
+    for index in range(docs):
+        doc_type = doc_types[index % len(doc_types)]
+        site_dir = os.path.join(directory, rng.choice(SITES))
+        os.makedirs(site_dir, exist_ok=True)
+        path = os.path.join(site_dir, f"{doc_type}_{index:05d}.{doc_type}")
+        if doc_type == "txt":
+            write_txt(path, rng, size)
+        elif doc_type == "docx":
+            write_docx(path, rng, size)
+        elif doc_type == "csv":
+            write_csv(path, rng, size * 20)
+        elif doc_type == "png":
+            write_scan(path, rng, size)
+        counts[doc_type] += 1
+    return counts
+
+
+def generate_questions(count: int, seed: int) -> List[str]:
+    """Distinct questions (up to ~30k), so the answer cache doesn't short-circuit generation"""
+    combos = list(itertools.product(TOPICS, EQUIPMENT, WORDS, SITES))
+    picks = random.Random(seed).sample(combos, min(count, len(combos)))
+    return [f"What does the {topic} say about the {equipment} {word} at the {site} site?"
+            for topic, equipment, word, site in picks]
+
+
+def redirect_paths(work_dir: str):
+    """Point every Config path under BASE_DIR into the benchmark's work directory"""
+    for name, value in list(vars(Config).items()):
+        if isinstance(value, str) and value.startswith(BASE_DIR):
+            setattr(Config, name, work_dir + value[len(BASE_DIR):])
+
+
+def peak_rss_mb() -> Dict:
+    """Peak resident set size of this process and of its largest child (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return {"self": None, "children": None}
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1024 ** 2, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 1024 ** 2, 1)
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentiles_ms(samples: List[float]) -> Dict:
+    if not samples:
+        return {}
+    values = np.asarray(samples) * 1000
+    return {f"p{p}": round(float(np.percentile(values, p)), 1) for p in (50, 95, 99)}
+
+
+def run(args) -> Dict:
+    work_dir = tempfile.mkdtemp(prefix="rag_bench_")
+    redirect_paths(work_dir)
+    ollama = FakeOllama(args.prefill_ms, args.token_ms, args.tokens).start()
+    Config.OLLAMA_URL = ollama.url
+    if args.backend:
+        Config.VECTOR_BACKEND = args.backend
+    if args.rerank:
+        Config.RERANK_ENABLED = True
+
+    try:
+        start = time.perf_counter()
+        corpus = generate_corpus(Config.KNOWLEDGE_BASE_DIR, args.docs, args.types, args.size, args.seed)
+        corpus_seconds = time.perf_counter() - start
+
+        # Imported after redirect_paths: rag_pipeline opens its log file at import
+        from rag_pipeline import RAGPipeline
+        rag = RAGPipeline()
+
+        start = time.perf_counter()
+        rag.vector_db.warm_up()
+        load_seconds = time.perf_counter() - start
+
+        cache_before = rag.vector_db.get_cache_stats()
+        start = time.perf_counter()
+        rag.ingest_documents(Config.KNOWLEDGE_BASE_DIR, force=True, workers=args.workers)
+        ingest_seconds = time.perf_counter() - start
+        report = rag.last_ingest_report
+        embedded = rag.vector_db.get_cache_stats().get("misses", 0) - cache_before.get("misses", 0)
+        if not cache_before:
+            embedded = report.get("chunks", 0)  # embedding cache disabled: every chunk was encoded
+        ingested = report.get("new", 0) + report.get("updated", 0) - report.get("failed", 0)
+
+        questions = generate_questions(args.queries, args.seed)
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for offset in range(0, len(questions), args.batch_size):
+                batch = questions[offset:offset + args.batch_size]
+                for result in executor.map(lambda question: timed_query(rag, question, args.top_k), batch):
+                    latencies.append(result[0])
+                    errors += bool(result[1])
+        query_seconds = time.perf_counter() - start
+        rag.vector_db.close()
+
+        return {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "settings": {
+                "docs": args.docs, "types": args.types, "size": args.size, "workers": args.workers,
+                "queries": args.queries, "concurrency": args.concurrency, "top_k": args.top_k,
+                "ollama_prefill_ms": args.prefill_ms, "ollama_token_ms": args.token_ms,
+                "ollama_tokens": args.tokens, "vector_backend": Config.VECTOR_BACKEND,
+                "chunking_strategy": Config.CHUNKING_STRATEGY, "rerank": Config.RERANK_ENABLED,
+                "seed": args.seed
+            },
+            "corpus": {"files": corpus, "seconds": round(corpus_seconds, 2)},
+            "model_load_seconds": round(load_seconds, 2),
+            "ingest": {
+                "seconds": round(ingest_seconds, 2),
+                "docs": ingested,
+                "failed": report.get("failed", 0),
+                "chunks": report.get("chunks", 0),
+                "embeddings": embedded,
+                "docs_per_second": round(ingested / ingest_seconds, 2),
+                "chunks_per_second": round(report.get("chunks", 0) / ingest_seconds, 2),
+                "embeddings_per_second": round(embedded / ingest_seconds, 2)
+            },
+            "query": {
+                "count": len(latencies),
+                "errors": errors,
+                "seconds": round(query_seconds, 2),
+                "queries_per_second": round(len(latencies) / query_seconds, 2) if query_seconds else 0.0,
+                "latency_ms": percentiles_ms(latencies),
+                "ollama_requests": ollama.requests
+            },
+            "peak_rss_mb": peak_rss_mb()
+        }
+    finally:
+        ollama.stop()
+        if args.keep:
+            print(f"Work directory kept at {work_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def timed_query(rag, question: str, top_k: int):
+    start = time.perf_counter()
+    result = rag.query(question, top_k=top_k)
+    return time.perf_counter() - start, result.get("error")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest throughput and query latency benchmark")
+    parser.add_argument("--docs", type=int, default=100, help="Synthetic documents to generate")
+    parser.add_argument("--types", type=lambda value: value.split(","), default=DOC_TYPES,
+                        help=f"Comma-separated document types (default: {','.join(DOC_TYPES)})")
+    parser.add_argument("--size", type=int, default=12, help="Paragraphs (lines for images) per document")
+    parser.add_argument("--workers", type=int, default=Config.INGEST_WORKERS, help="Ingest extraction processes")
+    parser.add_argument("--queries", type=int, default=100, help="Number of queries")
+    parser.add_argument("--concurrency", type=int, default=Config.OLLAMA_MAX_CONCURRENT_REQUESTS,
+                        help="Queries in flight")
+    parser.add_argument("--batch-size", type=int, default=50, help="Queries submitted per batch")
+    parser.add_argument("--top-k", type=int, default=5, help="Chunks retrieved per query")
+    parser.add_argument("--prefill-ms", type=float, default=200, help="Fake Ollama prompt evaluation time")
+    parser.add_argument("--token-ms", type=float, default=20, help="Fake Ollama time per generated token")
+    parser.add_argument("--tokens", type=int, default=40, help="Tokens per fake Ollama answer")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], help="Vector backend (default: Config)")
+    parser.add_argument("--rerank", action="store_true", help="Enable the cross-encoder reranker")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary work directory")
+    args = parser.parse_args()
+
+    unknown = set(args.types) - set(DOC_TYPES)
+    if unknown:
+        parser.error(f"unknown document types: {', '.join(sorted(unknown))}")
+
+    result = run(args)
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
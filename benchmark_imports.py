@@ -0,0 +1,90 @@
+"""
+Startup-time benchmark for the CLI and core modules.
+
+Each measurement runs in a fresh interpreter so nothing is already imported.
+Reports the median import time per module, the wall time of `main.py --stats`,
+and which heavy libraries each import pulled in (there should be none).
+
+    python benchmark_imports.py --runs 5 --max-seconds 1.0
+
+Exits with status 1 if `main.py --stats` is slower than --max-seconds or a
+module import loads a heavy library, so it can guard against regressions.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+MODULES = ["config", "document_processor", "vector_db", "rag_pipeline", "main"]
+
+# Libraries that take seconds to import and must only load when actually used
+HEAVY_MODULES = ["sentence_transformers", "torch", "chromadb", "unstructured", "pdf2image",
+                 "pytesseract", "PIL", "pandas", "openpyxl"]
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def time_import(module: str, runs: int) -> dict:
+    samples = []
+    heavy = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["seconds"])
+        heavy = result["heavy"]
+    return {"median_seconds": round(statistics.median(samples), 4), "heavy_modules_loaded": heavy}
+
+
+def time_command(args: list, runs: int) -> dict:
+    samples = []
+    returncode = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        returncode = subprocess.run(
+            [sys.executable, "main.py"] + args, cwd=REPO_DIR, capture_output=True
+        ).returncode
+        samples.append(time.perf_counter() - start)
+    return {"median_seconds": round(statistics.median(samples), 4), "returncode": returncode}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup and import-time benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--max-seconds", type=float, default=1.0, help="Budget for `main.py --stats`")
+    args = parser.parse_args()
+
+    report = {
+        "imports": {module: time_import(module, args.runs) for module in MODULES},
+        "main_stats": time_command(["--stats"], args.runs)
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    failures = [
+        f"import {module} loaded {', '.join(result['heavy_modules_loaded'])}"
+        for module, result in report["imports"].items() if result["heavy_modules_loaded"]
+    ]
+    if report["main_stats"]["median_seconds"] > args.max_seconds:
+        failures.append(f"main.py --stats took {report['main_stats']['median_seconds']}s (budget {args.max_seconds}s)")
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
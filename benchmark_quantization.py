@@ -0,0 +1,114 @@
+"""
+Recall and memory benchmark for the compact quantized vector store.
+
+Builds float16 and int8 CompactVectorStores over the same synthetic
+embeddings, runs the same queries against each and compares their top-k
+against exact float32 cosine search.
+
+    python benchmark_quantization.py --rows 200000 --dim 384 --queries 200
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from compact_store import CompactVectorStore, QUANTIZATIONS
+
+
+def synthetic_embeddings(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors, closer to real sentence embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, rows)
+    vectors = centers[assignment] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, top_k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    return np.argsort(-scores, axis=1)[:, :top_k]
+
+
+def run(args) -> dict:
+    vectors = synthetic_embeddings(args.rows, args.dim, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, args.rows, args.queries)
+    queries = vectors[picks] + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact_top_k(vectors, queries, args.top_k)
+
+    ids = [f"doc_{i}" for i in range(args.rows)]
+    report = {
+        "rows": args.rows,
+        "dim": args.dim,
+        "queries": args.queries,
+        "top_k": args.top_k,
+        "rerank_factor": args.rerank_factor,
+        "float32_bytes": args.rows * args.dim * 4,
+        "stores": {}
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="quant_bench_")
+    try:
+        for quantization in QUANTIZATIONS:
+            store = CompactVectorStore(
+                os.path.join(work_dir, quantization), args.dim, quantization, args.rerank_factor
+            )
+            start = time.perf_counter()
+            for offset in range(0, args.rows, args.batch_size):
+                end = min(offset + args.batch_size, args.rows)
+                store.upsert(
+                    embeddings=vectors[offset:end],
+                    documents=[""] * (end - offset),
+                    metadatas=[{}] * (end - offset),
+                    ids=ids[offset:end]
+                )
+            build_seconds = time.perf_counter() - start
+
+            latencies = []
+            recalls = []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                found = [doc["id"] for doc in store.search(query[None, :], args.top_k)[0]]
+                latencies.append(time.perf_counter() - start)
+                expected_ids = {ids[row] for row in expected}
+                recalls.append(len(expected_ids.intersection(found)) / args.top_k)
+
+            footprint = store.memory_footprint()
+            report["stores"][quantization] = {
+                "recall_at_k": round(float(np.mean(recalls)), 4),
+                "recall_loss": round(1.0 - float(np.mean(recalls)), 4),
+                "scanned_bytes": footprint["scanned_bytes"],
+                "memory_reduction": round(footprint["float32_bytes"] / footprint["scanned_bytes"], 2),
+                "build_seconds": round(build_seconds, 2),
+                "query_ms_p50": round(float(np.percentile(latencies, 50)) * 1000, 2),
+                "query_ms_p95": round(float(np.percentile(latencies, 95)) * 1000, 2)
+            }
+            store.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact vector store recall/memory benchmark")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of stored vectors")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--top-k", type=int, default=5, help="Results per query")
+    parser.add_argument("--rerank-factor", type=int, default=4, help="Candidates re-scored per result")
+    parser.add_argument("--clusters", type=int, default=200, help="Synthetic topic clusters")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per upsert")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    json.dump(run(args), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
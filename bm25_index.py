@@ -0,0 +1,139 @@
+import os
+import re
+import math
+import sqlite3
+import logging
+import threading
+from collections import Counter
+from typing import List, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SQLITE_MAX_PARAMS = 500  # keep IN (...) lists under SQLite's variable limit
+
+# Keeps identifiers like "PLC-101", "0x80070005", "KB4012212" and "srv01.plant.local" whole
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._:/\-][a-z0-9]+)*")
+TOKEN_SPLIT_RE = re.compile(r"[._:/\-]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its of on or so "
+    "that the their then there these this to was were what when where which who why will with "
+    "you your do does can".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms; compound identifiers are indexed whole and by their parts"""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = TOKEN_SPLIT_RE.split(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part and part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Persistent BM25 inverted index stored in SQLite"""
+
+    def __init__(self, index_path: str = None, k1: float = 1.5, b: float = 0.75):
+        self.index_path = index_path or Config.LEXICAL_INDEX_PATH
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.index_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, length INTEGER NOT NULL)")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (doc_id)")
+        self.conn.commit()
+
+    def add(self, ids: List[str], texts: List[str]):
+        """Index documents, replacing any existing entries with the same ids"""
+        with self._lock:
+            self._delete(ids)
+            doc_rows = []
+            posting_rows = []
+            for doc_id, text in zip(ids, texts):
+                terms = Counter(tokenize(text))
+                doc_rows.append((doc_id, sum(terms.values())))
+                posting_rows.extend((term, doc_id, tf) for term, tf in terms.items())
+            self.conn.executemany("INSERT INTO docs (id, length) VALUES (?, ?)", doc_rows)
+            self.conn.executemany("INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)", posting_rows)
+            self.conn.commit()
+
+    def delete(self, ids: List[str]):
+        """Remove documents from the index"""
+        with self._lock:
+            self._delete(ids)
+            self.conn.commit()
+
+    def _delete(self, ids: List[str]):
+        for start in range(0, len(ids), SQLITE_MAX_PARAMS):
+            batch = ids[start:start + SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            self.conn.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", batch)
+            self.conn.execute(f"DELETE FROM docs WHERE id IN ({placeholders})", batch)
+
+    def clear(self):
+        """Remove every document"""
+        with self._lock:
+            self.conn.execute("DELETE FROM postings")
+            self.conn.execute("DELETE FROM docs")
+            self.conn.commit()
+
+    def count(self) -> int:
+        """Number of indexed documents"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Return (doc id, BM25 score) pairs for the best matching documents"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            total_docs, avg_length = self.conn.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+            if not total_docs:
+                return []
+            avg_length = avg_length or 1.0
+
+            scores = Counter()
+            for term in terms:
+                rows = self.conn.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id "
+                    "WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (total_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                for doc_id, tf, length in rows:
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return scores.most_common(top_k)
+
+    def close(self):
+        self.conn.close()
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists; ids ranked high in any list come first"""
+    scores = Counter()
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return scores.most_common()
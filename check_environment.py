@@ -1,7 +1,7 @@
 import os
-import requests
 import subprocess
 from config import Config
+from ollama_client import get_ollama_client, OllamaUnavailableError
 
 def check_environment():
     print("🔍 Checking your local environment setup...")
@@ -25,16 +25,14 @@ def check_environment():
     # Check Ollama service
     print("4. Checking Ollama service...")
     try:
-        response = requests.get(f"{Config.OLLAMA_URL}/api/tags", timeout=10)
-        if response.status_code == 200:
-            models = response.json().get('models', [])
-            print(f"   ✓ Ollama service running with {len(models)} models")
-            for model in models:
-                print(f"     - {model['name']}")
-        else:
-            print("   ✗ Ollama service not responding properly")
-    except:
+        models = get_ollama_client().list_models()
+        print(f"   ✓ Ollama service running with {len(models)} models")
+        for model in models:
+            print(f"     - {model}")
+    except OllamaUnavailableError:
         print("   ✗ Ollama service not running")
+    except Exception:
+        print("   ✗ Ollama service not responding properly")
     
     # Check directories
     print("5. Checking project directories...")
@@ -0,0 +1,184 @@
+import re
+import logging
+from typing import List, Dict, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+WORDS_PER_TOKEN = 0.75  # fallback estimate when the tokenizer can't be loaded
+MAX_HEADING_CHARS = 200
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+# unstructured element categories that start a new section
+HEADING_CATEGORIES = {"Title", "Header"}
+# Categories kept in chunks of their own rather than merged with surrounding text
+STANDALONE_CATEGORIES = {"Table"}
+
+
+def element_blocks(elements, page: int = None) -> List[Dict]:
+    """Convert unstructured elements to {"text", "category", "page"} blocks"""
+    blocks = []
+    for element in elements:
+        text = str(element).strip()
+        if not text:
+            continue
+        metadata = getattr(element, "metadata", None)
+        blocks.append({
+            "text": text,
+            "category": getattr(element, "category", None) or "NarrativeText",
+            "page": page or getattr(metadata, "page_number", None) or 0
+        })
+    return blocks
+
+
+class TokenCounter:
+    """Token counts and token-bounded splits using the embedding model's tokenizer.
+
+    Only the tokenizer is loaded (not the model), so this is cheap enough
+    for every ingest worker. Without it, counts are estimated from words.
+    """
+
+    def __init__(self, tokenizer_name: str = None):
+        self.tokenizer_name = tokenizer_name or Config.EMBEDDING_TOKENIZER
+        self._tokenizer = None
+        self._loaded = False
+
+    @property
+    def tokenizer(self):
+        if not self._loaded:
+            self._loaded = True
+            try:
+                from transformers import AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+            except Exception as e:
+                logger.warning(f"Tokenizer {self.tokenizer_name} unavailable, estimating tokens from words: {e}")
+        return self._tokenizer
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is None:
+            return int(len(text.split()) / WORDS_PER_TOKEN) + 1
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def split(self, text: str, max_tokens: int, overlap: int) -> List[str]:
+        """Cut text into windows of at most max_tokens, overlapping by `overlap` tokens"""
+        step = max(1, max_tokens - overlap)
+
+        if self.tokenizer is None:
+            words = text.split()
+            max_words = max(1, int(max_tokens * WORDS_PER_TOKEN))
+            word_step = max(1, int(step * WORDS_PER_TOKEN))
+            pieces = []
+            for start in range(0, len(words), word_step):
+                pieces.append(" ".join(words[start:start + max_words]))
+                if start + max_words >= len(words):
+                    break
+            return pieces
+
+        offsets = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        pieces = []
+        for start in range(0, len(offsets), step):
+            end = min(start + max_tokens, len(offsets))
+            pieces.append(text[offsets[start][0]:offsets[end - 1][1]].strip())
+            if end == len(offsets):
+                break
+        return [piece for piece in pieces if piece]
+
+
+class StructuredChunker:
+    """Packs document elements into chunks that fit the embedding model.
+
+    Consecutive elements of the same section are merged until the next one
+    would exceed max_tokens (measured with the embedding tokenizer); a
+    heading always starts a new chunk and is recorded as the "heading" of
+    the chunks that follow it. Tables are kept in chunks of their own, and
+    elements longer than max_tokens are split by sentence, then by token
+    window.
+    """
+
+    def __init__(self, max_tokens: int = None, overlap_tokens: int = None, counter: TokenCounter = None):
+        self.max_tokens = max_tokens or Config.CHUNK_MAX_TOKENS
+        self.overlap_tokens = overlap_tokens if overlap_tokens is not None else Config.CHUNK_OVERLAP_TOKENS
+        self.counter = counter or TokenCounter()
+
+    def chunk(self, blocks: List[Dict], source: str, file_path: str = None) -> List[Dict]:
+        """Chunks with source, file_path, chunk_id, heading, page range and token count metadata"""
+        chunks = []
+        heading = ""
+        pending: List[Dict] = []
+        pending_tokens = 0
+
+        def flush():
+            nonlocal pending, pending_tokens
+            if pending:
+                chunks.append(self._make_chunk(pending, pending_tokens, heading, source, file_path, len(chunks)))
+            pending, pending_tokens = [], 0
+
+        for block in blocks:
+            category = block.get("category") or "NarrativeText"
+            if category in HEADING_CATEGORIES:
+                flush()
+                heading = " ".join(block["text"].split())[:MAX_HEADING_CHARS]
+
+            tokens = self.counter.count(block["text"])
+            if category in STANDALONE_CATEGORIES or tokens > self.max_tokens:
+                if all(pending_block.get("category") in HEADING_CATEGORIES for pending_block in pending):
+                    # A bare heading is not worth a chunk; it is kept as the "heading" metadata
+                    pending, pending_tokens = [], 0
+                flush()
+                chunk_category = "table" if category in STANDALONE_CATEGORIES else "text"
+                for piece in self._split(block["text"], tokens):
+                    pieces = [{**block, "text": piece}]
+                    chunks.append(self._make_chunk(
+                        pieces, self.counter.count(piece), heading, source, file_path, len(chunks), chunk_category
+                    ))
+                continue
+
+            if pending and pending_tokens + tokens > self.max_tokens:
+                flush()
+            pending.append(block)
+            pending_tokens += tokens
+
+        flush()
+        return chunks
+
+    def _split(self, text: str, tokens: int) -> List[str]:
+        """Split an oversized element at sentence boundaries where possible"""
+        if tokens <= self.max_tokens:
+            return [text]
+
+        pieces, current, current_tokens = [], [], 0
+        for sentence in SENTENCE_END_RE.split(text):
+            sentence_tokens = self.counter.count(sentence)
+            if sentence_tokens > self.max_tokens:
+                if current:
+                    pieces.append(" ".join(current))
+                    current, current_tokens = [], 0
+                pieces.extend(self.counter.split(sentence, self.max_tokens, self.overlap_tokens))
+                continue
+            if current and current_tokens + sentence_tokens > self.max_tokens:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += sentence_tokens
+        if current:
+            pieces.append(" ".join(current))
+        return pieces
+
+    @staticmethod
+    def _make_chunk(blocks: List[Dict], tokens: int, heading: str, source: str, file_path: Optional[str],
+                    chunk_id: int, category: str = "text") -> Dict:
+        pages = [block["page"] for block in blocks if block.get("page")]
+        # Vector store metadata values must be str/int/float/bool, never None
+        return {
+            "text": "\n".join(block["text"] for block in blocks),
+            "metadata": {
+                "source": source,
+                "file_path": file_path or source,
+                "chunk_id": chunk_id,
+                "heading": heading,
+                "category": category,
+                "page_start": min(pages) if pages else 0,
+                "page_end": max(pages) if pages else 0,
+                "token_count": tokens
+            }
+        }
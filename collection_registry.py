@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import shutil
+import logging
+from contextlib import contextmanager
+from typing import List, Dict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionLockedError(RuntimeError):
+    """Another process holds collection_lock"""
+
+
+def active_collection() -> str:
+    """Name of the collection being served (Config.COLLECTION_NAME until the first reindex)"""
+    return active_collection_info().get("collection", Config.COLLECTION_NAME)
+
+
+def active_collection_info() -> Dict:
+    """The collection pointer: collection, activated_at, previous, ... ({} until the first reindex)"""
+    try:
+        with open(Config.ACTIVE_COLLECTION_FILE, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if "collection" not in info:
+            raise KeyError("collection")
+        return info
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        # Falling back to the original collection could serve (and drop) the wrong data
+        raise ValueError(
+            f"Unreadable collection pointer {Config.ACTIVE_COLLECTION_FILE}: {e}; restore it, "
+            f"or delete it to serve {Config.COLLECTION_NAME}"
+        )
+
+
+@contextmanager
+def collection_lock():
+    """Cross-process lock held while collections are built, swapped or dropped as stale.
+
+    Raises CollectionLockedError at once if another process holds it. The lock is on
+    an open file, so the OS releases it if the holder dies.
+    """
+    lock_path = f"{Config.ACTIVE_COLLECTION_FILE}.lock"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    f = open(lock_path, "a+")
+    try:
+        try:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise CollectionLockedError("another process is reindexing or clearing the collection")
+        yield
+    finally:
+        f.close()  # closing the file releases the lock
+
+
+def set_active_collection(name: str, **info):
+    """Point every reader at another collection; the pointer file is replaced atomically"""
+    os.makedirs(os.path.dirname(Config.ACTIVE_COLLECTION_FILE), exist_ok=True)
+    tmp_path = f"{Config.ACTIVE_COLLECTION_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"collection": name, "activated_at": time.time(), **info}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, Config.ACTIVE_COLLECTION_FILE)
+
+
+def new_collection_name() -> str:
+    """Unused versioned name for a collection about to be built, e.g. knowledge_docs_20240501_093000"""
+    base = f"{Config.COLLECTION_NAME}_{time.strftime('%Y%m%d_%H%M%S')}"
+    name, suffix = base, 1
+    while name in list_collections() or name == active_collection():
+        suffix += 1
+        name = f"{base}_{suffix}"
+    return name
+
+
+def collection_paths(name: str) -> Dict[str, str]:
+    """Where a collection keeps its NumPy vectors, lexical index and ingest manifest"""
+    if name == Config.COLLECTION_NAME:
+        # The collection every install starts with keeps the original file layout
+        return {
+            "dir": None,
+            "numpy": Config.NUMPY_STORE_PATH,
+            "compact": Config.COMPACT_STORE_PATH,
+            "lexical": Config.LEXICAL_INDEX_PATH,
+            "manifest": Config.INGEST_MANIFEST_PATH
+        }
+    directory = os.path.join(Config.COLLECTIONS_DIR, name)
+    return {
+        "dir": directory,
+        "numpy": os.path.join(directory, "numpy"),
+        "compact": os.path.join(directory, "compact"),
+        "lexical": os.path.join(directory, "lexical_index.db"),
+        "manifest": os.path.join(directory, "ingest_manifest.db")
+    }
+
+
+def list_collections() -> List[str]:
+    """Every collection with files on disk"""
+    names = sorted(os.listdir(Config.COLLECTIONS_DIR)) if os.path.isdir(Config.COLLECTIONS_DIR) else []
+    if os.path.exists(Config.INGEST_MANIFEST_PATH):
+        names.insert(0, Config.COLLECTION_NAME)
+    return names
+
+
+def remove_collection_files(name: str):
+    """Delete a collection's files (Chroma vectors are dropped through the backend)"""
+    paths = collection_paths(name)
+    if paths["dir"] is not None:
+        if os.path.isdir(paths["dir"]):
+            shutil.rmtree(paths["dir"])
+        return
+    for key in ("numpy", "compact"):
+        if os.path.isdir(paths[key]):
+            shutil.rmtree(paths[key])
+    for key in ("lexical", "manifest"):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(paths[key] + suffix):
+                os.remove(paths[key] + suffix)
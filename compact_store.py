@@ -0,0 +1,83 @@
+import logging
+import numpy as np
+from typing import Dict, Optional
+from config import Config
+from vector_backends import NumpyBackend
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = ("float16", "int8")
+
+
+class CompactVectorStore(NumpyBackend):
+    """Quantized variant of the NumPy backend for very large collections.
+
+    Searches scan a float16 or int8 (per-row scaled) copy of the vectors,
+    then re-rank the best top_k * rerank_factor candidates exactly against
+    the float32 vectors, which stay on disk and are only paged in for those
+    rows.
+    """
+
+    def __init__(self, path: str, dim: int = None, quantization: str = "int8", rerank_factor: int = None):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization '{quantization}', expected one of {QUANTIZATIONS}")
+
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor or Config.COMPACT_RERANK_FACTOR
+        super().__init__(path, dim)
+
+    def memory_footprint(self) -> Dict:
+        """Bytes scanned per query (resident) versus full-precision vectors (on disk)"""
+        live = self.count()
+        scanned_row_bytes = (self.dim or 0) * (2 if self.quantization == "float16" else 1)
+        if self.quantization == "int8":
+            scanned_row_bytes += 4  # per-row scale
+        return {
+            "rows": live,
+            "scanned_bytes": live * scanned_row_bytes,
+            "float32_bytes": live * self.dim * 4
+        }
+
+    def _block_scores(self, start: int, end: int, queries: np.ndarray) -> np.ndarray:
+        """Approximate similarities from the quantized rows"""
+        scores = queries @ self._quantized[start:end].astype(np.float32).T
+        if self.quantization == "int8":
+            scores *= self._scales[start:end]
+        return scores
+
+    def _top_rows(self, query: np.ndarray, scores: np.ndarray, n_results: int, live_count: int):
+        """Exact re-rank of the best approximate candidates"""
+        n_candidates = min(live_count, n_results * self.rerank_factor)
+        candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        candidates = np.sort(candidates)  # sequential reads from the memory map
+
+        exact = self._f32[candidates] @ query
+        order = np.argsort(-exact)[:n_results]
+        return candidates[order].tolist(), exact[order].tolist()
+
+    def _write_vectors(self, rows: np.ndarray, vectors: np.ndarray):
+        self._f32[rows] = vectors
+        if self.quantization == "float16":
+            self._quantized[rows] = vectors.astype(np.float16)
+            return
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self._quantized[rows] = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        self._scales[rows] = scales
+
+    def _open_arrays(self, capacity: int, truncate: bool = False):
+        super()._open_arrays(capacity, truncate)
+        if self.quantization == "float16":
+            self._quantized = self._map("vectors.f16", np.float16, (capacity, self.dim), truncate)
+            self._scales: Optional[np.memmap] = None
+        else:
+            self._quantized = self._map("vectors.i8", np.int8, (capacity, self.dim), truncate)
+            self._scales = self._map("scales.f32", np.float32, (capacity,), truncate)
+
+    def _flush(self):
+        if self._f32 is None:
+            return
+        super()._flush()
+        self._quantized.flush()
+        if self._scales is not None:
+            self._scales.flush()
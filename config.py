@@ -17,6 +17,14 @@ class Config:
     OLLAMA_MODEL = "llama3.2"  # Default model
     OLLAMA_TIMEOUT = 120  # seconds
     OLLAMA_MAX_RETRIES = 3
+    OLLAMA_NUM_CTX = 4096  # model context window; prompt + context + answer must fit
+    OLLAMA_MAX_CONCURRENT_REQUESTS = 4  # generations in flight; further requests wait their turn
+    OLLAMA_CONNECT_TIMEOUT = 5  # seconds to establish a connection
+    OLLAMA_POOL_SIZE = 10  # keep-alive connections held open to Ollama
+    OLLAMA_BACKOFF_BASE = 0.5  # seconds; doubled on each retry, with jitter
+    OLLAMA_BACKOFF_MAX = 8  # seconds
+    OLLAMA_CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures before failing fast
+    OLLAMA_CIRCUIT_RESET_TIMEOUT = 30  # seconds before retrying a failed Ollama
     
     # Available model options
     AVAILABLE_MODELS = [
@@ -31,18 +39,57 @@ class Config:
     # RAG Pipeline Settings
     # =========================================================================
     # Document Processing
-    CHUNK_SIZE = 1000
-    CHUNK_OVERLAP = 200
-    MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+    CHUNKING_STRATEGY = "structured"  # "structured" (element/heading aware, token sized) or "words" (legacy)
+    CHUNK_MAX_TOKENS = 250  # embedding tokenizer tokens per chunk; all-MiniLM-L6-v2 truncates at 256 incl. special tokens
+    CHUNK_OVERLAP_TOKENS = 32  # overlap when a single element has to be split
+    CHUNK_SIZE = 1000  # words per chunk ("words" strategy)
+    CHUNK_OVERLAP = 200  # words ("words" strategy)
+    TABLE_READ_ROWS = 10_000  # CSV rows read into memory at a time
+    TABLE_MAX_ROWS_PER_CHUNK = 50  # spreadsheet rows per chunk (fewer if they exceed CHUNK_MAX_TOKENS)
+    MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB; larger files are skipped, except CSV/XLSX which are streamed
     
     # Vector Database
     VECTOR_DB_PATH = os.path.join(BASE_DIR, "vector-db")
     COLLECTION_NAME = "knowledge_docs"
     SIMILARITY_TOP_K = 5  # Number of results to retrieve
+    INGEST_MANIFEST_PATH = os.path.join(VECTOR_DB_PATH, "ingest_manifest.db")  # Tracks ingested files for incremental runs
+    VECTOR_BACKEND = "chroma"  # "chroma" or "numpy" (memory-mapped exact search, fast to load; suits small bases)
+    NUMPY_STORE_PATH = os.path.join(VECTOR_DB_PATH, "numpy")
+    VECTOR_STORE_QUANTIZATION = None  # numpy backend only: "float16" or "int8" for the compact quantized store
+    COMPACT_STORE_PATH = os.path.join(VECTOR_DB_PATH, "compact")
+    COMPACT_RERANK_FACTOR = 4  # top_k * this quantized candidates are re-scored with float32 vectors
+    COLLECTIONS_DIR = os.path.join(VECTOR_DB_PATH, "collections")  # one directory per collection built by --reindex
+    ACTIVE_COLLECTION_FILE = os.path.join(VECTOR_DB_PATH, "active_collection.json")  # names the collection being served
+    COLLECTION_CHECK_INTERVAL = 5  # seconds between checks for a collection swapped in by another process
+    REINDEX_MIN_COUNT_RATIO = 0.9  # a rebuild with fewer chunks than this share of the current collection is not swapped in
+    REINDEX_DROP_DELAY = 30  # seconds in-flight queries get to finish before the replaced collection is dropped
     
     # Search Settings
-    SIMILARITY_THRESHOLD = 0.6  Minimum similarity score to consider relevant
+    SIMILARITY_THRESHOLD = 0.6  # Minimum similarity score to consider relevant
     MAX_CONTEXT_LENGTH = 4000  # characters
+    CONTEXT_TOKEN_BUDGET = MAX_CONTEXT_LENGTH // 4  # tokens of retrieved text per prompt (~4 characters per token)
+    SEARCH_MODE = "hybrid"  # "vector", "lexical" (BM25 only, no embedding) or "hybrid" (both, fused)
+    LEXICAL_INDEX_ENABLED = True  # maintain a BM25 index alongside the vector collection
+    LEXICAL_INDEX_PATH = os.path.join(VECTOR_DB_PATH, "lexical_index.db")
+    HYBRID_CANDIDATE_MULTIPLIER = 4  # each retriever returns top_k * this candidates for fusion
+    BULK_QUERY_BATCH_SIZE = 64  # questions embedded and searched together in bulk mode
+    PARTITION_KEY = "site"  # chunk metadata naming its partition: the first directory under the knowledge base
+    DEFAULT_PARTITION = "default"  # partition of files directly in the knowledge base directory
+    
+    # Reranking
+    RERANK_ENABLED = False  # re-score a wider candidate set with a cross-encoder before prompting
+    RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"  # small cross-encoder, runs on the CPU
+    RERANK_CANDIDATES = 20  # chunks retrieved for reranking
+    RERANK_TOP_N = 3  # chunks kept after reranking (at most top_k)
+    RERANK_BATCH_SIZE = 16  # (question, chunk) pairs scored per model call
+    RERANK_MAX_LENGTH = 512  # tokens per (question, chunk) pair
+    RERANK_BUDGET_MS = 300  # reranking is skipped (retriever order kept) once scoring takes longer
+    RERANK_CACHE_SIZE = 4096  # (question, chunk) scores kept in memory
+    
+    # Query Caching
+    QUERY_EMBEDDING_CACHE_SIZE = 1024  # query embeddings kept in memory (LRU)
+    ANSWER_CACHE_SIZE = 512  # generated answers kept in memory
+    ANSWER_CACHE_TTL = 3600  # seconds before a cached answer is regenerated
     
     # =========================================================================
     # File Path Settings
@@ -83,9 +130,19 @@ class Config:
     # Poppler Path (for PDF to image conversion)
     POPPLER_PATH = r"C:\poppler\Library\bin"
     
+    # PDF Extraction
+    PDF_EXTRACTION_STRATEGY = "tiered"  # "tiered" (text layer, OCR only textless pages) or "hi_res" (unstructured layout model)
+    PDF_MIN_PAGE_CHARS = 50  # pages with less embedded text than this are OCR'd
+    OCR_DPI = 300  # render resolution for OCR'd pages
+    OCR_WORKERS = 2  # pages OCR'd in parallel per file (per ingest worker process)
+    OCR_LANG = "eng"  # Tesseract language(s), e.g. "eng+deu"
+    OCR_CONFIG = ""  # extra Tesseract options, e.g. "--psm 6"
+    OCR_CACHE_ENABLED = True  # reuse OCR text of unchanged pages across ingests
+    OCR_CACHE_PATH = os.path.join(VECTOR_DB_PATH, "ocr_cache.db")
+    
     # Image Processing
     SUPPORTED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
-    MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
+    MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB; larger images are skipped
     USE_OCR_FOR_IMAGES = True
     
     # =========================================================================
@@ -102,6 +159,9 @@ class Config:
     API_PORT = 8000
     DEBUG = True
     CORS_ORIGINS = ["*"]  # For development only
+    API_EMBED_BATCH_SIZE = 64  # concurrent queries embedded in one model call
+    API_EMBED_BATCH_WINDOW_MS = 5  # how long to wait for more queries to join a batch
+    API_MAX_PENDING_REQUESTS = 200  # queries beyond this get HTTP 503
     
     # =========================================================================
     # Supported File Extensions
@@ -113,7 +173,21 @@ class Config:
     # Performance Settings
     # =========================================================================
     MAX_CONCURRENT_UPLOADS = 5
+    INGEST_WORKERS = MAX_CONCURRENT_UPLOADS  # Extraction processes during ingestion (1 = serial)
+    INGEST_FILE_TIMEOUT = 600  # seconds allowed per file before its worker is killed
+    INGEST_ISOLATE_FILES = True  # extract in worker processes even with 1 worker, so the limits apply
+    INGEST_MAX_MEMORY_MB = 4096  # address space per extraction worker (POSIX only; 0 = unlimited)
+    INGEST_QUARANTINE_PATH = os.path.join(LOG_DIR, "ingest_quarantine.jsonl")  # files that exceeded a limit
+    UPSERT_BATCH_SIZE = 256  # chunks embedded and written to the vector DB per batch
+    INGEST_QUEUE_SIZE = 4  # items buffered between ingestion pipeline stages
+    EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # SentenceTransformer model used for chunks and queries
+    EMBEDDING_TOKENIZER = "sentence-transformers/all-MiniLM-L6-v2"  # tokenizer of EMBEDDING_MODEL, used to size chunks
     EMBEDDING_BATCH_SIZE = 32
+    EMBEDDING_PROCESSES = 0  # >1 encodes large inputs across that many CPU processes
+    EMBEDDING_MULTIPROCESS_MIN_TEXTS = 2000  # smaller inputs are encoded in-process
+    EMBEDDING_CACHE_ENABLED = True  # reuse embeddings of previously seen chunk text
+    EMBEDDING_CACHE_PATH = os.path.join(VECTOR_DB_PATH, "embedding_cache.db")
+    EMBEDDING_CACHE_MAX_ENTRIES = 1_000_000  # least recently used entries are evicted beyond this
     DB_FLUSH_INTERVAL = 60  # seconds
     
     # =========================================================================
@@ -121,6 +195,7 @@ class Config:
     # =========================================================================
     LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR, CRITICAL
     LOG_FILE = os.path.join(LOG_DIR, "rag_system.log")
+    METRICS_FILE = os.path.join(LOG_DIR, "metrics.prom")  # Prometheus text metrics written after ingest/bulk runs (None = off)
     MAX_LOG_SIZE = 10 * 1024 * 1024  # 10MB
     BACKUP_COUNT = 5
     
@@ -128,6 +203,8 @@ class Config:
     # Security Settings (for production)
     # =========================================================================
     API_KEY_ENABLED = False  # Set to True for production
+    API_KEY = os.environ.get("SITEPULSE_API_KEY", "")  # required in the X-API-Key header when API_KEY_ENABLED
+    INGEST_ALLOWED_DIRS = []  # directories POST /ingest may read besides KNOWLEDGE_BASE_DIR
     ALLOWED_FILE_TYPES = SUPPORTED_EXTENSIONS
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max upload
     
@@ -145,7 +222,7 @@ class Config:
     SESSION_TIMEOUT = 3600  # 1 hour in seconds
     TYPING_INDICATOR_DELAY = 1  # second
 
-# Initialize directories on import
+# Directories are created by the commands that need them, not on import
 def initialize_directories():
     """Ensure all required directories exist"""
     directories = [
@@ -161,9 +238,6 @@ def initialize_directories():
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
 
-# Initialize directories when config is imported
-initialize_directories()
-
 # Configuration validation
 def validate_config():
     """Validate configuration settings"""
@@ -187,9 +261,10 @@ def validate_config():
     
     return warnings
 
-# Display configuration warnings on import
-config_warnings = validate_config()
-if config_warnings:
-    print("⚠️  Configuration Warnings:")
-    for warning in config_warnings:
-        print(f"   - {warning}")
\ No newline at end of file
+def report_config_warnings():
+    """Print configuration warnings (called by commands that use Ollama or OCR)"""
+    config_warnings = validate_config()
+    if config_warnings:
+        print("⚠️  Configuration Warnings:")
+        for warning in config_warnings:
+            print(f"   - {warning}")
\ No newline at end of file
@@ -0,0 +1,72 @@
+import os
+import zlib
+import tempfile
+import numpy as np
+import pytest
+from config import Config, BASE_DIR
+
+# Config points at the Windows install; move every path under BASE_DIR into a
+# scratch directory before any module uses one at import time (e.g. log files)
+_SESSION_DIR = tempfile.mkdtemp(prefix="rag-tests-")
+for _name, _value in list(vars(Config).items()):
+    if isinstance(_value, str) and _value.startswith(BASE_DIR):
+        setattr(Config, _name, _SESSION_DIR + _value[len(BASE_DIR):])
+os.makedirs(Config.LOG_DIR, exist_ok=True)
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words embeddings standing in for the SentenceTransformer"""
+
+    dim = 64
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True, show_progress_bar=False) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                embeddings[i, zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        return embeddings
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path, monkeypatch):
+    """Fresh directories for every store and cache, the NumPy backend and in-process extraction"""
+    for name, value in list(vars(Config).items()):
+        if isinstance(value, str) and value.startswith(_SESSION_DIR):
+            monkeypatch.setattr(Config, name, str(tmp_path) + value[len(_SESSION_DIR):])
+    monkeypatch.setattr(Config, "VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr(Config, "VECTOR_STORE_QUANTIZATION", None)
+    monkeypatch.setattr(Config, "EMBEDDING_PROCESSES", 1)
+    monkeypatch.setattr(Config, "INGEST_ISOLATE_FILES", False)
+    monkeypatch.setattr(Config, "RERANK_ENABLED", False)
+    os.makedirs(Config.KNOWLEDGE_BASE_DIR, exist_ok=True)
+    os.makedirs(Config.LOG_DIR, exist_ok=True)
+    return tmp_path
+
+
+@pytest.fixture
+def vector_db():
+    """VectorDatabase on the NumPy backend with the hashing encoder"""
+    from vector_db import VectorDatabase
+    db = VectorDatabase()
+    db._embedding_model = HashingEncoder()
+    yield db
+    db.close()
+
+
+def make_chunks(file_path: str, texts, site: str = "default"):
+    """Chunks as DocumentProcessor returns them"""
+    return [
+        {
+            "text": text,
+            "metadata": {
+                "source": os.path.basename(file_path),
+                "file_path": file_path,
+                "chunk_id": i,
+                Config.PARTITION_KEY: site
+            }
+        }
+        for i, text in enumerate(texts)
+    ]
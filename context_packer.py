@@ -0,0 +1,123 @@
+import logging
+from typing import List, Dict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # rough average for English text with Llama-family tokenizers
+MIN_OVERLAP_WORDS = 8  # shorter shared runs are treated as coincidence, not chunk overlap
+MIN_PARTIAL_TOKENS = 64  # don't bother adding a truncated chunk smaller than this
+HEADER_TOKENS = 16  # per-document "--- Document n: source ---" line
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM token count of a text"""
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def _overlap(first: List[str], second: List[str]) -> int:
+    """Length of the longest run of words that ends `first` and starts `second`"""
+    if not first or not second:
+        return 0
+    limit = min(len(first), len(second))
+    for start in range(len(first) - limit, len(first)):
+        if first[start] == second[0] and first[start:] == second[:len(first) - start]:
+            return len(first) - start
+    return 0
+
+
+class ContextPacker:
+    """Selects retrieved chunks for the prompt within a token budget.
+
+    Chunks below the similarity threshold (unless they matched the query's
+    keywords or were reranked) are dropped, text repeated between overlapping chunks of the
+    same file is removed, and the remaining chunks are added greedily by
+    relevance until the budget is used up.
+    """
+
+    def __init__(self, token_budget: int = None, similarity_threshold: float = None):
+        self.token_budget = token_budget or Config.CONTEXT_TOKEN_BUDGET
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None else Config.SIMILARITY_THRESHOLD
+        )
+
+    def pack(self, relevant_docs: List[Dict]) -> List[Dict]:
+        """Return the chunks (possibly trimmed) to put in the prompt, best first"""
+        # Exact keyword matches (hybrid/lexical search) are kept even with low vector similarity,
+        # and reranked chunks were already judged by the cross-encoder, not the bi-encoder
+        candidates = [
+            doc for doc in relevant_docs
+            if "rerank_score" in doc or doc.get("similarity", 0.0) >= self.similarity_threshold
+            or doc.get("lexical_match")
+        ]
+        # Cross-encoder score, else fused rank score, else vector similarity
+        candidates.sort(key=self._relevance, reverse=True)
+
+        packed = []
+        used_tokens = 0
+        selected_words: Dict[str, List[List[str]]] = {}  # source file -> word lists of packed chunks
+
+        for doc in candidates:
+            source_key = doc["metadata"].get("file_path", doc["metadata"].get("source", ""))
+            words = self._remove_overlap(doc["text"].split(), selected_words.get(source_key, []))
+            if not words:
+                continue
+
+            text = " ".join(words)
+            tokens = estimate_tokens(text) + HEADER_TOKENS
+            remaining = self.token_budget - used_tokens
+
+            if tokens > remaining:
+                if remaining < MIN_PARTIAL_TOKENS + HEADER_TOKENS:
+                    break
+                text = self._truncate(text, remaining - HEADER_TOKENS)
+                words = text.split()
+                tokens = remaining
+
+            packed.append({**doc, "text": text})
+            selected_words.setdefault(source_key, []).append(words)
+            used_tokens += tokens
+
+            if used_tokens >= self.token_budget:
+                break
+
+        if len(packed) < len(relevant_docs):
+            logger.info(
+                f"Packed {len(packed)}/{len(relevant_docs)} chunks into ~{used_tokens} tokens "
+                f"(budget {self.token_budget}, threshold {self.similarity_threshold})"
+            )
+        return packed
+
+    @staticmethod
+    def _relevance(doc: Dict) -> float:
+        if "rerank_score" in doc:
+            return doc["rerank_score"]
+        return doc.get("score", doc.get("similarity", 0.0))
+
+    @staticmethod
+    def _remove_overlap(words: List[str], selected: List[List[str]]) -> List[str]:
+        """Strip words this chunk shares with already packed chunks of the same file"""
+        for other in selected:
+            if len(words) <= len(other) and " ".join(words) in " ".join(other):
+                return []
+
+            head = _overlap(other, words)
+            if head >= MIN_OVERLAP_WORDS:
+                words = words[head:]
+
+            tail = _overlap(words, other)
+            if tail >= MIN_OVERLAP_WORDS:
+                words = words[:-tail]
+
+            if not words:
+                return []
+        return words
+
+    @staticmethod
+    def _truncate(text: str, max_tokens: int) -> str:
+        """Cut text to roughly max_tokens, at a word boundary"""
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        cut = text.rfind(" ", 0, max_chars)
+        return text[:cut if cut > 0 else max_chars] + " ..."
@@ -1,27 +1,138 @@
 import os
+import json
+import time
 import logging
-from typing import List, Dict
-from unstructured.partition.pdf import partition_pdf
-from unstructured.partition.docx import partition_docx
-from unstructured.partition.pptx import partition_pptx
-from unstructured.partition.text import partition_text
-import pdf2image
-import pytesseract
-from PIL import Image
-import pandas as pd
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Iterable, Iterator, Callable, Optional
+from ingest_manifest import hash_file
+from ocr_cache import OCRCache
+from chunker import StructuredChunker, element_blocks
+from table_reader import TableChunker
 from config import Config
 
+# Format-specific parsers (unstructured, pdf2image, pytesseract, PIL, pandas, openpyxl) are
+# imported inside the methods that need them, so importing this module stays cheap
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Formats read incrementally and handed to the pipeline in parts (see stream_table),
+# so they are ingested even above MAX_FILE_SIZE
+STREAMED_EXTENSIONS = {'.csv', '.xlsx'}
+
+# Per-process processor used by pool workers (created on first task)
+_worker_processor = None
+
+def _config_settings() -> Dict:
+    """The parent's current Config values, for workers started with spawn (which re-import config.py)"""
+    return {name: value for name, value in vars(Config).items()
+            if name.isupper() and isinstance(value, (str, int, float, bool, list, dict, type(None)))}
+
+def _init_worker(settings: Dict = None):
+    """Apply the parent's Config and the per-process memory limit in pool workers"""
+    for name, value in (settings or {}).items():
+        setattr(Config, name, value)
+    if not Config.INGEST_MAX_MEMORY_MB:
+        return
+    try:
+        import resource
+    except ImportError:  # Windows has no rlimits; the timeout still applies
+        return
+    limit = Config.INGEST_MAX_MEMORY_MB * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+def _process_file_worker(file_path: str, base_dir: str) -> Dict:
+    """Entry point for pool workers"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DocumentProcessor()
+    try:
+        return _worker_processor.process_file(file_path, base_dir)
+    except MemoryError:
+        return DocumentProcessor._failed_result(
+            file_path, f"exceeded memory limit of {Config.INGEST_MAX_MEMORY_MB}MB", limit="memory"
+        )
+
+def _quarantine(result: Dict):
+    """Append a file that exceeded an ingestion limit to the quarantine report"""
+    try:
+        size = os.path.getsize(result["path"])
+    except OSError:
+        size = None
+    entry = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "path": result["path"],
+        "size": size,
+        "limit": result["limit"],
+        "error": result["error"]
+    }
+    try:
+        os.makedirs(os.path.dirname(Config.INGEST_QUARANTINE_PATH), exist_ok=True)
+        with open(Config.INGEST_QUARANTINE_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        logger.error(f"Could not write quarantine report: {e}")
+
+def _tesseract():
+    """Import pytesseract on first OCR and point it at the configured binary"""
+    import pytesseract
+    if Config.TESSERACT_PATH:
+        pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_PATH
+    # Pages are OCR'd in parallel by our own pool; stop each Tesseract also spawning a thread per core
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    return pytesseract
+
+def _poppler_path():
+    """Configured Poppler directory, or None to use Poppler from PATH"""
+    return Config.POPPLER_PATH if Config.POPPLER_PATH and os.path.isdir(Config.POPPLER_PATH) else None
+
+def _kill_pool(executor: ProcessPoolExecutor):
+    """Shut down a pool without waiting, terminating hung or crashed workers"""
+    # ProcessPoolExecutor has no public API to kill a busy worker
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout=5)
+
+def _is_under(path: str, root: str) -> bool:
+    path, root = os.path.normcase(os.path.abspath(path)), os.path.normcase(os.path.abspath(root))
+    try:
+        return os.path.commonpath([path, root]) == root
+    except ValueError:
+        return False  # different drives
+
+def _empty_ocr_stats() -> Dict:
+    return {"hits": 0, "misses": 0, "seconds_saved": 0.0, "seconds_spent": 0.0}
+
 class DocumentProcessor:
     def __init__(self):
         self.chunk_size = Config.CHUNK_SIZE
         self.chunk_overlap = Config.CHUNK_OVERLAP
-        pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_PATH
+        self._chunker: Optional[StructuredChunker] = None  # loads the tokenizer on first use
+        self._table_chunker: Optional[TableChunker] = None
+        self._ocr_cache: Optional[OCRCache] = None  # opened on first OCR
+        self._ocr_lock = threading.Lock()
+        self.ocr_stats = _empty_ocr_stats()  # for the file being processed
+    
+    def chunk_blocks(self, blocks: List[Dict], source: str, file_path: str = None) -> List[Dict]:
+        """Chunk extracted blocks with the configured strategy"""
+        if Config.CHUNKING_STRATEGY == "words":
+            return self.chunk_text("\n".join(block["text"] for block in blocks), source, file_path)
+        if self._chunker is None:
+            self._chunker = StructuredChunker()
+        return self._chunker.chunk(blocks, source, file_path)
     
-    def chunk_text(self, text: str, source: str) -> List[Dict]:
-        """Split text into overlapping chunks with metadata"""
+    def chunk_text(self, text: str, source: str, file_path: str = None) -> List[Dict]:
+        """Split text into overlapping word windows with metadata (legacy "words" strategy)"""
         words = text.split()
         chunks = []
         chunk_id = 0
@@ -35,6 +146,7 @@ class DocumentProcessor:
                 "text": chunk_text,
                 "metadata": {
                     "source": source,
+                    "file_path": file_path or source,
                     "chunk_id": chunk_id,
                     "start_index": start,
                     "end_index": end
@@ -46,74 +158,470 @@ class DocumentProcessor:
     
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF with OCR fallback"""
+        return "\n".join(block["text"] for block in self.extract_pdf_blocks(file_path))
+    
+    def extract_pdf_blocks(self, file_path: str) -> List[Dict]:
+        """Extract a PDF as {"text", "category", "page"} blocks.
+
+        With Config.PDF_EXTRACTION_STRATEGY = "tiered" (default) the text
+        layer is read page by page and only pages with less than
+        Config.PDF_MIN_PAGE_CHARS characters are OCR'd; "hi_res" runs
+        unstructured's layout model over the whole document instead.
+        Extraction and OCR errors are raised so the file is reported as failed.
+        """
+        if Config.PDF_EXTRACTION_STRATEGY == "hi_res":
+            return self._extract_pdf_hi_res(file_path)
+        return self._extract_pdf_tiered(file_path)
+    
+    def _extract_pdf_hi_res(self, file_path: str) -> List[Dict]:
+        """unstructured hi_res partitioning, OCRing every page if little text is found"""
+        from unstructured.partition.pdf import partition_pdf
+        
+        # Try direct text extraction first
+        blocks = element_blocks(partition_pdf(file_path, strategy="hi_res"))
+        
+        # If little text found, try OCR
+        if sum(len(block["text"]) for block in blocks) < 100:
+            import pdf2image
+            page_count = pdf2image.pdfinfo_from_path(file_path, poppler_path=_poppler_path())["Pages"]
+            pages = self._ocr_pdf_pages(file_path, list(range(page_count)))
+            blocks = [block for i, text in enumerate(pages) for block in self._text_blocks(text, i + 1)]
+        
+        return blocks
+    
+    def _extract_pdf_tiered(self, file_path: str) -> List[Dict]:
+        """Text layer first; OCR only the pages that have none"""
         try:
-            # Try direct text extraction first
-            elements = partition_pdf(file_path, strategy="hi_res")
-            text = "\n".join([str(el) for el in elements])
-            
-            # If little text found, try OCR
-            if len(text.strip()) < 100:
-                images = pdf2image.convert_from_path(file_path)
-                ocr_text = ""
-                for i, image in enumerate(images):
-                    ocr_text += pytesseract.image_to_string(image) + "\n"
-                text = ocr_text
-                
-            return text
+            pages = self._pdf_text_layer(file_path)
+        except MemoryError:
+            raise
         except Exception as e:
-            logger.error(f"PDF extraction failed: {e}")
+            # Damaged or unusual text layer: treat every page as scanned
+            import pdf2image
+            logger.warning(f"Text layer extraction failed for {file_path}, using OCR: {e}")
+            pages = [""] * pdf2image.pdfinfo_from_path(file_path, poppler_path=_poppler_path())["Pages"]
+        
+        scanned = [i for i, text in enumerate(pages) if len(text.strip()) < Config.PDF_MIN_PAGE_CHARS]
+        if scanned:
+            logger.info(f"{os.path.basename(file_path)}: OCR on {len(scanned)}/{len(pages)} pages without a text layer")
+            for page_index, text in zip(scanned, self._ocr_pdf_pages(file_path, scanned)):
+                if len(text.strip()) > len(pages[page_index].strip()):
+                    pages[page_index] = text
+        
+        return [block for i, text in enumerate(pages) for block in self._text_blocks(text, i + 1)]
+    
+    @staticmethod
+    def _text_blocks(text: str, page: int = None) -> List[Dict]:
+        """Split plain text into titled/narrative blocks with unstructured's text heuristics"""
+        if not text.strip():
+            return []
+        from unstructured.partition.text import partition_text
+        return element_blocks(partition_text(text=text), page)
+    
+    @staticmethod
+    def _pdf_text_layer(file_path: str) -> List[str]:
+        """Embedded text of each page (pdfminer; no rendering)"""
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+        
+        return [
+            "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+            for layout in extract_pages(file_path)
+        ]
+    
+    def _ocr_pdf_pages(self, file_path: str, page_indexes: List[int]) -> List[str]:
+        """OCR the given pages (0-based) across Config.OCR_WORKERS threads, in order"""
+        if not page_indexes:
+            return []
+        file_hash = hash_file(file_path) if Config.OCR_CACHE_ENABLED else None
+        workers = max(1, min(Config.OCR_WORKERS, len(page_indexes)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda page_index: self._ocr_pdf_page(file_path, page_index, file_hash), page_indexes))
+    
+    def _ocr_pdf_page(self, file_path: str, page_index: int, file_hash: str = None) -> str:
+        """OCR one page, from the OCR cache when possible"""
+        try:
+            return self._cached_ocr(
+                file_hash, page_index, Config.OCR_DPI, lambda: self._render_and_ocr(file_path, page_index)
+            )
+        except MemoryError:
+            raise
+        except Exception as e:
+            # A page that cannot be OCR'd fails the file rather than silently dropping its text
+            raise RuntimeError(f"OCR failed for page {page_index + 1}: {e}") from e
+    
+    def _render_and_ocr(self, file_path: str, page_index: int) -> str:
+        """Render one page at Config.OCR_DPI and OCR it; only this page is held in memory"""
+        import pdf2image
+        images = pdf2image.convert_from_path(
+            file_path,
+            dpi=Config.OCR_DPI,
+            first_page=page_index + 1,
+            last_page=page_index + 1,
+            poppler_path=_poppler_path()
+        )
+        if not images:
             return ""
+        try:
+            return self._ocr_image(images[0])
+        finally:
+            images[0].close()
     
-    def process_document(self, file_path: str) -> List[Dict]:
-        """Process any document type and return chunks"""
-        ext = os.path.splitext(file_path).lower()
-        source = os.path.basename(file_path)
+    def _cached_ocr(self, file_hash: Optional[str], page: int, dpi: int, run_ocr: Callable[[], str]) -> str:
+        """Return cached OCR text for a page, or run OCR and cache the result"""
+        cache = self._get_ocr_cache() if file_hash else None
+        key = cache.key(file_hash, page, dpi) if cache else None
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                text, seconds = cached
+                self._record_ocr("hits", "seconds_saved", seconds)
+                return text
         
+        start_time = time.time()
+        text = run_ocr()
+        seconds = time.time() - start_time
+        self._record_ocr("misses", "seconds_spent", seconds)
+        if cache:
+            cache.put(key, text, seconds)
+        return text
+    
+    def _get_ocr_cache(self) -> Optional[OCRCache]:
+        with self._ocr_lock:
+            if self._ocr_cache is None and Config.OCR_CACHE_ENABLED:
+                self._ocr_cache = OCRCache()
+            return self._ocr_cache
+    
+    def _record_ocr(self, counter: str, timer: str, seconds: float):
+        with self._ocr_lock:
+            self.ocr_stats[counter] += 1
+            self.ocr_stats[timer] += seconds
+    
+    @staticmethod
+    def _ocr_image(image) -> str:
+        """Run Tesseract with the configured language and options"""
+        return _tesseract().image_to_string(image, lang=Config.OCR_LANG, config=Config.OCR_CONFIG)
+    
+    def process_document(self, file_path: str, base_dir: str = None) -> List[Dict]:
+        """Process any document type and return chunks (none if extraction fails)"""
         try:
-            if ext == '.pdf':
-                text = self.extract_text_from_pdf(file_path)
-            elif ext == '.docx':
-                elements = partition_docx(file_path)
-                text = "\n".join([str(el) for el in elements])
-            elif ext == '.pptx':
-                elements = partition_pptx(file_path)
-                text = "\n".join([str(el) for el in elements])
-            elif ext in ['.txt', '.md']:
-                elements = partition_text(file_path)
-                text = "\n".join([str(el) for el in elements])
-            elif ext in ['.csv', '.xlsx']:
-                # Handle spreadsheets
-                if ext == '.csv':
-                    df = pd.read_csv(file_path)
-                else:
-                    df = pd.read_excel(file_path)
-                text = df.to_string()
-            elif ext in ['.jpg', '.jpeg', '.png']:
-                # OCR for images
-                text = pytesseract.image_to_string(Image.open(file_path))
-            else:
-                logger.warning(f"Unsupported file type: {ext}")
-                return []
+            return self.extract_chunks(file_path, base_dir)
+        except MemoryError:
+            raise  # reported as a resource limit, not an empty document
+        except Exception as e:
+            logger.error(f"Error processing {file_path}: {e}")
+            return []
+    
+    def extract_chunks(self, file_path: str, base_dir: str = None) -> List[Dict]:
+        """Chunks of any supported document; extraction errors are raised, not swallowed"""
+        ext = os.path.splitext(file_path)[1].lower()
+        source = os.path.basename(file_path)
+        relative_path = self.relative_path(file_path, base_dir)
+        
+        if ext == '.pdf':
+            blocks = self.extract_pdf_blocks(file_path)
+        elif ext == '.docx':
+            from unstructured.partition.docx import partition_docx
+            blocks = element_blocks(partition_docx(file_path))
+        elif ext == '.pptx':
+            from unstructured.partition.pptx import partition_pptx
+            blocks = element_blocks(partition_pptx(file_path))
+        elif ext in ['.txt', '.md']:
+            from unstructured.partition.text import partition_text
+            blocks = element_blocks(partition_text(file_path))
+        elif ext in ['.csv', '.xlsx']:
+            # Spreadsheets are chunked by row groups, not flattened to text
+            return list(self.iter_table_chunks(file_path, base_dir))
+        elif ext in ['.jpg', '.jpeg', '.png']:
+            # OCR for images
+            from PIL import Image
             
-            return self.chunk_text(text, source)
+            def ocr_file():
+                with Image.open(file_path) as image:
+                    return self._ocr_image(image)
             
+            file_hash = hash_file(file_path) if Config.OCR_CACHE_ENABLED else None
+            blocks = self._text_blocks(self._cached_ocr(file_hash, 0, 0, ocr_file))
+        else:
+            logger.warning(f"Unsupported file type: {ext}")
+            return []
+        
+        return self._add_partition(self.chunk_blocks(blocks, source, relative_path), file_path, base_dir)
+    
+    def iter_table_chunks(self, file_path: str, base_dir: str = None) -> Iterator[Dict]:
+        """Chunks of a CSV/XLSX file, yielded as its rows are read"""
+        if self._table_chunker is None:
+            self._table_chunker = TableChunker()
+        relative_path = self.relative_path(file_path, base_dir)
+        for chunk in self._table_chunker.iter_chunks(file_path, os.path.basename(file_path), relative_path):
+            yield self._add_partition([chunk], file_path, base_dir)[0]
+    
+    def stream_table(self, file_path: str, base_dir: str = None) -> Iterator[Dict]:
+        """Results for a CSV/XLSX file in parts of UPSERT_BATCH_SIZE chunks.
+
+        Parts are marked "partial"; the last result carries no chunks and
+        completes the file (or reports its error), so memory stays bounded
+        by one part however large the export is. Runs in the calling
+        process, without the pool's per-file timeout and memory limit.
+        """
+        start_time = time.time()
+        part = []
+        try:
+            for chunk in self.iter_table_chunks(file_path, base_dir):
+                part.append(chunk)
+                if len(part) >= Config.UPSERT_BATCH_SIZE:
+                    yield {"path": file_path, "chunks": part, "error": None, "partial": True,
+                           "seconds": 0.0, "limit": None}
+                    part = []
+            if part:
+                yield {"path": file_path, "chunks": part, "error": None, "partial": True,
+                       "seconds": 0.0, "limit": None}
         except Exception as e:
             logger.error(f"Error processing {file_path}: {e}")
-            return []
+            yield self._failed_result(file_path, str(e) or type(e).__name__, time.time() - start_time)
+            return
+        yield {"path": file_path, "chunks": [], "error": None, "seconds": time.time() - start_time, "limit": None}
     
-    def process_directory(self, directory_path: str) -> List[Dict]:
-        """Process all documents in a directory"""
-        all_chunks = []
+    @staticmethod
+    def streams(file_path: str) -> bool:
+        """Whether a file is extracted incrementally by stream_table"""
+        return os.path.splitext(file_path)[1].lower() in STREAMED_EXTENSIONS
+    
+    @staticmethod
+    def partition(relative_path: str) -> str:
+        """Partition (site) of a file: its top-level directory in the knowledge base"""
+        parts = relative_path.split("/")
+        return parts[0] if len(parts) > 1 else Config.DEFAULT_PARTITION
+    
+    def _add_partition(self, chunks: List[Dict], file_path: str, base_dir: str = None) -> List[Dict]:
+        """Tag chunks with their partition and document type so queries can be routed by metadata"""
+        partition = self.partition(self.relative_path(file_path, base_dir))
+        doc_type = os.path.splitext(file_path)[1].lower().lstrip(".")
+        for chunk in chunks:
+            chunk["metadata"][Config.PARTITION_KEY] = partition
+            chunk["metadata"]["doc_type"] = doc_type
+        return chunks
+    
+    @staticmethod
+    def ingest_root(file_path: str, base_dir: str = None) -> str:
+        """Directory a file's chunk ids and partition are relative to.
+
+        KNOWLEDGE_BASE_DIR for files inside it; for files under one of
+        INGEST_ALLOWED_DIRS, that root's parent, so the root's name becomes
+        the partition; otherwise base_dir (or the file's own directory).
+        Ingesting <kb>/Pune therefore gives the same ids and partition as
+        ingesting the whole knowledge base.
+        """
+        if _is_under(file_path, Config.KNOWLEDGE_BASE_DIR):
+            return os.path.abspath(Config.KNOWLEDGE_BASE_DIR)
+        for root in Config.INGEST_ALLOWED_DIRS:
+            if _is_under(file_path, root):
+                return os.path.dirname(os.path.abspath(root))
+        return base_dir or os.path.dirname(os.path.abspath(file_path))
+    
+    @staticmethod
+    def relative_path(file_path: str, base_dir: str = None) -> str:
+        """Path of a file relative to its ingest root, with forward slashes"""
+        root = DocumentProcessor.ingest_root(file_path, base_dir)
+        return os.path.relpath(file_path, root).replace(os.sep, "/")
+    
+    def list_documents(self, directory_path: str) -> List[str]:
+        """List all supported files in a directory"""
+        file_paths = []
         
         for root, _, files in os.walk(directory_path):
-            for file in files:
+            for file in sorted(files):
                 if any(file.lower().endswith(ext) for ext in Config.SUPPORTED_EXTENSIONS):
-                    file_path = os.path.join(root, file)
-                    logger.info(f"Processing: {file_path}")
-                    
-                    chunks = self.process_document(file_path)
-                    all_chunks.extend(chunks)
-                    
-                    logger.info(f"Extracted {len(chunks)} chunks from {file}")
-        
-        return all_chunks
\ No newline at end of file
+                    file_paths.append(os.path.join(root, file))
+        
+        return file_paths
+    
+    def process_file(self, file_path: str, base_dir: str = None) -> Dict:
+        """Process one document and return its chunks with timing and OCR cache information.
+
+        Extraction errors are returned in "error" (with no chunks), so the
+        file keeps its previous chunks and manifest entry and is retried on
+        the next run. MemoryError propagates to the pool worker, which
+        reports it as a resource limit.
+        """
+        start_time = time.time()
+        self.ocr_stats = _empty_ocr_stats()
+        try:
+            chunks = self.extract_chunks(file_path, base_dir)
+        except MemoryError:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing {file_path}: {e}")
+            result = self._failed_result(file_path, str(e) or type(e).__name__, time.time() - start_time)
+            result["ocr"] = dict(self.ocr_stats)
+            return result
+        return {
+            "path": file_path,
+            "chunks": chunks,
+            "error": None,
+            "seconds": time.time() - start_time,
+            "ocr": dict(self.ocr_stats),
+            "limit": None
+        }
+    
+    def check_size(self, file_path: str) -> Optional[Dict]:
+        """Failed result for a file over MAX_FILE_SIZE / MAX_IMAGE_SIZE, or None if it may be processed"""
+        ext = os.path.splitext(file_path)[1].lower()
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return None  # extraction reports the real error
+        
+        if ext in Config.SUPPORTED_IMAGE_EXTENSIONS and size > Config.MAX_IMAGE_SIZE:
+            limit, max_size = "image_size", Config.MAX_IMAGE_SIZE
+        elif ext not in STREAMED_EXTENSIONS and size > Config.MAX_FILE_SIZE:
+            limit, max_size = "file_size", Config.MAX_FILE_SIZE
+        else:
+            return None
+        
+        logger.warning(f"Skipping {file_path}: {size / 1024 / 1024:.1f}MB exceeds {max_size / 1024 / 1024:.0f}MB")
+        return self._failed_result(file_path, f"{size} bytes exceeds the {max_size} byte limit", limit=limit)
+    
+    def process_files(self, file_paths: Iterable[str], base_dir: str = None,
+                      workers: int = None, timeout: float = None) -> Iterator[Dict]:
+        """Process documents and yield results in input order: one per file,
+        except CSV/XLSX files, which yield "partial" parts before their final
+        result (see stream_table).
+
+        Files over MAX_FILE_SIZE / MAX_IMAGE_SIZE are skipped. Extraction
+        runs in a pool of worker processes with a memory limit (unless there
+        is one worker and INGEST_ISOLATE_FILES is off). A file that exceeds a
+        limit or crashes its worker is reported with an error and appended to
+        the quarantine report, and the pool is restarted, so the rest of the
+        run continues.
+        """
+        workers = workers or Config.INGEST_WORKERS
+        timeout = timeout or Config.INGEST_FILE_TIMEOUT
+        
+        if workers <= 1 and not Config.INGEST_ISOLATE_FILES:
+            results = self._process_files_serial(file_paths, base_dir)
+        else:
+            results = self._process_files_parallel(file_paths, base_dir, max(1, workers), timeout)
+        
+        try:
+            for result in results:
+                if result.get("limit"):
+                    _quarantine(result)
+                yield result
+        finally:
+            results.close()
+    
+    def _process_files_serial(self, file_paths: Iterable[str], base_dir: str) -> Iterator[Dict]:
+        for file_path in file_paths:
+            oversize = self.check_size(file_path)
+            if oversize:
+                yield oversize
+            elif self.streams(file_path):
+                yield from self.stream_table(file_path, base_dir)
+            else:
+                yield self.process_file(file_path, base_dir)
+    
+    def _submit(self, executor: ProcessPoolExecutor, file_path: str, base_dir: str) -> Future:
+        """Submit a file to the pool, or resolve it immediately if it is over the size limit or streamed"""
+        oversize = self.check_size(file_path)
+        if oversize is None and not self.streams(file_path):
+            return executor.submit(_process_file_worker, file_path, base_dir)
+        future = Future()
+        future.set_result(oversize)
+        return future
+    
+    def _process_files_parallel(self, file_paths: Iterable[str], base_dir: str,
+                                workers: int, timeout: float) -> Iterator[Dict]:
+        """Ordered, streamed extraction over a process pool"""
+        remaining = iter(file_paths)
+        queue = deque()  # [file_path, future, crash_retries]
+        window = workers * 2  # bounds the number of results held in memory
+        executor = self._new_pool(workers)
+        
+        try:
+            while True:
+                # A file retried after a crash runs alone so it can't take others down
+                isolate = bool(queue) and queue[0][2] > 0
+                if not isolate:
+                    for item in queue:
+                        if item[1] is None:
+                            item[1] = self._submit(executor, item[0], base_dir)
+                    while len(queue) < window:
+                        file_path = next(remaining, None)
+                        if file_path is None:
+                            break
+                        queue.append([file_path, self._submit(executor, file_path, base_dir), 0])
+                
+                if not queue:
+                    break
+                
+                item = queue[0]
+                if item[1] is None:
+                    item[1] = self._submit(executor, item[0], base_dir)
+                
+                if self.streams(item[0]):
+                    # Streamed in this process (its parts would not fit in one
+                    # pickled result) while the pool works on the files behind it
+                    queue.popleft()
+                    yield from self.stream_table(item[0], base_dir)
+                    continue
+                
+                # The head of the queue is already running (everything submitted
+                # before it has finished), so this gives each file >= timeout seconds
+                try:
+                    result = item[1].result(timeout=timeout)
+                except FuturesTimeoutError:
+                    logger.error(f"Timed out after {timeout}s, skipping: {item[0]}")
+                    queue.popleft()
+                    executor = self._restart_pool(executor, workers, queue)
+                    yield self._failed_result(item[0], f"timed out after {timeout}s", timeout, limit="timeout")
+                    continue
+                except BrokenProcessPool:
+                    executor = self._restart_pool(executor, workers, queue)
+                    if item[2] == 0:
+                        logger.warning(f"Worker crashed, retrying in isolation: {item[0]}")
+                        item[2] = 1
+                        continue
+                    logger.error(f"Worker crashed, skipping: {item[0]}")
+                    queue.popleft()
+                    yield self._failed_result(item[0], "worker process crashed", limit="crash")
+                    continue
+                except Exception as e:
+                    logger.error(f"Error processing {item[0]}: {e}")
+                    queue.popleft()
+                    yield self._failed_result(item[0], str(e))
+                    continue
+                
+                queue.popleft()
+                yield result
+        finally:
+            _kill_pool(executor)
+    
+    @staticmethod
+    def _restart_pool(executor: ProcessPoolExecutor, workers: int, queue: deque) -> ProcessPoolExecutor:
+        """Replace a pool, keeping results that already completed successfully"""
+        for item in queue:
+            future = item[1]
+            if future is not None and not (future.done() and not future.cancelled() and future.exception() is None):
+                item[1] = None
+        _kill_pool(executor)
+        return DocumentProcessor._new_pool(workers)
+
+    @staticmethod
+    def _new_pool(workers: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_config_settings(),))
+    
+    @staticmethod
+    def _failed_result(file_path: str, error: str, seconds: float = 0.0, limit: str = None) -> Dict:
+        return {"path": file_path, "chunks": [], "error": error, "seconds": seconds, "limit": limit}
+    
+    def iter_directory(self, directory_path: str, workers: int = None) -> Iterator[Dict]:
+        """Yield chunks of all documents in a directory, one file at a time"""
+        file_paths = self.list_documents(directory_path)
+        for result in self.process_files(file_paths, directory_path, workers):
+            logger.info(f"Extracted {len(result['chunks'])} chunks from {os.path.basename(result['path'])}")
+            yield from result["chunks"]
+    
+    def process_directory(self, directory_path: str, workers: int = None) -> List[Dict]:
+        """Process all documents in a directory"""
+        return list(self.iter_directory(directory_path, workers))
@@ -0,0 +1,116 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import numpy as np
+from typing import List, Dict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SQLITE_MAX_PARAMS = 500  # keep IN (...) lists under SQLite's variable limit
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by (embedding model, chunk text hash).
+
+    Vectors are stored as float32 blobs in SQLite. When the cache grows past
+    max_entries, the least recently used tenth is evicted.
+    """
+
+    def __init__(self, model_name: str, cache_path: str = None, max_entries: int = None):
+        self.model_name = model_name
+        self.cache_path = cache_path or Config.EMBEDDING_CACHE_PATH
+        self.max_entries = max_entries or Config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+        self._count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def key(self, text: str) -> str:
+        """Cache key for a text under the current embedding model"""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the keys that are present"""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        now = time.time()
+
+        with self._lock:
+            for start in range(0, len(unique_keys), SQLITE_MAX_PARAMS):
+                batch = unique_keys[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+                if rows:
+                    self.conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})", [now] + batch
+                    )
+            self.conn.commit()
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return found
+
+    def put_many(self, keys: List[str], embeddings: np.ndarray):
+        """Store vectors, evicting least recently used entries if over capacity"""
+        if not keys:
+            return
+
+        now = time.time()
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in zip(keys, embeddings)
+        ]
+
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._count += self.conn.total_changes - before
+
+            if self._count > self.max_entries:
+                evict = self._count - self.max_entries + self.max_entries // 10
+                self.conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (evict,)
+                )
+                self._count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                logger.info(f"Embedding cache evicted {evict} entries")
+
+            self.conn.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": self._count
+        }
+
+    def close(self):
+        self.conn.close()
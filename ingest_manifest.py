@@ -0,0 +1,173 @@
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+from typing import List, Dict, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024  # 1MB
+
+
+def hash_file(file_path: str) -> str:
+    """Compute the SHA-256 content hash of a file"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestPlan:
+    """Files to (re)ingest and to delete for one ingestion run"""
+
+    def __init__(self):
+        self.changed: List[Dict] = []    # new or modified files
+        self.unchanged: List[str] = []   # files skipped
+        self.removed: List[Dict] = []    # manifest entries whose file is gone
+
+    def summary(self) -> Dict:
+        """Counts of each category for reporting"""
+        return {
+            "new": sum(1 for f in self.changed if not f["previous_chunk_ids"]),
+            "modified": sum(1 for f in self.changed if f["previous_chunk_ids"]),
+            "unchanged": len(self.unchanged),
+            "removed": len(self.removed)
+        }
+
+
+class IngestManifest:
+    """Persistent record of ingested files (path, size, mtime, content hash, chunk ids)"""
+
+    def __init__(self, manifest_path: str = None):
+        self.manifest_path = manifest_path or Config.INGEST_MANIFEST_PATH
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.manifest_path, check_same_thread=False)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL
+            )"""
+        )
+        self.conn.commit()
+
+    def get(self, file_path: str) -> Optional[Dict]:
+        """Return the manifest entry for a file, if any"""
+        row = self.conn.execute(
+            "SELECT path, size, mtime, content_hash, chunk_ids FROM files WHERE path = ?",
+            (self._key(file_path),)
+        ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def entries(self) -> List[Dict]:
+        """Return all manifest entries"""
+        rows = self.conn.execute(
+            "SELECT path, size, mtime, content_hash, chunk_ids FROM files"
+        ).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def plan(self, file_paths: List[str], force: bool = False, directory: str = None) -> IngestPlan:
+        """Compare files on disk against the manifest.
+
+        Size and mtime are checked first; the content hash is only computed
+        when they differ, so unchanged files cost a single stat() call. Only
+        entries under directory (the one file_paths were listed from) count
+        as removed when missing; with no directory, every entry does.
+        """
+        plan = IngestPlan()
+        known = {entry["path"]: entry for entry in self.entries()}
+        seen = set()
+
+        for file_path in file_paths:
+            key = self._key(file_path)
+            seen.add(key)
+            entry = known.get(key)
+
+            try:
+                stat = os.stat(file_path)
+            except OSError as e:
+                logger.warning(f"Cannot stat {file_path}: {e}")
+                continue
+
+            if entry and not force and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                plan.unchanged.append(file_path)
+                continue
+
+            try:
+                content_hash = hash_file(file_path)
+            except OSError as e:
+                logger.warning(f"Cannot read {file_path}: {e}")
+                continue
+
+            if entry and not force and entry["content_hash"] == content_hash:
+                # Touched but not modified: refresh stat info and skip
+                self.record(file_path, entry["chunk_ids"], content_hash, stat)
+                plan.unchanged.append(file_path)
+                continue
+
+            plan.changed.append({
+                "path": file_path,
+                "content_hash": content_hash,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "previous_chunk_ids": entry["chunk_ids"] if entry else []
+            })
+
+        root = self._key(directory) if directory else None
+        for key, entry in known.items():
+            if key not in seen and (root is None or self._is_under(key, root)):
+                plan.removed.append(entry)
+
+        return plan
+
+    def record(self, file_path: str, chunk_ids: List[str], content_hash: str, stat: os.stat_result = None):
+        """Record (or replace) the entry for an ingested file"""
+        stat = stat or os.stat(file_path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime, content_hash, chunk_ids) VALUES (?, ?, ?, ?, ?)",
+            (self._key(file_path), stat.st_size, stat.st_mtime, content_hash, json.dumps(chunk_ids))
+        )
+        self.conn.commit()
+
+    def remove(self, file_path: str):
+        """Drop the entry for a file"""
+        self.conn.execute("DELETE FROM files WHERE path = ?", (self._key(file_path),))
+        self.conn.commit()
+
+    def clear(self):
+        """Forget every ingested file"""
+        self.conn.execute("DELETE FROM files")
+        self.conn.commit()
+
+    def count(self) -> int:
+        """Number of files tracked"""
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(file_path))
+
+    @staticmethod
+    def _is_under(key: str, root: str) -> bool:
+        try:
+            return os.path.commonpath([key, root]) == root
+        except ValueError:
+            return False  # different drives
+
+    @staticmethod
+    def _row_to_entry(row) -> Dict:
+        return {
+            "path": row[0],
+            "size": row[1],
+            "mtime": row[2],
+            "content_hash": row[3],
+            "chunk_ids": json.loads(row[4])
+        }
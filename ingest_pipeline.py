@@ -0,0 +1,193 @@
+import os
+import queue
+import logging
+import threading
+from typing import List, Dict, Iterator
+from metrics import get_metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # end-of-stream marker passed between stages
+
+
+class _StageError:
+    """Wraps an exception raised in a background stage"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class IngestPipeline:
+    """Streaming extract -> embed -> upsert ingestion.
+
+    Each stage runs in its own thread and hands work to the next through a
+    bounded queue, so memory stays flat regardless of corpus size. Chunks are
+    written in batches as soon as they are embedded, and a file is recorded in
+    the manifest only once all of its chunks are stored, so an interrupted run
+    resumes where it stopped. Large spreadsheets arrive as several "partial"
+    results followed by a final one, and are recorded like any other file.
+    """
+
+    def __init__(self, processor, vector_db, manifest, batch_size: int = None, queue_size: int = None):
+        self.processor = processor
+        self.vector_db = vector_db
+        self.manifest = manifest
+        self.batch_size = batch_size or Config.UPSERT_BATCH_SIZE
+        self.queue_size = queue_size or Config.INGEST_QUEUE_SIZE
+        self._stop = threading.Event()
+        self.metrics = get_metrics()
+
+    def run(self, changed_files: List[Dict], directory: str, workers: int = None) -> Dict:
+        """Ingest the given manifest plan entries and return chunk/failure/quarantine counts and OCR cache stats"""
+        self._stop.clear()
+        extracted = queue.Queue(maxsize=self.queue_size)
+        embedded = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._extract_stage, args=(changed_files, directory, workers, extracted),
+                             name="ingest-extract", daemon=True),
+            threading.Thread(target=self._embed_stage, args=(extracted, embedded),
+                             name="ingest-embed", daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            return self._upsert_stage(embedded)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
+
+    def _extract_stage(self, changed_files: List[Dict], directory: str, workers: int, out: queue.Queue):
+        """Stage 1: extract and chunk files (in a process pool when workers > 1)"""
+        try:
+            files = {file_info["path"]: file_info for file_info in changed_files}
+            results = self.processor.process_files(list(files), directory, workers)
+            try:
+                for result in results:
+                    if not self._put(out, (files[result["path"]], result)):
+                        return
+            finally:
+                results.close()
+            self._put(out, _DONE)
+        except Exception as e:
+            self._put(out, _StageError(e))
+
+    def _embed_stage(self, source: queue.Queue, out: queue.Queue):
+        """Stage 2: group chunks into fixed-size batches and embed them"""
+        try:
+            for chunks, files in self._batches(source):
+                embeddings = []
+                if chunks:
+                    with self.metrics.timer("ingest_stage_seconds", stage="embed"):
+                        embeddings = self.vector_db.generate_embeddings([chunk["text"] for chunk in chunks])
+                if not self._put(out, (chunks, embeddings, files)):
+                    return
+            self._put(out, _DONE)
+        except Exception as e:
+            self._put(out, _StageError(e))
+
+    def _batches(self, source: queue.Queue) -> Iterator:
+        """Yield (chunks, files completed by this batch) across file boundaries.
+
+        The final result of a streamed file gets "chunk_ids" for all of its
+        parts, since their chunks were passed on without it.
+        """
+        chunks, files = [], []
+        streamed_ids = {}
+        for file_info, result in self._drain(source):
+            for chunk in result["chunks"]:
+                chunks.append(chunk)
+                if len(chunks) >= self.batch_size:
+                    yield chunks, files
+                    chunks, files = [], []
+            if result.get("partial"):
+                streamed_ids.setdefault(result["path"], []).extend(
+                    self.vector_db.document_id(chunk["metadata"]) for chunk in result["chunks"])
+                continue
+            if result["path"] in streamed_ids:
+                result["chunk_ids"] = streamed_ids.pop(result["path"])
+            files.append((file_info, result))
+        if chunks or files:
+            yield chunks, files
+
+    def _upsert_stage(self, source: queue.Queue) -> Dict:
+        """Stage 3: write batches and record files whose chunks are all stored"""
+        report = {"chunks": 0, "failed": 0, "quarantined": 0,
+                  "ocr": {"hits": 0, "misses": 0, "seconds_saved": 0.0, "seconds_spent": 0.0}}
+        for chunks, embeddings, files in self._drain(source):
+            if chunks:
+                with self.metrics.timer("ingest_stage_seconds", stage="upsert"):
+                    self.vector_db.add_documents(chunks, embeddings=embeddings)
+                report["chunks"] += len(chunks)
+                self.metrics.inc("ingest_chunks_total", len(chunks))
+
+            for file_info, result in files:
+                file_path = file_info["path"]
+                for name, value in result.get("ocr", {}).items():
+                    report["ocr"][name] += value
+                self._record_file(result)
+                if result["error"]:
+                    # Leave the manifest untouched so the file is retried next run, dropping
+                    # any parts already written beyond the chunks the manifest knows about
+                    if result.get("chunk_ids"):
+                        self.vector_db.delete_documents(
+                            sorted(set(result["chunk_ids"]) - set(file_info["previous_chunk_ids"])))
+                    report["failed"] += 1
+                    if result.get("limit"):
+                        report["quarantined"] += 1
+                    continue
+
+                try:
+                    ids = result.get("chunk_ids") or [
+                        self.vector_db.document_id(chunk["metadata"]) for chunk in result["chunks"]]
+
+                    # Chunks beyond the new chunk count belong to the old version
+                    stale_ids = sorted(set(file_info["previous_chunk_ids"]) - set(ids))
+                    self.vector_db.delete_documents(stale_ids)
+
+                    self.manifest.record(file_path, ids, file_info["content_hash"])
+                    logger.info(f"Stored {len(ids)} chunks from {file_path}")
+                except Exception as e:
+                    report["failed"] += 1
+                    logger.error(f"Failed to ingest {file_path}: {e}")
+        return report
+
+    def _record_file(self, result: Dict):
+        """Per-file extraction metrics (extraction runs in worker processes, so they are recorded here)"""
+        ext = os.path.splitext(result["path"])[1].lower() or "none"
+        self.metrics.observe("ingest_file_seconds", result.get("seconds", 0.0), ext=ext)
+        outcome = "quarantined" if result.get("limit") else "failed" if result["error"] else "ok"
+        self.metrics.inc("ingest_files_total", result=outcome)
+        ocr = result.get("ocr", {})
+        if ocr.get("hits"):
+            self.metrics.inc("ingest_ocr_pages_total", ocr["hits"], cache="hit")
+        if ocr.get("misses"):
+            self.metrics.inc("ingest_ocr_pages_total", ocr["misses"], cache="miss")
+
+    def _drain(self, source: queue.Queue) -> Iterator:
+        """Yield items from a stage queue until the end marker, re-raising stage errors"""
+        while True:
+            try:
+                item = source.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+
+    def _put(self, target: queue.Queue, item) -> bool:
+        """Blocking put that gives up once the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
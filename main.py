@@ -1,32 +1,47 @@
 import logging
-from rag_pipeline import RAGPipeline
-from model_manager import ModelManager
-from config import Config
+from config import Config, initialize_directories, report_config_warnings
 import argparse
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f"{Config.LOG_DIR}/rag_system.log"),
-        logging.StreamHandler()
-    ]
-)
+# Heavy modules (the RAG pipeline, embedding model, vector store, parsers) are
+# imported by the commands that use them, so light commands start quickly
 
 logger = logging.getLogger(__name__)
 
+def setup_logging():
+    """Create the working directories and configure logging"""
+    initialize_directories()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(f"{Config.LOG_DIR}/rag_system.log"),
+            logging.StreamHandler()
+        ]
+    )
+
 def main():
     parser = argparse.ArgumentParser(description="Ollama RAG System with Your Local Setup")
     parser.add_argument("--ingest", action="store_true", help="Ingest documents from knowledge base")
+    parser.add_argument("--full", action="store_true", help="With --ingest, re-ingest every file instead of only changed ones")
+    parser.add_argument("--reindex", action="store_true",
+                        help="Rebuild the whole index into a new collection and swap it in once validated")
+    parser.add_argument("--workers", type=int, help="With --ingest/--reindex, number of extraction processes (default: Config.INGEST_WORKERS)")
     parser.add_argument("--query", type=str, help="Query to process")
+    parser.add_argument("--stream", action="store_true", help="With --query, print the answer as it is generated")
+    parser.add_argument("--partitions", type=lambda value: [p.strip() for p in value.split(",") if p.strip()],
+                        help="With --query, comma-separated sites (top-level knowledge base folders) to search")
+    parser.add_argument("--bulk", type=str, metavar="INPUT_JSONL", help="Answer every question in a JSONL file")
+    parser.add_argument("--output", type=str, default="answers.jsonl", help="With --bulk, where to write the answers")
+    parser.add_argument("--concurrency", type=int, help="With --bulk, Ollama requests in flight (default: Config.OLLAMA_MAX_CONCURRENT_REQUESTS)")
     parser.add_argument("--clear", action="store_true", help="Clear vector database")
     parser.add_argument("--stats", action="store_true", help="Show statistics")
+    parser.add_argument("--serve", action="store_true", help="Run the HTTP API server")
     parser.add_argument("--check", action="store_true", help="Check environment setup")
     parser.add_argument("--models", action="store_true", help="Show available models")
     parser.add_argument("--model", type=str, help="Set active model")
     
     args = parser.parse_args()
+    setup_logging()
     
     # Check environment first
     if args.check:
@@ -34,8 +49,16 @@ def main():
         check_environment()
         return
     
+    # Run the API server (keeps one pipeline loaded for all requests)
+    if args.serve:
+        report_config_warnings()
+        from api_server import serve
+        serve()
+        return
+    
     # Show available models
     if args.models:
+        from model_manager import ModelManager
         model_manager = ModelManager()
         available_models = model_manager.get_available_models()
         print("🤖 Available Ollama Models:")
@@ -45,6 +68,7 @@ def main():
     
     # Set active model
     if args.model:
+        from model_manager import ModelManager
         model_manager = ModelManager()
         if model_manager.set_active_model(args.model):
             print(f"✅ Set active model to: {args.model}")
@@ -52,31 +76,82 @@ def main():
             print(f"❌ Model not available: {args.model}")
         return
     
-    # Initialize RAG pipeline
+    if args.ingest or args.reindex or args.query or args.bulk:
+        report_config_warnings()
+    
+    # Initialize RAG pipeline (the embedding model and vector store load on first use)
+    from rag_pipeline import RAGPipeline
     rag = RAGPipeline()
     
-    if args.ingest:
-        logger.info("Starting document ingestion...")
-        success = rag.ingest_documents()
+    if args.ingest or args.reindex:
+        if args.reindex:
+            logger.info("Starting full reindex into a new collection...")
+            # A running API server keeps querying the old collection until it notices the
+            # swap, and a drop timer would die with this process, so the next reindex drops it
+            success = rag.reindex(workers=args.workers, drop_previous=False)
+        else:
+            logger.info("Starting document ingestion...")
+            success = rag.ingest_documents(force=args.full, workers=args.workers)
+        report = rag.last_ingest_report
+        if report:
+            print(f"📥 New: {report['new']}  Updated: {report['updated']}  "
+                  f"Skipped: {report['skipped']}  Deleted: {report['deleted']}  Failed: {report['failed']}")
+            if report.get("swapped"):
+                print(f"🔁 Now serving {report['collection']} ({report['chunks']} chunks, "
+                      f"was {report['previous_collection']} with {report['previous_chunks']})")
+            elif args.reindex:
+                print(f"❌ Reindex not activated, still serving {report['previous_collection']}: "
+                      f"{report['validation_error']}")
+            if report["quarantined"]:
+                print(f"🚧 {report['quarantined']} files exceeded size/memory/time limits: {Config.INGEST_QUARANTINE_PATH}")
+            ocr = report["ocr"]
+            if ocr["hits"] + ocr["misses"]:
+                print(f"🔎 OCR cache: {ocr['hits']}/{ocr['hits'] + ocr['misses']} pages reused, "
+                      f"{ocr['seconds_saved']:.1f}s saved")
         if success:
             logger.info("Document ingestion completed successfully!")
         else:
             logger.error("Document ingestion failed!")
     
+    elif args.query and args.stream:
+        logger.info(f"Processing query: {args.query}")
+        for event in rag.query_stream(args.query, partitions=args.partitions):
+            if event["type"] == "metadata":
+                print(f"\n📚 SOURCES: {event['sources']}")
+                print(f"🎯 CONFIDENCE: {event['confidence']:.2f}")
+                print("\n🤖 ANSWER:")
+            elif event["type"] == "token":
+                print(event["text"], end="", flush=True)
+            elif event["type"] == "done":
+                print(f"\n\n⏱️ First token: {event['time_to_first_token']}s  Total: {event['response_time']}s")
+            elif event["type"] == "error":
+                print(f"\n🤖 ANSWER:\n{event['answer']}")
+    
     elif args.query:
         logger.info(f"Processing query: {args.query}")
-        result = rag.query(args.query)
+        result = rag.query(args.query, partitions=args.partitions)
         print(f"\n🤖 ANSWER:\n{result['answer']}")
         print(f"\n📚 SOURCES: {result['sources']}")
         print(f"🎯 CONFIDENCE: {result['confidence']:.2f}")
+        if result.get("cached"):
+            print("⚡ Answer served from cache")
+        if result.get("timings"):
+            print("⏱️ " + "  ".join(f"{stage}: {seconds * 1000:.0f}ms" for stage, seconds in result["timings"].items()))
+    
+    elif args.bulk:
+        logger.info(f"Answering questions from: {args.bulk}")
+        count = rag.bulk_query(args.bulk, args.output, concurrency=args.concurrency)
+        print(f"✅ Wrote {count} answers to {args.output}")
     
     elif args.clear:
-        rag.clear_knowledge()
+        # Like --reindex: a running API server may still be reading the old collection
+        rag.clear_knowledge(drop_previous=False)
         logger.info("Vector database cleared")
     
     elif args.stats:
         stats = rag.get_stats()
-        print(f"📊 Vector DB documents: {stats['vector_db_count']}")
+        print(f"📊 Vector DB documents: {stats['vector_db_count']} (collection {stats.get('collection', 'unknown')})")
+        print(f"🗂️ Ingested files: {stats.get('ingested_files', 'unknown')}")
         print(f"📁 Knowledge base: {stats['knowledge_base_path']}")
     
     else:
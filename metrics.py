@@ -0,0 +1,215 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Tuple, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond cache hits up to multi-minute OCR jobs
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# Descriptions emitted as # HELP lines; metrics not listed here are still exported
+METRIC_HELP = {
+    "rag_queries_total": "Queries answered, by result (answered, cached, error)",
+    "rag_query_seconds": "End-to-end query latency",
+    "rag_query_stage_seconds": "Query latency by stage (embed, search, rerank, pack, prompt, slot_wait, prefill, decode, generate)",
+    "rerank_total": "Rerank calls, by result (reranked, cached, over_budget, error)",
+    "rag_bulk_search_seconds": "Batched retrieval time per bulk query batch",
+    "ollama_prompt_tokens_total": "Prompt tokens evaluated by Ollama",
+    "ollama_generated_tokens_total": "Tokens generated by Ollama",
+    "ingest_files_total": "Files processed by ingestion, by result (ok, failed, quarantined)",
+    "ingest_chunks_total": "Chunks written by ingestion",
+    "ingest_file_seconds": "Extraction time per file, by extension",
+    "ingest_stage_seconds": "Ingestion time by stage (embed, upsert) per batch",
+    "ingest_ocr_pages_total": "Pages OCR'd during ingestion, by cache (hit, miss)",
+    "api_embed_batch_seconds": "Time to embed one batch of concurrent API queries",
+    "api_embed_batch_size": "Queries embedded per API batch"
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with sum and count, like a Prometheus histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max bucket bound if it is in +Inf)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms.
+
+    Recording takes one lock and a dict lookup, so it is cheap enough for
+    every query and every ingest batch. Exposed as a dict (get_stats) and
+    in the Prometheus text format (/metrics endpoint and METRICS_FILE).
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of a block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def stages(self, name: str) -> "StageTimer":
+        """Per-operation stage timer recording into the `name` histogram"""
+        return StageTimer(self, name)
+
+    def snapshot(self) -> Dict:
+        """Counters and histogram summaries (count, sum, mean, bucket-estimated p50/p95/p99)"""
+        with self._lock:
+            counters = {name: {_label_text(key): value for key, value in series.items()}
+                        for name, series in self._counters.items()}
+            histograms = {
+                name: {
+                    _label_text(key): {
+                        "count": histogram.count,
+                        "sum": round(histogram.sum, 6),
+                        "mean": round(histogram.sum / histogram.count, 6) if histogram.count else 0.0,
+                        "p50": histogram.quantile(0.5),
+                        "p95": histogram.quantile(0.95),
+                        "p99": histogram.quantile(0.99)
+                    }
+                    for key, histogram in series.items()
+                }
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._header(lines, name, "counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_label_text(key, braces=True)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                self._header(lines, name, "histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(float(bound))
+                        lines.append(f"{name}_bucket{_label_text(key + (('le', le),), braces=True)} {cumulative}")
+                    lines.append(f"{name}_sum{_label_text(key, braces=True)} {histogram.sum}")
+                    lines.append(f"{name}_count{_label_text(key, braces=True)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the Prometheus text atomically (e.g. for node_exporter's textfile collector)"""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics file {path}: {e}")
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _header(lines: list, name: str, kind: str):
+        if name in METRIC_HELP:
+            lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+class StageTimer:
+    """Times the stages of one operation, keeping them for the caller and recording each in a histogram"""
+
+    def __init__(self, registry: MetricsRegistry, name: str):
+        self.registry = registry
+        self.name = name
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage: str, seconds: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        self.registry.observe(self.name, seconds, stage=stage)
+
+    def rounded(self, digits: int = 4) -> Dict[str, float]:
+        return {stage: round(seconds, digits) for stage, seconds in self.timings.items()}
+
+
+def _label_text(key: LabelKey, braces: bool = False) -> str:
+    """Prometheus label set ({a="b"}), or a plain "a=b" key for snapshots"""
+    if not key:
+        return "" if braces else "all"
+    if not braces:
+        return ",".join(f"{label}={value}" for label, value in key)
+    return "{" + ",".join(f'{label}="{_escape(str(value))}"' for label, value in key) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide registry shared by the pipeline, ingestion and the API server"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
@@ -1,29 +1,22 @@
-import requests
 from config import Config
+from ollama_client import get_ollama_client
 
 class ModelManager:
     def __init__(self):
         self.ollama_url = Config.OLLAMA_URL
+        self.ollama = get_ollama_client()
     
     def get_available_models(self):
         """Get list of available models from Ollama"""
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=10)
-            if response.status_code == 200:
-                return [model["name"] for model in response.json().get("models", [])]
-            return []
+            return self.ollama.list_models()
         except:
             return []
     
     def pull_model(self, model_name):
         """Pull a new model from Ollama"""
         try:
-            response = requests.post(
-                f"{self.ollama_url}/api/pull",
-                json={"name": model_name},
-                timeout=300  # 5 minute timeout for model download
-            )
-            return response.status_code == 200
+            return self.ollama.pull_model(model_name, timeout=300)  # 5 minute timeout for model download
         except:
             return False
     
@@ -0,0 +1,64 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """On-disk OCR results keyed by (file hash, page, DPI, Tesseract language/options).
+
+    Shared by all ingest worker processes through SQLite in WAL mode. The
+    OCR time of each entry is stored with it so hits can report the
+    seconds they saved.
+    """
+
+    def __init__(self, cache_path: str = None, lang: str = None, config: str = None):
+        self.cache_path = cache_path or Config.OCR_CACHE_PATH
+        self.lang = lang if lang is not None else Config.OCR_LANG
+        self.config = config if config is not None else Config.OCR_CONFIG
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        # Several worker processes write concurrently; wait for the lock rather than fail
+        self.conn = sqlite3.connect(self.cache_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS ocr (
+                key TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                seconds REAL NOT NULL,
+                created REAL NOT NULL
+            )"""
+        )
+        self.conn.commit()
+
+    def key(self, file_hash: str, page: int, dpi: int) -> str:
+        """Cache key for one page of a file under the current OCR settings"""
+        raw = f"{file_hash}\0{page}\0{dpi}\0{self.lang}\0{self.config}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """(text, seconds the OCR originally took), or None"""
+        with self._lock:
+            return self.conn.execute("SELECT text, seconds FROM ocr WHERE key = ?", (key,)).fetchone()
+
+    def put(self, key: str, text: str, seconds: float):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr (key, text, seconds, created) VALUES (?, ?, ?, ?)",
+                (key, text, seconds, time.time())
+            )
+            self.conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM ocr").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,213 @@
+import json
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Iterator, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaError(Exception):
+    """Ollama returned an error response"""
+
+
+class OllamaUnavailableError(OllamaError):
+    """Ollama could not be reached (or the circuit breaker is open)"""
+
+
+class OllamaTimeoutError(OllamaError):
+    """Ollama did not answer within the configured timeout"""
+
+
+class CircuitBreaker:
+    """Fails fast after repeated connection failures.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected immediately. Once reset_timeout has passed a single trial
+    call is let through; success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = None, reset_timeout: float = None):
+        self.failure_threshold = failure_threshold or Config.OLLAMA_CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or Config.OLLAMA_CIRCUIT_RESET_TIMEOUT
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_progress or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial_in_progress:
+                    logger.warning(f"Ollama circuit opened after {self.failures} failures")
+                self.opened_at = time.time()
+            self._trial_in_progress = False
+
+
+class OllamaClient:
+    """Pooled keep-alive HTTP client for the Ollama API.
+
+    Connection failures and 5xx responses are retried with exponential
+    backoff and jitter (up to Config.OLLAMA_MAX_RETRIES attempts); a circuit
+    breaker makes calls fail fast while Ollama is down.
+    """
+
+    def __init__(self, base_url: str = None, timeout: float = None, max_retries: int = None,
+                 pool_size: int = None):
+        self.base_url = (base_url or Config.OLLAMA_URL).rstrip("/")
+        self.timeout = timeout or Config.OLLAMA_TIMEOUT
+        self.max_retries = max(1, max_retries or Config.OLLAMA_MAX_RETRIES)
+        self.breaker = CircuitBreaker()
+
+        pool_size = pool_size or Config.OLLAMA_POOL_SIZE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate(self, prompt: str, model: str = None, options: Dict = None) -> Dict:
+        """Blocking /api/generate call; returns Ollama's full JSON response"""
+        response = self._request("POST", "/api/generate", json=self._generate_body(prompt, model, options, False))
+        return response.json()
+
+    def generate_stream(self, prompt: str, model: str = None, options: Dict = None) -> Iterator[Dict]:
+        """Streaming /api/generate call; yields each NDJSON chunk.
+
+        Only establishing the stream is retried; a failure mid-stream raises.
+        """
+        response = self._request(
+            "POST", "/api/generate", json=self._generate_body(prompt, model, options, True), stream=True
+        )
+        with response:
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    yield chunk
+                    if chunk.get("done"):
+                        return
+            except requests.exceptions.Timeout as e:
+                raise OllamaTimeoutError(str(e)) from e
+            except requests.exceptions.RequestException as e:
+                raise OllamaUnavailableError(str(e)) from e
+
+    def list_models(self, timeout: float = 10) -> List[str]:
+        """Names of the models installed in Ollama"""
+        response = self._request("GET", "/api/tags", timeout=timeout)
+        return [model["name"] for model in response.json().get("models", [])]
+
+    def pull_model(self, model_name: str, timeout: float = 300) -> bool:
+        """Pull a model (blocking until the download completes)"""
+        response = self._request("POST", "/api/pull", json={"name": model_name, "stream": False}, timeout=timeout)
+        return response.status_code == 200
+
+    def is_available(self) -> bool:
+        """Whether Ollama answers /api/tags"""
+        try:
+            self._request("GET", "/api/tags", timeout=10, retry=False)
+            return True
+        except OllamaError:
+            return False
+
+    def _generate_body(self, prompt: str, model: Optional[str], options: Optional[Dict], stream: bool) -> Dict:
+        body = {"model": model or Config.OLLAMA_MODEL, "prompt": prompt, "stream": stream}
+        if options:
+            body["options"] = options
+        return body
+
+    def _request(self, method: str, path: str, timeout: float = None, retry: bool = True,
+                 **kwargs) -> requests.Response:
+        """Send a request with retries, backoff and the circuit breaker"""
+        url = f"{self.base_url}{path}"
+        timeout = (Config.OLLAMA_CONNECT_TIMEOUT, timeout or self.timeout)
+        attempts = self.max_retries if retry else 1
+        last_error = None
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                raise OllamaUnavailableError("Ollama circuit breaker is open")
+
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+                if response.status_code >= 500:
+                    response.close()
+                    raise requests.exceptions.HTTPError(f"{response.status_code} from Ollama", response=response)
+                if response.status_code >= 400:
+                    self.breaker.record_success()  # Ollama is up; the request itself was bad
+                    raise OllamaError(f"Ollama returned {response.status_code}: {response.text[:200]}")
+                self.breaker.record_success()
+                return response
+
+            # ConnectTimeout is also a Timeout, but nothing was sent yet, so it is retried
+            # like a refused connection (this clause must come before the Timeout one)
+            except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError,
+                    requests.exceptions.HTTPError) as e:
+                self.breaker.record_failure()
+                last_error = e
+                if attempt < attempts - 1:
+                    delay = self._backoff(attempt)
+                    logger.warning(f"Ollama request failed ({e}), attempt {attempt + 1}/{attempts}, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+
+            except requests.exceptions.Timeout as e:
+                # Retrying a generation that timed out would just time out again
+                self.breaker.record_failure()
+                raise OllamaTimeoutError(f"Ollama request timed out after {timeout[1]}s") from e
+
+            except requests.exceptions.RequestException as e:
+                # Broken or undecodable responses, redirect loops: counted against the
+                # breaker so a half-open trial never stays in progress
+                self.breaker.record_failure()
+                raise OllamaUnavailableError(f"Ollama request failed: {e}") from e
+
+        raise OllamaUnavailableError(f"Ollama request failed after {attempts} attempts: {last_error}")
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Exponential backoff with equal jitter"""
+        delay = min(Config.OLLAMA_BACKOFF_MAX, Config.OLLAMA_BACKOFF_BASE * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+_client: Optional[OllamaClient] = None
+_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClient:
+    """Process-wide shared client, so all callers reuse one connection pool"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
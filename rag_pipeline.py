@@ -1,12 +1,26 @@
+import os
+import json
 import logging
-import requests
+import hashlib
+import threading
 import time
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterator, Optional, Tuple
 from document_processor import DocumentProcessor
 from vector_db import VectorDatabase
-from config import Config
+from ingest_manifest import IngestManifest
+from collection_registry import (active_collection, collection_paths, new_collection_name, collection_lock,
+                                 CollectionLockedError)
+from ingest_pipeline import IngestPipeline
+from query_cache import TTLCache
+from context_packer import ContextPacker
+from ollama_client import get_ollama_client, OllamaTimeoutError, OllamaUnavailableError
+from metrics import get_metrics, StageTimer
+from reranker import CrossEncoderReranker
+from config import Config, initialize_directories
 
 # Configure logging
+os.makedirs(Config.LOG_DIR, exist_ok=True)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -18,57 +32,264 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Answers returned when Ollama could not produce a response (never cached)
+OLLAMA_ERROR_MESSAGES = {
+    "connection": "I apologize, but I'm unable to connect to the AI service. Please check if Ollama is running.",
+    "timeout": "The request took too long to process. Please try again with a more specific question.",
+    "unexpected": "I encountered an unexpected error while processing your request. Please try again.",
+    "unavailable": "I'm unable to process your request at this time. Please try again later."
+}
+
 class RAGPipeline:
     def __init__(self):
         logger.info("Initializing RAG Pipeline with Balanced Mode...")
+        initialize_directories()
+        # The embedding model and vector store load on first use, so stats and
+        # maintenance commands don't pay for them
         self.processor = DocumentProcessor()
         self.vector_db = VectorDatabase()
-        self.retry_attempts = 3
-        self.retry_delay = 2
+        self.manifest = IngestManifest(collection_paths(active_collection())["manifest"])
+        self.last_ingest_report = {}
+        self._ingest_lock = threading.Lock()  # one ingest or reindex at a time
+        self.context_packer = ContextPacker()
+        self.answer_cache = TTLCache(Config.ANSWER_CACHE_SIZE, Config.ANSWER_CACHE_TTL)
+        self._answer_cache_version = self.vector_db.version
+        self.ollama = get_ollama_client()
+        # Caps generations in flight so concurrent callers queue instead of overloading Ollama
+        self.generation_slots = threading.BoundedSemaphore(Config.OLLAMA_MAX_CONCURRENT_REQUESTS)
+        self.metrics = get_metrics()
+        self.reranker = CrossEncoderReranker() if Config.RERANK_ENABLED else None  # model loads on first use
         logger.info("RAG Pipeline initialized successfully in Balanced Mode")
 
-    def ingest_documents(self, directory_path: str = None) -> bool:
-        """Ingest documents from directory into vector database"""
+    def ingest_documents(self, directory_path: str = None, force: bool = False, workers: int = None) -> bool:
+        """Ingest new and modified documents from directory into vector database.
+
+        Files whose size, mtime and content hash match the ingest manifest are
+        skipped, and chunks belonging to files that disappeared are deleted.
+        Pass force=True to re-ingest every file. Extraction runs in a pool of
+        `workers` processes (defaults to Config.INGEST_WORKERS).
+        """
+        with self._ingest_lock:
+            directory = directory_path or Config.KNOWLEDGE_BASE_DIR
+            logger.info(f"Ingesting documents from: {directory}")
+            
+            try:
+                self._sync_manifest()
+                file_paths = self.processor.list_documents(directory)
+                # Files outside the directory are not being ingested, so they are not "removed"
+                plan = self.manifest.plan(file_paths, force=force, directory=directory)
+                summary = plan.summary()
+                logger.info(
+                    f"Ingest plan: {summary['new']} new, {summary['modified']} modified, "
+                    f"{summary['unchanged']} unchanged, {summary['removed']} removed"
+                )
+                
+                # Drop chunks of files that no longer exist
+                for entry in plan.removed:
+                    self.vector_db.delete_documents(entry["chunk_ids"])
+                    self.manifest.remove(entry["path"])
+                
+                # Stream changed files through extract -> embed -> upsert
+                cache_before = self.vector_db.get_cache_stats()
+                pipeline = IngestPipeline(self.processor, self.vector_db, self.manifest)
+                result = pipeline.run(plan.changed, directory, workers)
+                total_chunks = result["chunks"]
+                failed = result["failed"]
+                self._log_cache_usage(cache_before, self.vector_db.get_cache_stats())
+                self._log_ocr_cache_usage(result["ocr"])
+                
+                self.last_ingest_report = {
+                    "new": summary["new"],
+                    "updated": summary["modified"],
+                    "skipped": summary["unchanged"],
+                    "deleted": summary["removed"],
+                    "failed": failed,
+                    "quarantined": result["quarantined"],
+                    "chunks": total_chunks,
+                    "ocr": result["ocr"]
+                }
+                
+                if not file_paths and not plan.removed:
+                    logger.warning("No documents found or processed")
+                    return False
+                
+                logger.info(
+                    f"Ingestion complete! {self.last_ingest_report['new']} new, "
+                    f"{self.last_ingest_report['updated']} updated, {self.last_ingest_report['skipped']} skipped, "
+                    f"{self.last_ingest_report['deleted']} deleted, {failed} failed "
+                    f"({total_chunks} chunks) from {directory}"
+                )
+                if result["quarantined"]:
+                    logger.warning(
+                        f"{result['quarantined']} files exceeded ingestion limits, see {Config.INGEST_QUARANTINE_PATH}"
+                    )
+                return failed == 0
+                
+            except Exception as e:
+                logger.error(f"Document ingestion failed: {e}")
+                return False
+            finally:
+                self.write_metrics()
+
+    def reindex(self, directory_path: str = None, workers: int = None, drop_delay: float = None,
+                drop_previous: bool = True) -> bool:
+        """Rebuild the whole index without interrupting queries.
+
+        Every file (of the knowledge base and INGEST_ALLOWED_DIRS, unless
+        directory_path is given) is ingested into a new versioned collection while the
+        current one keeps serving. If the new collection's counts check out it
+        becomes the active one in a single step, and the old collection is
+        dropped in the background after drop_delay seconds (default
+        Config.REINDEX_DROP_DELAY), or left for the next reindex to drop when
+        drop_previous is False. Otherwise the new collection is deleted and
+        nothing changes.
+        """
+        with self._ingest_lock:
+            try:
+                with collection_lock():
+                    return self._reindex(directory_path, workers, drop_delay, drop_previous)
+            except CollectionLockedError as e:
+                logger.error(f"Reindex not started: {e}")
+                return False
+
+    def _reindex(self, directory_path: str, workers: int, drop_delay: float, drop_previous: bool) -> bool:
         directory = directory_path or Config.KNOWLEDGE_BASE_DIR
-        logger.info(f"Ingesting documents from: {directory}")
+        self._sync_manifest()
+        self.vector_db.drop_stale_collections()
+        previous = self.vector_db.collection
+        previous_count = self.vector_db.get_collection_stats()
+        name = new_collection_name()
+        logger.info(f"Reindexing {directory} into collection {name}; {previous} ({previous_count} chunks) "
+                    f"keeps serving until it is ready")
         
+        shadow_db = self.vector_db.shadow(name)
+        shadow_manifest = IngestManifest(collection_paths(name)["manifest"])
+        swapped = False
         try:
-            # Process documents
-            chunks = self.processor.process_directory(directory)
+            file_paths = self.processor.list_documents(directory)
+            if directory_path is None:
+                # The new collection replaces everything, including files ingested from other roots
+                for root in Config.INGEST_ALLOWED_DIRS:
+                    file_paths += self.processor.list_documents(root)
+            plan = shadow_manifest.plan(file_paths, force=True)
+            cache_before = self.vector_db.get_cache_stats()
+            result = IngestPipeline(self.processor, shadow_db, shadow_manifest).run(plan.changed, directory, workers)
+            self._log_cache_usage(cache_before, self.vector_db.get_cache_stats())
+            self._log_ocr_cache_usage(result["ocr"])
             
-            if not chunks:
-                logger.warning("No documents found or processed")
+            problem = self._validate_collection(shadow_db, shadow_manifest, result, previous_count)
+            self.last_ingest_report = {
+                "new": len(plan.changed),
+                "updated": 0,
+                "skipped": 0,
+                "deleted": 0,
+                "failed": result["failed"],
+                "quarantined": result["quarantined"],
+                "chunks": result["chunks"],
+                "ocr": result["ocr"],
+                "collection": name if problem is None else previous,
+                "previous_collection": previous,
+                "previous_chunks": previous_count,
+                "swapped": problem is None,
+                "validation_error": problem
+            }
+            if problem:
+                logger.error(f"Reindex not activated, still serving {previous}: {problem}")
                 return False
             
-            # Add to vector database
-            self.vector_db.add_documents(chunks)
-            
-            logger.info(f"Ingestion complete! Processed {len(chunks)} chunks from {directory}")
-            return True
+            self.vector_db.swap(shadow_db, drop_delay, drop_previous,
+                                chunks=result["chunks"], files=len(plan.changed))
+            self.manifest.close()
+            self.manifest = shadow_manifest
+            swapped = True
+            logger.info(f"Reindex complete: {result['chunks']} chunks from {len(plan.changed)} files "
+                        f"({result['failed']} failed) now served from {name}")
+            return result["failed"] == 0
             
         except Exception as e:
-            logger.error(f"Document ingestion failed: {e}")
+            logger.error(f"Reindex failed, still serving {previous}: {e}")
             return False
+        finally:
+            if not swapped:
+                shadow_manifest.close()
+                shadow_db.drop_collection()
+            self.write_metrics()
+
+    @staticmethod
+    def _validate_collection(vector_db: VectorDatabase, manifest: IngestManifest, result: Dict,
+                             previous_count: int) -> Optional[str]:
+        """Why a rebuilt collection must not be activated, or None when its counts are consistent"""
+        count = vector_db.get_collection_stats()
+        if count != result["chunks"]:
+            return f"collection holds {count} chunks but {result['chunks']} were written"
+        recorded = sum(len(entry["chunk_ids"]) for entry in manifest.entries())
+        if recorded != count:
+            return f"manifest records {recorded} chunks but the collection holds {count}"
+        if vector_db.lexical_index is not None and vector_db.lexical_index.count() != count:
+            return f"lexical index holds {vector_db.lexical_index.count()} chunks, not {count}"
+        if count == 0:
+            return "no chunks were stored"
+        if count < previous_count * Config.REINDEX_MIN_COUNT_RATIO:
+            return (f"{count} chunks is under {Config.REINDEX_MIN_COUNT_RATIO:.0%} of the {previous_count} "
+                    f"being served")
+        return None
+
+    def _sync_manifest(self):
+        """Reopen the manifest if another process swapped in a new collection"""
+        self.vector_db.backend  # opens the collection, following any swap
+        manifest_path = collection_paths(self.vector_db.collection)["manifest"]
+        if self.manifest.manifest_path != manifest_path:
+            self.manifest.close()
+            self.manifest = IngestManifest(manifest_path)
+
+    def write_metrics(self):
+        """Write the metrics in Prometheus text format to Config.METRICS_FILE (if set)"""
+        if Config.METRICS_FILE:
+            self.metrics.write(Config.METRICS_FILE)
+
+    def _log_cache_usage(self, before: Dict, after: Dict):
+        """Log embedding cache hit rate for one ingestion run"""
+        if not after:
+            return
+        hits = after["hits"] - before.get("hits", 0)
+        misses = after["misses"] - before.get("misses", 0)
+        lookups = hits + misses
+        if lookups:
+            logger.info(
+                f"Embedding cache: {hits}/{lookups} hits ({hits / lookups:.1%}), "
+                f"{after['entries']} entries cached"
+            )
 
-    def query(self, question: str, top_k: int = 5) -> Dict:
-        """Query the RAG system with balanced approach"""
+    def _log_ocr_cache_usage(self, ocr: Dict):
+        """Log OCR cache hit rate and time saved for one ingestion run"""
+        pages = ocr["hits"] + ocr["misses"]
+        if pages:
+            logger.info(
+                f"OCR cache: {ocr['hits']}/{pages} pages hit ({ocr['hits'] / pages:.1%}), "
+                f"saved {ocr['seconds_saved']:.1f}s, spent {ocr['seconds_spent']:.1f}s on OCR"
+            )
+
+    def query(self, question: str, top_k: int = 5, query_embedding=None, partitions: List[str] = None) -> Dict:
+        """Query the RAG system with balanced approach.
+
+        partitions limits retrieval to those sites (top-level knowledge base
+        directories), searched in parallel; None searches everything.
+        """
         logger.info(f"Processing query: {question}")
         
         start_time = time.time()
+        timer = self.metrics.stages("rag_query_stage_seconds")
         
         try:
             # Search for relevant context in knowledge base
-            relevant_docs = self.vector_db.search_similar(question, top_k)
+            relevant_docs = self._retrieve(question, top_k, query_embedding, timer, partitions)
             context_used = bool(relevant_docs)
             
-            # Build context from relevant documents
-            context = self._build_context(relevant_docs)
-            
-            # Generate response using balanced approach
-            answer = self._generate_response(question, context, context_used)
+            answer, cached = self._answer(question, relevant_docs, timer)
             
             # Calculate response time
             response_time = time.time() - start_time
+            self._record_query(response_time, "cached" if cached else "answered")
             
             return {
                 "answer": answer,
@@ -76,20 +297,241 @@ class RAGPipeline:
                 "relevant_chunks": relevant_docs,
                 "context_used": context_used,
                 "confidence": self._calculate_confidence(relevant_docs),
-                "response_time": round(response_time, 2)
+                "cached": cached,
+                "response_time": round(response_time, 2),
+                "timings": timer.rounded()
             }
             
         except Exception as e:
             logger.error(f"Query processing failed: {e}")
+            self._record_query(time.time() - start_time, "error")
             return {
                 "answer": "I apologize, but I'm experiencing technical difficulties. Please try again later.",
                 "sources": [],
                 "context_used": False,
                 "confidence": 0.0,
+                "cached": False,
+                "response_time": round(time.time() - start_time, 2),
+                "error": str(e)
+            }
+
+    def _answer(self, question: str, relevant_docs: List[Dict], timer: StageTimer = None) -> Tuple[str, bool]:
+        """Generate (or reuse) the answer for a question and its packed context"""
+        timer = timer or self.metrics.stages("rag_query_stage_seconds")
+        # Same question over the same retrieved chunks: reuse the answer
+        cache_key = self._answer_cache_key(question, relevant_docs)
+        answer = self.answer_cache.get(cache_key)
+        if answer is not None:
+            return answer, True
+        
+        # Build context from relevant documents
+        with timer.stage("prompt"):
+            prompt = self._build_prompt(question, self._build_context(relevant_docs), bool(relevant_docs))
+        
+        # Generate response using balanced approach
+        answer = self._generate_response(prompt, timer)
+        if answer not in OLLAMA_ERROR_MESSAGES.values():
+            self.answer_cache.put(cache_key, answer)
+        return answer, False
+
+    def bulk_query(self, input_path: str, output_path: str, top_k: int = 5, concurrency: int = None) -> int:
+        """Answer questions from a JSONL file, writing one JSON answer per line.
+
+        Each input line is an object with a "question" (and optionally an
+        "id"). Questions are retrieved in batches with one embedding call and
+        one vector DB query per batch, and answers are generated with up to
+        `concurrency` Ollama requests in flight. Returns the number answered.
+        """
+        concurrency = concurrency or Config.OLLAMA_MAX_CONCURRENT_REQUESTS
+        answered = 0
+        
+        with open(input_path, "r", encoding="utf-8") as infile, \
+                open(output_path, "w", encoding="utf-8") as outfile, \
+                ThreadPoolExecutor(max_workers=concurrency) as executor:
+            batch = []
+            for line_number, line in enumerate(infile, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+                    record.setdefault("id", line_number)
+                    record["question"] = record.get("question") or record["query"]
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"Skipping line {line_number} of {input_path}: {e}")
+                    continue
+                
+                batch.append(record)
+                if len(batch) >= Config.BULK_QUERY_BATCH_SIZE:
+                    answered += self._bulk_answer_batch(batch, top_k, executor, outfile)
+                    batch = []
+            
+            if batch:
+                answered += self._bulk_answer_batch(batch, top_k, executor, outfile)
+        
+        logger.info(f"Bulk query complete: {answered} answers written to {output_path}")
+        self.write_metrics()
+        return answered
+
+    def _bulk_answer_batch(self, records: List[Dict], top_k: int, executor: ThreadPoolExecutor, outfile) -> int:
+        """Retrieve for a batch of questions at once, then generate answers concurrently"""
+        start_time = time.time()
+        questions = [record["question"] for record in records]
+        with self.metrics.timer("rag_bulk_search_seconds"):
+            results = self.vector_db.search_similar_batch(questions, self._candidate_count(top_k))
+        if self.reranker is not None:
+            results = [self.reranker.rerank(question, docs, self._rerank_keep(top_k))
+                       for question, docs in zip(questions, results)]
+        packed = [self.context_packer.pack(docs) for docs in results]
+        
+        futures = [executor.submit(self._answer, question, docs) for question, docs in zip(questions, packed)]
+        for record, docs, future in zip(records, packed, futures):
+            try:
+                answer, cached = future.result()
+                error = None
+            except Exception as e:
+                logger.error(f"Bulk query failed for {record['id']}: {e}")
+                answer, cached, error = "", False, str(e)
+            
+            output = {
+                "id": record["id"],
+                "question": record["question"],
+                "answer": answer,
+                "sources": list(set(doc["metadata"]["source"] for doc in docs)),
+                "confidence": self._calculate_confidence(docs),
+                "cached": cached
+            }
+            if error:
+                output["error"] = error
+            outfile.write(json.dumps(output, default=float) + "\n")
+        outfile.flush()
+        
+        logger.info(f"Answered {len(records)} questions in {time.time() - start_time:.1f}s")
+        return len(records)
+
+    def query_stream(self, question: str, top_k: int = 5, query_embedding=None,
+                     partitions: List[str] = None) -> Iterator[Dict]:
+        """Query the RAG system, yielding the answer as it is generated.
+
+        Yields a "metadata" event (sources, confidence) before generation
+        starts, then "token" events, then a "done" event with the full answer,
+        response_time and time_to_first_token. partitions works as in query.
+        """
+        logger.info(f"Processing streaming query: {question}")
+        
+        start_time = time.time()
+        timer = self.metrics.stages("rag_query_stage_seconds")
+        
+        try:
+            relevant_docs = self._retrieve(question, top_k, query_embedding, timer, partitions)
+            context_used = bool(relevant_docs)
+            
+            cache_key = self._answer_cache_key(question, relevant_docs)
+            cached_answer = self.answer_cache.get(cache_key)
+            
+            yield {
+                "type": "metadata",
+                "sources": list(set(doc["metadata"]["source"] for doc in relevant_docs)),
+                "relevant_chunks": relevant_docs,
+                "context_used": context_used,
+                "confidence": self._calculate_confidence(relevant_docs),
+                "cached": cached_answer is not None
+            }
+            
+            if cached_answer is not None:
+                tokens = iter([cached_answer])
+            else:
+                with timer.stage("prompt"):
+                    prompt = self._build_prompt(question, self._build_context(relevant_docs), context_used)
+                tokens = self._stream_with_slot(prompt, timer)
+            
+            parts = []
+            time_to_first_token = None
+            for token in tokens:
+                if time_to_first_token is None:
+                    time_to_first_token = time.time() - start_time
+                parts.append(token)
+                yield {"type": "token", "text": token}
+            
+            answer = "".join(parts)
+            if cached_answer is None and answer and answer not in OLLAMA_ERROR_MESSAGES.values():
+                self.answer_cache.put(cache_key, answer)
+            
+            response_time = time.time() - start_time
+            self._record_query(response_time, "cached" if cached_answer is not None else "answered")
+            yield {
+                "type": "done",
+                "answer": answer,
+                "response_time": round(response_time, 2),
+                "time_to_first_token": round(time_to_first_token, 2) if time_to_first_token is not None else None,
+                "timings": timer.rounded()
+            }
+            
+        except Exception as e:
+            logger.error(f"Streaming query failed: {e}")
+            self._record_query(time.time() - start_time, "error")
+            yield {
+                "type": "error",
+                "answer": "I apologize, but I'm experiencing technical difficulties. Please try again later.",
                 "response_time": round(time.time() - start_time, 2),
                 "error": str(e)
             }
 
+    def _retrieve(self, question: str, top_k: int, query_embedding=None, timer: StageTimer = None,
+                  partitions: List[str] = None) -> List[Dict]:
+        """Search the knowledge base (or some partitions of it) and pack the results into the context budget"""
+        timer = timer or self.metrics.stages("rag_query_stage_seconds")
+        if query_embedding is None and Config.SEARCH_MODE != "lexical":
+            with timer.stage("embed"):
+                query_embedding = self.vector_db.embed_query(question)
+        with timer.stage("search"):
+            relevant_docs = self.vector_db.search_partitions(
+                question, partitions, self._candidate_count(top_k), query_embedding=query_embedding
+            )
+        if self.reranker is not None:
+            with timer.stage("rerank"):
+                relevant_docs = self.reranker.rerank(question, relevant_docs, self._rerank_keep(top_k))
+        with timer.stage("pack"):
+            return self.context_packer.pack(relevant_docs)
+    
+    def _candidate_count(self, top_k: int) -> int:
+        """Chunks to retrieve: a wider set when a reranker picks the best of them"""
+        return max(top_k, Config.RERANK_CANDIDATES) if self.reranker is not None else top_k
+    
+    @staticmethod
+    def _rerank_keep(top_k: int) -> int:
+        return max(1, min(top_k, Config.RERANK_TOP_N))
+    
+    def _record_query(self, seconds: float, result: str):
+        self.metrics.inc("rag_queries_total", result=result)
+        self.metrics.observe("rag_query_seconds", seconds)
+    
+    def _record_generation(self, response: Dict, timer: Optional[StageTimer]):
+        """Record Ollama's prefill/decode split from the final response of a generation"""
+        # Durations are in nanoseconds; prompt_eval_* is omitted when the prompt was cached
+        if timer is not None:
+            if response.get("prompt_eval_duration"):
+                timer.record("prefill", response["prompt_eval_duration"] / 1e9)
+            if response.get("eval_duration"):
+                timer.record("decode", response["eval_duration"] / 1e9)
+        self.metrics.inc("ollama_prompt_tokens_total", response.get("prompt_eval_count", 0))
+        self.metrics.inc("ollama_generated_tokens_total", response.get("eval_count", 0))
+
+    def _answer_cache_key(self, question: str, relevant_docs: List[Dict]) -> tuple:
+        """Key on normalized question, retrieved chunk contents and model"""
+        if self.vector_db.version != self._answer_cache_version:
+            # The collection changed in this process: cached answers may cite stale chunks
+            self.answer_cache.clear()
+            self._answer_cache_version = self.vector_db.version
+        
+        chunks = hashlib.sha256()
+        for doc in relevant_docs:
+            chunks.update(doc.get("id", "").encode("utf-8"))
+            chunks.update(doc["text"].encode("utf-8"))
+        return (" ".join(question.lower().split()), chunks.hexdigest(), Config.OLLAMA_MODEL)
+
     def _build_context(self, relevant_docs: List[Dict]) -> str:
         """Build context string from relevant documents"""
         if not relevant_docs:
@@ -105,16 +547,23 @@ class RAGPipeline:
         
         return context
 
-    def _generate_response(self, question: str, context: str, context_used: bool) -> str:
+    def _generate_response(self, prompt: str, timer: StageTimer = None) -> str:
         """Generate response using balanced approach"""
+        start = time.perf_counter()
+        with self.generation_slots:
+            if timer is not None:
+                timer.record("slot_wait", time.perf_counter() - start)
+                with timer.stage("generate"):
+                    return self._query_ollama_with_retry(prompt, timer)
+            return self._query_ollama_with_retry(prompt)
+
+    def _build_prompt(self, question: str, context: str, context_used: bool) -> str:
+        """Pick the knowledge base or general knowledge prompt"""
         if context_used:
             # Use knowledge base content with option to supplement with general knowledge
-            prompt = self._build_knowledge_base_prompt(question, context)
-        else:
-            # No relevant context found, use general knowledge
-            prompt = self._build_general_knowledge_prompt(question)
-        
-        return self._query_ollama_with_retry(prompt)
+            return self._build_knowledge_base_prompt(question, context)
+        # No relevant context found, use general knowledge
+        return self._build_general_knowledge_prompt(question)
 
     def _build_knowledge_base_prompt(self, question: str, context: str) -> str:
         """Build prompt when knowledge base content is available"""
@@ -151,50 +600,64 @@ INSTRUCTIONS:
 
 IT SUPPORT EXPERT ANSWER:"""
 
-    def _query_ollama_with_retry(self, prompt: str) -> str:
-        """Query Ollama with retry logic for reliability"""
-        for attempt in range(self.retry_attempts):
-            try:
-                response = requests.post(
-                    f"{Config.OLLAMA_URL}/api/generate",
-                    json={
-                        "model": Config.OLLAMA_MODEL,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.1,
-                            "top_p": 0.9,
-                            "num_ctx": 4096,
-                            "top_k": 40
-                        }
-                    },
-                    timeout=120
-                )
-                response.raise_for_status()
-                return response.json()["response"]
-                
-            except requests.exceptions.ConnectionError:
-                if attempt < self.retry_attempts - 1:
-                    logger.warning(f"Ollama connection failed, attempt {attempt + 1}/{self.retry_attempts}")
-                    time.sleep(self.retry_delay)
-                    continue
-                else:
-                    logger.error("Ollama connection failed after all retry attempts")
-                    return "I apologize, but I'm unable to connect to the AI service. Please check if Ollama is running."
-                    
-            except requests.exceptions.Timeout:
-                logger.error("Ollama request timed out")
-                return "The request took too long to process. Please try again with a more specific question."
-                
-            except Exception as e:
-                logger.error(f"Unexpected error querying Ollama: {e}")
-                if attempt < self.retry_attempts - 1:
-                    time.sleep(self.retry_delay)
-                    continue
-                else:
-                    return "I encountered an unexpected error while processing your request. Please try again."
+    def _ollama_options(self) -> Dict:
+        """Generation options for Ollama's /api/generate"""
+        return {
+            "temperature": 0.1,
+            "top_p": 0.9,
+            "num_ctx": Config.OLLAMA_NUM_CTX,
+            "top_k": 40
+        }
+
+    def _stream_with_slot(self, prompt: str, timer: StageTimer = None) -> Iterator[str]:
+        """Stream tokens while holding a generation slot"""
+        start = time.perf_counter()
+        with self.generation_slots:
+            if timer is None:
+                yield from self._stream_ollama_with_retry(prompt)
+                return
+            timer.record("slot_wait", time.perf_counter() - start)
+            with timer.stage("generate"):
+                yield from self._stream_ollama_with_retry(prompt, timer)
 
-        return "I'm unable to process your request at this time. Please try again later."
+    def _stream_ollama_with_retry(self, prompt: str, timer: StageTimer = None) -> Iterator[str]:
+        """Yield response tokens from Ollama's NDJSON stream.
+
+        The Ollama client retries until the stream is established; after that
+        a failure ends the stream. Errors are yielded as a single
+        OLLAMA_ERROR_MESSAGES token, like _query_ollama_with_retry returns them.
+        """
+        try:
+            for chunk in self.ollama.generate_stream(prompt, options=self._ollama_options()):
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    self._record_generation(chunk, timer)
+        except OllamaTimeoutError:
+            logger.error("Ollama request timed out")
+            yield OLLAMA_ERROR_MESSAGES["timeout"]
+        except OllamaUnavailableError as e:
+            logger.error(f"Ollama unavailable: {e}")
+            yield OLLAMA_ERROR_MESSAGES["connection"]
+        except Exception as e:
+            logger.error(f"Unexpected error streaming from Ollama: {e}")
+            yield OLLAMA_ERROR_MESSAGES["unexpected"]
+
+    def _query_ollama_with_retry(self, prompt: str, timer: StageTimer = None) -> str:
+        """Query Ollama; retries and backoff are handled by the shared client"""
+        try:
+            response = self.ollama.generate(prompt, options=self._ollama_options())
+            self._record_generation(response, timer)
+            return response["response"]
+        except OllamaTimeoutError:
+            logger.error("Ollama request timed out")
+            return OLLAMA_ERROR_MESSAGES["timeout"]
+        except OllamaUnavailableError as e:
+            logger.error(f"Ollama unavailable: {e}")
+            return OLLAMA_ERROR_MESSAGES["connection"]
+        except Exception as e:
+            logger.error(f"Unexpected error querying Ollama: {e}")
+            return OLLAMA_ERROR_MESSAGES["unexpected"]
 
     def _calculate_confidence(self, relevant_docs: List[Dict]) -> float:
         """Calculate confidence score based on search results"""
@@ -217,6 +680,11 @@ IT SUPPORT EXPERT ANSWER:"""
             db_stats = self.vector_db.get_collection_stats()
             return {
                 "vector_db_count": db_stats,
+                "collection": self.vector_db.collection,
+                "ingested_files": self.manifest.count(),
+                "query_embedding_cache": self.vector_db.query_embedding_cache.stats(),
+                "answer_cache": self.answer_cache.stats(),
+                "metrics": self.metrics.snapshot(),
                 "knowledge_base_path": Config.KNOWLEDGE_BASE_DIR,
                 "mode": "balanced",
                 "ollama_model": Config.OLLAMA_MODEL
@@ -229,10 +697,13 @@ IT SUPPORT EXPERT ANSWER:"""
                 "ollama_model": Config.OLLAMA_MODEL
             }
 
-    def clear_knowledge(self):
-        """Clear all knowledge from vector database"""
+    def clear_knowledge(self, drop_previous: bool = True):
+        """Clear all knowledge from vector database (the old collection and its manifest are dropped whole)"""
         try:
-            self.vector_db.clear_collection()
+            with self._ingest_lock, collection_lock():
+                self._sync_manifest()
+                self.vector_db.clear_collection(drop_previous=drop_previous)
+                self._sync_manifest()  # the new collection's empty manifest
             logger.info("Knowledge base cleared successfully")
         except Exception as e:
             logger.error(f"Failed to clear knowledge base: {e}")
@@ -242,8 +713,7 @@ IT SUPPORT EXPERT ANSWER:"""
         """Check system health"""
         try:
             # Check Ollama
-            ollama_response = requests.get(f"{Config.OLLAMA_URL}/api/tags", timeout=10)
-            ollama_ok = ollama_response.status_code == 200
+            ollama_ok = self.ollama.is_available()
             
             # Check vector database
             vector_db_ok = True  # Simplified check
@@ -251,6 +721,7 @@ IT SUPPORT EXPERT ANSWER:"""
             return {
                 "ollama": "healthy" if ollama_ok else "unavailable",
                 "vector_db": "healthy" if vector_db_ok else "unavailable",
+                "ollama_circuit": self.ollama.breaker.state,
                 "mode": "balanced",
                 "status": "healthy" if ollama_ok and vector_db_ok else "degraded"
             }
@@ -0,0 +1,84 @@
+import time
+import logging
+import threading
+from typing import List, Dict
+from query_cache import LRUCache
+from metrics import get_metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Re-scores retrieved chunks with a small cross-encoder on the CPU.
+
+    The retriever returns a wide candidate set cheaply; the cross-encoder
+    reads each (question, chunk) pair together and keeps only the best
+    top_n, so fewer, more relevant chunks reach the prompt. Scores are
+    cached per (question, chunk id, chunk text). If scoring the uncached
+    candidates runs past the latency budget, reranking is skipped and the
+    retriever's order is kept, as it is when the model fails to load or score.
+    """
+
+    def __init__(self, model_name: str = None, batch_size: int = None, budget_ms: float = None,
+                 cache_size: int = None):
+        self.model_name = model_name or Config.RERANK_MODEL
+        self.batch_size = batch_size or Config.RERANK_BATCH_SIZE
+        self.budget = (budget_ms if budget_ms is not None else Config.RERANK_BUDGET_MS) / 1000.0
+        self.cache = LRUCache(cache_size if cache_size is not None else Config.RERANK_CACHE_SIZE)
+        self.metrics = get_metrics()
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """CrossEncoder, loaded on first use"""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    logger.info(f"Loading reranker model {self.model_name}...")
+                    self._model = CrossEncoder(self.model_name, max_length=Config.RERANK_MAX_LENGTH, device="cpu")
+        return self._model
+
+    def warm_up(self):
+        self.model
+
+    def rerank(self, query: str, docs: List[Dict], top_n: int) -> List[Dict]:
+        """The top_n docs by cross-encoder score (each with "rerank_score"), or docs[:top_n] if over budget
+        or the model fails"""
+        if len(docs) <= 1:
+            return docs[:top_n]
+
+        query_key = " ".join(query.lower().split())
+        keys = [(query_key, doc.get("id", ""), hash(doc["text"])) for doc in docs]
+        scores = [self.cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        start = time.perf_counter()
+        for offset in range(0, len(missing), self.batch_size):
+            if offset and time.perf_counter() - start > self.budget:
+                # Scores computed so far stay cached, so a repeat of this query gets further
+                logger.warning(f"Reranking skipped: {len(missing) - offset} candidates left after "
+                               f"{(time.perf_counter() - start) * 1000:.0f}ms (budget {self.budget * 1000:.0f}ms)")
+                self.metrics.inc("rerank_total", result="over_budget")
+                return docs[:top_n]
+            batch = missing[offset:offset + self.batch_size]
+            try:
+                batch_scores = self.model.predict([(query, docs[i]["text"]) for i in batch],
+                                                  batch_size=self.batch_size, show_progress_bar=False)
+            except Exception as e:
+                # A model that cannot load or score must not fail the query
+                logger.error(f"Reranking skipped, keeping retriever order: {e}")
+                self.metrics.inc("rerank_total", result="error")
+                return docs[:top_n]
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+                self.cache.put(keys[i], scores[i])
+
+        self.metrics.inc("rerank_total", result="reranked" if missing else "cached")
+        ranked = sorted(zip(scores, range(len(docs))), key=lambda item: -item[0])[:top_n]
+        return [{**docs[i], "rerank_score": score} for score, i in ranked]
+
+    def clear(self):
+        self.cache.clear()
@@ -0,0 +1,138 @@
+import os
+import logging
+from typing import List, Dict, Iterator, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 3  # tables tokenize densely (numbers, codes, separators)
+CELL_SEPARATOR = " | "
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return " ".join(str(value).split())
+
+
+def _header(values) -> List[str]:
+    return [_cell(value) or f"column_{i + 1}" for i, value in enumerate(values)]
+
+
+def iter_csv_rows(file_path: str) -> Iterator[Tuple[str, List[str], Iterator[Tuple[int, List[str]]]]]:
+    """Yield one (sheet name, header, rows) table; rows are (line number, cells), read in chunks"""
+    import pandas as pd
+
+    options = dict(dtype=str, keep_default_na=False, encoding_errors="replace")
+    try:
+        columns = pd.read_csv(file_path, nrows=0, **options).columns
+    except pd.errors.EmptyDataError:
+        return  # empty file: no table
+    # pandas names blank header cells "Unnamed: N"
+    header = _header("" if str(name).startswith("Unnamed: ") else name for name in columns)
+
+    with pd.read_csv(file_path, chunksize=Config.TABLE_READ_ROWS, on_bad_lines="warn", **options) as reader:
+        def rows():
+            row_number = 1  # header is row 1
+            for frame in reader:
+                for values in frame.itertuples(index=False, name=None):
+                    row_number += 1
+                    yield row_number, [_cell(value) for value in values]
+
+        yield "", header, rows()
+
+
+def iter_xlsx_rows(file_path: str) -> Iterator[Tuple[str, List[str], Iterator[Tuple[int, List[str]]]]]:
+    """Yield (sheet name, header, rows) for every sheet, streaming rows in read-only mode"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            row_iter = enumerate(sheet.iter_rows(values_only=True), start=1)
+            header = None
+            for row_number, values in row_iter:
+                if any(value is not None and str(value).strip() for value in values):
+                    header = _header(values)
+                    break
+            if header is None:
+                continue  # empty sheet
+
+            def rows(row_iter=row_iter):
+                for row_number, values in row_iter:
+                    yield row_number, [_cell(value) for value in values]
+
+            yield sheet.title, header, rows()
+    finally:
+        workbook.close()
+
+
+class TableChunker:
+    """Chunks CSV/XLSX files by groups of rows without loading them whole.
+
+    Each chunk holds as many consecutive rows as fit in max_tokens (at most
+    max_rows), preceded by the sheet name and the column headers, and
+    records sheet/row_start/row_end (spreadsheet row numbers, header = row
+    1) in its metadata. iter_chunks yields chunks as rows are read, so a
+    file of any size is chunked in constant memory.
+    """
+
+    def __init__(self, max_tokens: int = None, max_rows: int = None):
+        self.max_tokens = max_tokens or Config.CHUNK_MAX_TOKENS
+        self.max_rows = max_rows or Config.TABLE_MAX_ROWS_PER_CHUNK
+
+    def chunk(self, file_path: str, source: str, relative_path: str = None) -> List[Dict]:
+        return list(self.iter_chunks(file_path, source, relative_path))
+
+    def iter_chunks(self, file_path: str, source: str, relative_path: str = None) -> Iterator[Dict]:
+        ext = os.path.splitext(file_path)[1].lower()
+        tables = iter_xlsx_rows(file_path) if ext == ".xlsx" else iter_csv_rows(file_path)
+
+        chunk_id = 0
+        for sheet, header, rows in tables:
+            prefix = (f"Sheet: {sheet}\n" if sheet else "") + CELL_SEPARATOR.join(header)
+            budget = self.max_tokens * CHARS_PER_TOKEN - len(prefix)
+            group: List[str] = []
+            group_chars = 0
+            row_start = row_end = 0
+
+            for row_number, cells in rows:
+                if not any(cells):
+                    continue
+                line = CELL_SEPARATOR.join(cells)
+                if group and (group_chars + len(line) > budget or len(group) >= self.max_rows):
+                    yield self._make_chunk(prefix, group, sheet, row_start, row_end, source, relative_path, chunk_id)
+                    chunk_id += 1
+                    group, group_chars = [], 0
+                if not group:
+                    row_start = row_number
+                group.append(line)
+                group_chars += len(line) + 1
+                row_end = row_number
+
+            if group:
+                yield self._make_chunk(prefix, group, sheet, row_start, row_end, source, relative_path, chunk_id)
+                chunk_id += 1
+
+    @staticmethod
+    def _make_chunk(prefix: str, lines: List[str], sheet: str, row_start: int, row_end: int, source: str,
+                    file_path: str, chunk_id: int) -> Dict:
+        text = prefix + "\n" + "\n".join(lines)
+        return {
+            "text": text,
+            "metadata": {
+                "source": source,
+                "file_path": file_path or source,
+                "chunk_id": chunk_id,
+                "heading": sheet,
+                "category": "table",
+                "sheet": sheet,
+                "row_start": row_start,
+                "row_end": row_end,
+                "page_start": 0,
+                "page_end": 0,
+                "token_count": max(1, len(text) // CHARS_PER_TOKEN)
+            }
+        }
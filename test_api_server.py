@@ -0,0 +1,115 @@
+import os
+import asyncio
+import pytest
+from config import Config
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+import api_server
+
+
+@pytest.fixture
+def client():
+    # Without the context manager the lifespan (model loading) does not run
+    return TestClient(api_server.app)
+
+
+def test_ingest_requires_the_api_key_when_enabled(client, monkeypatch):
+    monkeypatch.setattr(Config, "API_KEY_ENABLED", True)
+    monkeypatch.setattr(Config, "API_KEY", "secret")
+
+    assert client.post("/ingest", json={}).status_code == 401
+    assert client.post("/ingest", json={}, headers={"X-API-Key": "wrong"}).status_code == 401
+    assert client.get("/stats").status_code == 401
+
+
+def test_ingest_rejects_directories_outside_the_allowed_roots(client, tmp_path, monkeypatch):
+    outside = tmp_path / "elsewhere"
+    outside.mkdir()
+
+    assert client.post("/ingest", json={"directory": str(outside)}).status_code == 403
+    assert client.post("/ingest", json={"directory": Config.KNOWLEDGE_BASE_DIR + "/../elsewhere"}).status_code == 403
+
+    monkeypatch.setattr(Config, "INGEST_ALLOWED_DIRS", [str(outside)])
+    assert api_server._allowed_ingest_directory(str(outside / "site"))
+    assert api_server._allowed_ingest_directory(None)
+
+
+def test_allowed_root_named_like_a_knowledge_base_site_is_refused(tmp_path, monkeypatch):
+    root = tmp_path / "Pune"
+    root.mkdir()
+    monkeypatch.setattr(Config, "INGEST_ALLOWED_DIRS", [str(root)])
+    assert api_server._allowed_ingest_directory(str(root))
+
+    os.makedirs(os.path.join(Config.KNOWLEDGE_BASE_DIR, "Pune"))
+    assert not api_server._allowed_ingest_directory(str(root))
+
+
+def test_reindex_of_a_single_directory_is_rejected(client):
+    site = os.path.join(Config.KNOWLEDGE_BASE_DIR, "Pune")
+
+    assert client.post("/ingest", json={"directory": site, "reindex": True}).status_code == 400
+
+
+class StubRag:
+    def query_stream(self, question, top_k, embedding, partitions):
+        yield {"type": "token", "text": "ok"}
+        yield {"type": "done", "answer": "ok"}
+
+
+class StubBatcher:
+    async def embed(self, question):
+        return None
+
+
+@pytest.fixture
+def stub_state(monkeypatch):
+    monkeypatch.setattr(api_server.state, "rag", StubRag())
+    monkeypatch.setattr(api_server.state, "batcher", StubBatcher())
+    monkeypatch.setattr(api_server.state, "pending", 0)
+    return api_server.state
+
+
+def test_query_stream_releases_its_slot(client, stub_state):
+    response = client.post("/query/stream", json={"question": "status?"})
+
+    assert response.text.splitlines() == [
+        '{"type": "token", "text": "ok"}', '{"type": "done", "answer": "ok"}']
+    assert stub_state.pending == 0
+
+
+def test_query_stream_holds_no_slot_until_the_body_is_read(stub_state):
+    response = asyncio.run(api_server.query_stream(api_server.QueryRequest(question="status?")))
+
+    assert response.status_code == 200
+    assert stub_state.pending == 0  # a client disconnecting now leaks nothing
+
+
+def test_query_stream_rejects_when_saturated(client, stub_state, monkeypatch):
+    monkeypatch.setattr(Config, "API_MAX_PENDING_REQUESTS", 0)
+
+    assert client.post("/query/stream", json={"question": "status?"}).status_code == 503
+
+
+def test_metrics_endpoint_serves_the_prometheus_text(client):
+    from metrics import get_metrics
+    get_metrics().observe("api_embed_batch_seconds", 0.004)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE api_embed_batch_seconds histogram" in response.text
+    assert 'api_embed_batch_seconds_bucket{le="0.005"}' in response.text
+
+
+def test_batcher_skips_embedding_in_lexical_mode(monkeypatch):
+    class NoModel:
+        def generate_embeddings(self, texts, use_cache=True):
+            raise AssertionError("lexical search must not embed queries")
+
+    monkeypatch.setattr(Config, "SEARCH_MODE", "lexical")
+    batcher = api_server.QueryEmbeddingBatcher(NoModel())
+
+    assert asyncio.run(batcher.embed("error E-204")) is None
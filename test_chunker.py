@@ -0,0 +1,84 @@
+from chunker import StructuredChunker, TokenCounter
+
+
+class WordCounter(TokenCounter):
+    """One token per word, so sizes in the tests are easy to read"""
+
+    def __init__(self):
+        super().__init__()
+        self._loaded = True  # never load the real tokenizer
+
+    def count(self, text):
+        return len(text.split())
+
+    def split(self, text, max_tokens, overlap):
+        words = text.split()
+        step = max(1, max_tokens - overlap)
+        return [" ".join(words[start:start + max_tokens]) for start in range(0, max(1, len(words) - overlap), step)]
+
+
+def block(text, category="NarrativeText", page=1):
+    return {"text": text, "category": category, "page": page}
+
+
+def chunker(max_tokens=10, overlap_tokens=2):
+    return StructuredChunker(max_tokens=max_tokens, overlap_tokens=overlap_tokens, counter=WordCounter())
+
+
+def test_a_heading_starts_a_chunk_and_labels_the_chunks_after_it():
+    chunks = chunker().chunk([
+        block("intro text"),
+        block("Pump maintenance", "Title"),
+        block("check the seals", page=2),
+        block("Safety", "Title", page=3),
+        block("lock out first", page=3)
+    ], "manual.pdf")
+
+    assert [chunk["text"] for chunk in chunks] == [
+        "intro text", "Pump maintenance\ncheck the seals", "Safety\nlock out first"]
+    assert [chunk["metadata"]["heading"] for chunk in chunks] == ["", "Pump maintenance", "Safety"]
+    assert (chunks[1]["metadata"]["page_start"], chunks[1]["metadata"]["page_end"]) == (1, 2)
+    assert [chunk["metadata"]["chunk_id"] for chunk in chunks] == [0, 1, 2]
+
+
+def test_tables_get_chunks_of_their_own():
+    chunks = chunker().chunk([
+        block("before the table"),
+        block("Readings", "Title"),
+        block("tag pressure P-1 4", "Table"),
+        block("after the table")
+    ], "report.docx")
+
+    assert [(chunk["text"], chunk["metadata"]["category"]) for chunk in chunks] == [
+        ("before the table", "text"), ("tag pressure P-1 4", "table"), ("after the table", "text")]
+    # the bare heading is not a chunk, but still labels the table
+    assert chunks[1]["metadata"]["heading"] == "Readings"
+
+
+def test_elements_are_merged_up_to_max_tokens():
+    chunks = chunker(max_tokens=6).chunk([block("one two three"), block("four five"), block("six seven")], "a.txt")
+
+    assert [chunk["text"] for chunk in chunks] == ["one two three\nfour five", "six seven"]
+    assert [chunk["metadata"]["token_count"] for chunk in chunks] == [5, 2]
+
+
+def test_an_oversized_element_is_split_by_sentence_then_by_window():
+    text = "Open the valve. Check the gauge now. " + " ".join(f"w{i}" for i in range(14))
+    chunks = chunker(max_tokens=6, overlap_tokens=2).chunk([block(text)], "a.txt")
+
+    texts = [chunk["text"] for chunk in chunks]
+    assert texts[:2] == ["Open the valve.", "Check the gauge now."]
+    assert texts[2].split()[-2:] == texts[3].split()[:2]  # windows overlap by overlap_tokens
+    assert all(chunk["metadata"]["token_count"] <= 6 for chunk in chunks)
+    assert set(" ".join(texts).split()) == set(text.split())
+
+
+def test_token_counter_windows_overlap_without_a_tokenizer():
+    counter = TokenCounter()
+    counter._loaded = True  # estimate from words
+    words = [f"w{i}" for i in range(10)]
+
+    pieces = counter.split(" ".join(words), max_tokens=8, overlap=4)
+
+    # 8 tokens ~ 6 words per window, a step of 4 tokens ~ 3 words
+    assert pieces == [" ".join(words[0:6]), " ".join(words[3:9]), " ".join(words[6:10])]
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from compact_store import CompactVectorStore
+from vector_backends import NumpyBackend
+
+
+def fixture_vectors(rows=300, dim=32, seed=7):
+    vectors = np.random.default_rng(seed).standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def fill(store, vectors):
+    ids = [f"doc{i}" for i in range(len(vectors))]
+    store.upsert(ids, vectors, [f"text {i}" for i in range(len(vectors))], [{"site": "Pune"} for _ in ids])
+    return store
+
+
+@pytest.mark.parametrize("quantization, tolerance", [("float16", 1e-3), ("int8", 1 / 127)])
+def test_quantized_rows_round_trip_within_tolerance(tmp_path, quantization, tolerance):
+    vectors = fixture_vectors()
+    store = fill(CompactVectorStore(str(tmp_path / "compact"), quantization=quantization), vectors)
+
+    restored = store._quantized[:len(vectors)].astype(np.float32)
+    if quantization == "int8":
+        restored *= store._scales[:len(vectors), None]
+
+    # int8 rounds each value to half a step of its row's scale (max |value| / 127)
+    assert np.abs(restored - vectors).max() <= tolerance
+    store.close()
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_search_ranking_matches_float32(tmp_path, quantization):
+    vectors = fixture_vectors()
+    queries = fixture_vectors(rows=20, seed=11)
+    exact = fill(NumpyBackend(str(tmp_path / "numpy")), vectors)
+    compact = fill(CompactVectorStore(str(tmp_path / "compact"), quantization=quantization), vectors)
+
+    expected, found = exact.search(queries, 5), compact.search(queries, 5)
+
+    for want, got in zip(expected, found):
+        assert [doc["id"] for doc in got] == [doc["id"] for doc in want]
+        # candidates are re-ranked against the float32 vectors, so scores are exact
+        assert [doc["similarity"] for doc in got] == pytest.approx([doc["similarity"] for doc in want])
+    exact.close()
+    compact.close()
+
+
+def test_reopened_store_keeps_its_quantized_rows(tmp_path):
+    vectors = fixture_vectors(rows=20)
+    fill(CompactVectorStore(str(tmp_path / "compact")), vectors).close()
+
+    reopened = CompactVectorStore(str(tmp_path / "compact"))
+
+    assert reopened.count() == 20
+    assert reopened.search(vectors[3:4], 1)[0][0]["id"] == "doc3"
+    assert reopened.memory_footprint()["scanned_bytes"] == 20 * (32 + 4)
+    reopened.close()
@@ -0,0 +1,63 @@
+from context_packer import ContextPacker, estimate_tokens, HEADER_TOKENS
+
+
+def doc(text, similarity=0.9, source="a.txt", **extra):
+    return {"text": text, "similarity": similarity, "metadata": {"source": source, "file_path": source}, **extra}
+
+
+def test_drops_low_similarity_unless_keyword_match():
+    packer = ContextPacker(token_budget=1000, similarity_threshold=0.6)
+
+    packed = packer.pack([doc("relevant", 0.8), doc("noise", 0.2, "b.txt"), doc("code E-204", 0.1, "c.txt",
+                                                                               lexical_match=True)])
+
+    assert [d["text"] for d in packed] == ["relevant", "code E-204"]
+
+
+def test_orders_by_fused_score_when_present():
+    packer = ContextPacker(token_budget=1000, similarity_threshold=0.0)
+
+    packed = packer.pack([doc("first", 0.9, "a.txt", score=0.01), doc("second", 0.5, "b.txt", score=0.03)])
+
+    assert [d["text"] for d in packed] == ["second", "first"]
+
+
+def test_reranked_chunks_are_ordered_by_rerank_score_and_not_thresholded():
+    packer = ContextPacker(token_budget=1000, similarity_threshold=0.6)
+
+    packed = packer.pack([doc("first", 0.9, "a.txt", score=0.03, rerank_score=-1.5),
+                          doc("second", 0.3, "b.txt", score=0.01, rerank_score=4.2)])
+
+    assert [d["text"] for d in packed] == ["second", "first"]
+
+
+def test_removes_text_shared_by_overlapping_chunks_of_a_file():
+    words = [f"w{i}" for i in range(40)]
+    first = " ".join(words[:30])
+    second = " ".join(words[20:])  # 10 words of overlap with the first chunk
+    packer = ContextPacker(token_budget=1000, similarity_threshold=0.0)
+
+    packed = packer.pack([doc(first, 0.9), doc(second, 0.8), doc(first, 0.7, "other.txt")])
+
+    assert packed[1]["text"] == " ".join(words[30:])
+    assert packed[2]["text"] == first  # same text from another file is kept
+
+
+def test_skips_chunks_contained_in_an_earlier_one():
+    packer = ContextPacker(token_budget=1000, similarity_threshold=0.0)
+
+    packed = packer.pack([doc("a b c d e f g h i j", 0.9), doc("c d e f", 0.8)])
+
+    assert len(packed) == 1
+
+
+def test_stays_within_the_token_budget():
+    budget = 200
+    packer = ContextPacker(token_budget=budget, similarity_threshold=0.0)
+    docs = [doc(" ".join(f"word{i}x{j}" for j in range(60)), 0.9 - i / 100, f"{i}.txt") for i in range(5)]
+
+    packed = packer.pack(docs)
+
+    used = sum(estimate_tokens(d["text"]) + HEADER_TOKENS for d in packed)
+    assert 0 < len(packed) < len(docs)
+    assert used <= budget + HEADER_TOKENS
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from embedding_cache import EmbeddingCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+
+    def tick():
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr("embedding_cache.time.time", tick)
+
+
+def vectors(n, dim=4):
+    return np.arange(n * dim, dtype=np.float32).reshape(n, dim)
+
+
+def test_cache_is_bounded_by_evicting_the_least_recently_used(clock):
+    cache = EmbeddingCache("all-MiniLM-L6-v2", max_entries=10)
+    keys = [cache.key(f"chunk {i}") for i in range(10)]
+    for key, vector in zip(keys, vectors(10)):
+        cache.put_many([key], vector[None])
+    cache.get_many(keys[:3])  # recently used again
+
+    cache.put_many([cache.key("chunk 10")], vectors(1))
+
+    # over capacity: back to max_entries minus a tenth, oldest first
+    assert cache.stats()["entries"] == 9
+    found = cache.get_many(keys)
+    assert set(found) == set(keys[:3] + keys[5:])
+    np.testing.assert_array_equal(found[keys[0]], vectors(10)[0])
+    cache.close()
+
+
+def test_count_survives_reopening_and_duplicates_are_not_counted(clock):
+    cache = EmbeddingCache("all-MiniLM-L6-v2", max_entries=10)
+    key = cache.key("chunk")
+    cache.put_many([key, key], vectors(2))
+    cache.close()
+
+    reopened = EmbeddingCache("all-MiniLM-L6-v2", max_entries=10)
+    assert reopened.stats()["entries"] == 1
+    reopened.close()
+
+
+def test_key_depends_on_the_model_name():
+    minilm, mpnet = EmbeddingCache("all-MiniLM-L6-v2"), EmbeddingCache("all-mpnet-base-v2")
+
+    assert minilm.key("pump seal") != mpnet.key("pump seal")
+
+    minilm.put_many([minilm.key("pump seal")], vectors(1))
+    assert mpnet.get_many([mpnet.key("pump seal")]) == {}
+    assert mpnet.stats()["misses"] == 1
+    minilm.close()
+    mpnet.close()
@@ -0,0 +1,405 @@
+import os
+import pytest
+from config import Config
+from conftest import make_chunks
+from document_processor import DocumentProcessor
+from ingest_manifest import IngestManifest, hash_file
+from ingest_pipeline import IngestPipeline
+
+
+class FakeProcessor:
+    """Returns canned chunk texts (or an error) per file name, like DocumentProcessor.process_files"""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def list_documents(self, directory_path):
+        return DocumentProcessor().list_documents(directory_path)
+
+    def process_files(self, file_paths, base_dir=None, workers=None):
+        def results():
+            for file_path in file_paths:
+                output = self.outputs[os.path.basename(file_path)]
+                if isinstance(output, Exception):
+                    yield DocumentProcessor._failed_result(file_path, str(output))
+                else:
+                    relative = os.path.relpath(file_path, base_dir).replace(os.sep, "/")
+                    yield {"path": file_path, "chunks": make_chunks(relative, output), "error": None,
+                           "seconds": 0.0, "limit": None}
+        return results()
+
+
+def write(name: str, content: str) -> str:
+    path = os.path.join(Config.KNOWLEDGE_BASE_DIR, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+def ingest(processor, vector_db, manifest) -> dict:
+    plan = manifest.plan(DocumentProcessor().list_documents(Config.KNOWLEDGE_BASE_DIR))
+    for entry in plan.removed:
+        vector_db.delete_documents(entry["chunk_ids"])
+        manifest.remove(entry["path"])
+    report = IngestPipeline(processor, vector_db, manifest).run(plan.changed, Config.KNOWLEDGE_BASE_DIR, 1)
+    report["summary"] = plan.summary()
+    return report
+
+
+def test_plan_classifies_new_unchanged_modified_and_removed_files():
+    manifest = IngestManifest()
+    kept, changed, gone = write("kept.txt", "same"), write("changed.txt", "old"), write("gone.txt", "bye")
+    for path in (kept, changed, gone):
+        manifest.record(path, [f"{path}_0"], hash_file(path))
+    os.remove(gone)
+    write("changed.txt", "new and longer")
+    new = write("new.txt", "hello")
+
+    plan = manifest.plan([kept, changed, new])
+
+    assert plan.unchanged == [kept]
+    assert {entry["path"] for entry in plan.changed} == {changed, new}
+    assert [entry["path"] for entry in plan.removed] == [manifest._key(gone)]
+    assert plan.summary() == {"new": 1, "modified": 1, "unchanged": 1, "removed": 1}
+
+
+def test_modified_file_replaces_its_chunks_and_drops_stale_ones(vector_db):
+    manifest = IngestManifest()
+    write("a.txt", "v1")
+    ingest(FakeProcessor({"a.txt": ["pump one", "pump two", "pump three"]}), vector_db, manifest)
+    assert vector_db.get_collection_stats() == 3
+
+    write("a.txt", "version two")
+    report = ingest(FakeProcessor({"a.txt": ["valve only"]}), vector_db, manifest)
+
+    assert report["summary"]["modified"] == 1
+    assert vector_db.get_collection_stats() == 1
+    assert vector_db.lexical_index.count() == 1
+    assert [doc["text"] for doc in vector_db.search_similar("valve", 5, mode="vector")] == ["valve only"]
+    assert manifest.get(os.path.join(Config.KNOWLEDGE_BASE_DIR, "a.txt"))["chunk_ids"] == ["a.txt_0"]
+
+
+def test_removed_file_chunks_are_deleted(vector_db):
+    manifest = IngestManifest()
+    write("a.txt", "a")
+    write("b.txt", "b")
+    ingest(FakeProcessor({"a.txt": ["alpha"], "b.txt": ["beta", "beta two"]}), vector_db, manifest)
+
+    os.remove(os.path.join(Config.KNOWLEDGE_BASE_DIR, "b.txt"))
+    report = ingest(FakeProcessor({"a.txt": ["alpha"]}), vector_db, manifest)
+
+    assert report["summary"] == {"new": 0, "modified": 0, "unchanged": 1, "removed": 1}
+    assert vector_db.get_collection_stats() == 1
+    assert manifest.count() == 1
+
+
+def test_subdirectory_ingest_keeps_files_outside_it(vector_db):
+    from rag_pipeline import RAGPipeline
+    write("Pune/a.txt", "a")
+    write("Delhi/b.txt", "b")
+    rag = RAGPipeline()
+    rag.vector_db = vector_db
+    rag.processor = FakeProcessor({"a.txt": ["alpha"], "b.txt": ["beta"]})
+    rag.ingest_documents()
+
+    assert rag.ingest_documents(os.path.join(Config.KNOWLEDGE_BASE_DIR, "Pune"))
+
+    assert rag.last_ingest_report["deleted"] == 0
+    assert vector_db.get_collection_stats() == 2
+    assert rag.manifest.count() == 2
+    rag.manifest.close()
+
+
+def test_failed_file_keeps_previous_chunks_and_is_retried(vector_db):
+    manifest = IngestManifest()
+    path = write("a.txt", "v1")
+    ingest(FakeProcessor({"a.txt": ["pump one", "pump two"]}), vector_db, manifest)
+    recorded = manifest.get(path)
+
+    write("a.txt", "version two")
+    report = ingest(FakeProcessor({"a.txt": RuntimeError("parser crashed")}), vector_db, manifest)
+
+    assert report["failed"] == 1
+    assert vector_db.get_collection_stats() == 2
+    assert manifest.get(path) == recorded
+    assert [entry["path"] for entry in manifest.plan([path]).changed] == [path]
+
+
+def test_process_file_reports_extraction_errors(monkeypatch):
+    def broken(self, file_path, base_dir=None):
+        raise ValueError("unreadable file")
+
+    monkeypatch.setattr(DocumentProcessor, "extract_chunks", broken)
+    path = write("a.txt", "text")
+
+    result = DocumentProcessor().process_file(path, Config.KNOWLEDGE_BASE_DIR)
+
+    assert result["error"] == "unreadable file"
+    assert result["chunks"] == []
+    assert result["limit"] is None
+
+
+def test_process_files_skips_oversize_files(monkeypatch):
+    monkeypatch.setattr(Config, "MAX_FILE_SIZE", 10)
+    path = write("big.txt", "x" * 100)
+
+    results = list(DocumentProcessor().process_files([path], Config.KNOWLEDGE_BASE_DIR, workers=1))
+
+    assert results[0]["limit"] == "file_size"
+    assert os.path.exists(Config.INGEST_QUARANTINE_PATH)
+
+
+class StreamingProcessor:
+    """Yields a file's chunks in partial results like DocumentProcessor.stream_table, optionally failing at the end"""
+
+    def __init__(self, texts, part_size, error=None):
+        self.texts, self.part_size, self.error = texts, part_size, error
+
+    def process_files(self, file_paths, base_dir=None, workers=None):
+        def results():
+            for file_path in file_paths:
+                chunks = make_chunks(os.path.relpath(file_path, base_dir), self.texts)
+                for i in range(0, len(chunks), self.part_size):
+                    yield {"path": file_path, "chunks": chunks[i:i + self.part_size], "error": None,
+                           "partial": True, "seconds": 0.0, "limit": None}
+                if self.error:
+                    yield DocumentProcessor._failed_result(file_path, self.error)
+                else:
+                    yield {"path": file_path, "chunks": [], "error": None, "seconds": 0.0, "limit": None}
+        return results()
+
+
+def test_streamed_file_is_recorded_with_the_chunks_of_every_part(vector_db):
+    manifest = IngestManifest()
+    path = write("a.csv", "v1")
+
+    report = ingest(StreamingProcessor([f"row {i}" for i in range(5)], part_size=2), vector_db, manifest)
+
+    assert report["chunks"] == 5 and report["failed"] == 0
+    assert manifest.get(path)["chunk_ids"] == [f"a.csv_{i}" for i in range(5)]
+
+
+def test_failed_streamed_file_drops_parts_beyond_its_previous_chunks(vector_db):
+    manifest = IngestManifest()
+    path = write("a.csv", "v1")
+    ingest(StreamingProcessor(["row 0", "row 1"], part_size=2), vector_db, manifest)
+    recorded = manifest.get(path)
+
+    write("a.csv", "version two")
+    report = ingest(StreamingProcessor([f"row {i}" for i in range(5)], 2, error="truncated"), vector_db, manifest)
+
+    assert report["failed"] == 1
+    assert manifest.get(path) == recorded
+    assert vector_db.get_collection_stats() == 2
+
+
+def test_reindex_can_leave_the_old_collection_for_the_next_reindex(vector_db, monkeypatch):
+    from collection_registry import active_collection, list_collections
+    from rag_pipeline import RAGPipeline
+    monkeypatch.setattr(Config, "REINDEX_DROP_DELAY", 0)
+    monkeypatch.setattr(Config, "COLLECTION_CHECK_INTERVAL", 0)
+    write("a.txt", "v1")
+    rag = RAGPipeline()
+    rag.vector_db = vector_db
+    rag.processor = FakeProcessor({"a.txt": ["pump one", "pump two"]})
+    rag.ingest_documents()
+    first = active_collection()
+
+    assert rag.reindex(drop_previous=False)
+    second = active_collection()
+    assert second != first and first in list_collections()
+
+    assert rag.reindex(drop_previous=False)
+    assert first not in list_collections() and second in list_collections()
+    assert vector_db.get_collection_stats() == 2
+    rag.manifest.close()
+
+
+def test_reindex_keeps_a_collection_just_replaced_by_another_process(vector_db):
+    from collection_registry import active_collection, list_collections
+    from rag_pipeline import RAGPipeline
+    write("a.txt", "v1")
+    rag = RAGPipeline()
+    rag.vector_db = vector_db
+    rag.processor = FakeProcessor({"a.txt": ["pump one"]})
+    rag.ingest_documents()
+    first = active_collection()
+
+    assert rag.reindex(drop_previous=False)
+    assert rag.reindex(drop_previous=False)
+
+    # a process that has not yet noticed the first swap may still be querying it
+    assert first in list_collections()
+    rag.manifest.close()
+
+
+def test_reindex_does_not_start_while_another_process_holds_the_lock(vector_db):
+    from collection_registry import collection_lock, collection_paths, list_collections, CollectionLockedError
+    from rag_pipeline import RAGPipeline
+    rag = RAGPipeline()
+    rag.vector_db = vector_db
+    building = "kb_building"
+    os.makedirs(collection_paths(building)["numpy"])
+
+    with collection_lock():
+        assert not rag.reindex()
+        with pytest.raises(CollectionLockedError):
+            rag.clear_knowledge()
+
+    assert building in list_collections()
+    rag.manifest.close()
+
+
+def test_partition_comes_from_the_knowledge_base_not_the_ingested_directory():
+    pytest.importorskip("pandas")
+    path = write("Pune/plant/a.csv", "tag,pressure\nP-1,4\n")
+    processor = DocumentProcessor()
+
+    for base_dir in (Config.KNOWLEDGE_BASE_DIR, os.path.join(Config.KNOWLEDGE_BASE_DIR, "Pune"), None):
+        chunks = processor.extract_chunks(path, base_dir)
+        assert chunks[0]["metadata"][Config.PARTITION_KEY] == "Pune", base_dir
+
+
+def test_files_under_an_allowed_root_are_partitioned_by_its_name(tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    root = tmp_path / "extra"
+    (root / "deep").mkdir(parents=True)
+    (root / "deep" / "a.csv").write_text("tag\nP-1\n", encoding="utf-8")
+    monkeypatch.setattr(Config, "INGEST_ALLOWED_DIRS", [str(root)])
+
+    chunks = DocumentProcessor().extract_chunks(str(root / "deep" / "a.csv"), str(root / "deep"))
+
+    assert chunks[0]["metadata"][Config.PARTITION_KEY] == "extra"
+
+
+def test_subdirectory_ingest_keeps_chunk_ids_relative_to_the_knowledge_base(vector_db):
+    pytest.importorskip("pandas")
+    from rag_pipeline import RAGPipeline
+    path = write("Pune/a.csv", "tag,pressure\nP-1,4\n")
+    rag = RAGPipeline()
+    rag.vector_db = vector_db
+    rag.ingest_documents(workers=1)
+    ids = rag.manifest.get(path)["chunk_ids"]
+
+    assert rag.ingest_documents(os.path.join(Config.KNOWLEDGE_BASE_DIR, "Pune"), force=True, workers=1)
+
+    assert ids == ["Pune/a.csv_0"]
+    assert rag.manifest.get(path)["chunk_ids"] == ids
+    assert vector_db.get_collection_stats() == 1
+    rag.manifest.close()
+
+
+def test_reindex_keeps_files_ingested_from_allowed_roots(vector_db, tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    from rag_pipeline import RAGPipeline
+    root = tmp_path / "extra"
+    root.mkdir()
+    (root / "b.csv").write_text("tag\nV-7\n", encoding="utf-8")
+    monkeypatch.setattr(Config, "INGEST_ALLOWED_DIRS", [str(root)])
+    write("a.csv", "tag\nP-1\n")
+    rag = RAGPipeline()
+    rag.vector_db = vector_db
+    rag.ingest_documents(workers=1)
+    rag.ingest_documents(str(root), workers=1)
+    assert vector_db.get_collection_stats() == 2
+
+    assert rag.reindex(workers=1, drop_previous=False)
+
+    assert {doc["metadata"]["file_path"] for doc in vector_db.search_similar("tag", 5, mode="lexical")} == {
+        "a.csv", "extra/b.csv"}
+    rag.manifest.close()
+
+
+def test_clear_swaps_in_an_empty_collection(vector_db):
+    from collection_registry import active_collection, list_collections
+    vector_db.add_documents(make_chunks("a.txt", ["pump one", "pump two"]))
+    old = active_collection()
+
+    vector_db.clear_collection(drop_delay=0)
+
+    assert active_collection() == vector_db.collection != old
+    assert vector_db.get_collection_stats() == 0
+    assert vector_db.lexical_index.count() == 0
+    assert old not in list_collections()
+
+
+def _config_value(name):
+    return getattr(Config, name)
+
+
+def test_spawned_workers_use_the_parents_config(tmp_path, monkeypatch):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from document_processor import _init_worker, _config_settings
+    quarantine = str(tmp_path / "quarantine.jsonl")
+    monkeypatch.setattr(Config, "INGEST_QUARANTINE_PATH", quarantine)
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(_config_settings(),)) as pool:
+        assert pool.submit(_config_value, "INGEST_QUARANTINE_PATH").result() == quarantine
+
+
+def _misbehaving_extract(self, file_path, base_dir=None):
+    name = os.path.basename(file_path)
+    if name == "hang.txt":
+        import time
+        time.sleep(60)
+    if name == "crash.txt":
+        os._exit(1)
+    if name == "memory.txt":
+        bytearray(2 << 30)
+    return make_chunks(name, [f"{name} text"])
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    import multiprocessing
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("workers must inherit the patched extractor")
+    monkeypatch.setattr(DocumentProcessor, "extract_chunks", _misbehaving_extract)
+    monkeypatch.setattr(Config, "INGEST_ISOLATE_FILES", True)
+
+
+def run_pool(names, timeout=None):
+    paths = [write(name, "x") for name in names]
+    results = list(DocumentProcessor().process_files(paths, Config.KNOWLEDGE_BASE_DIR, workers=2, timeout=timeout))
+    return {os.path.basename(result["path"]): result for result in results}
+
+
+def quarantined():
+    import json
+    with open(Config.INGEST_QUARANTINE_PATH, encoding="utf-8") as f:
+        return {os.path.basename(entry["path"]): entry["limit"] for entry in map(json.loads, f)}
+
+
+def test_a_hung_file_times_out_and_the_batch_finishes(pool):
+    results = run_pool(["a.txt", "hang.txt", "b.txt", "c.txt"], timeout=1)
+
+    assert results["hang.txt"]["limit"] == "timeout" and not results["hang.txt"]["chunks"]
+    assert all(results[name]["chunks"] and results[name]["error"] is None for name in ("a.txt", "b.txt", "c.txt"))
+    assert quarantined() == {"hang.txt": "timeout"}
+
+
+def test_a_crashing_file_is_retried_alone_then_quarantined(pool):
+    results = run_pool(["a.txt", "crash.txt", "b.txt", "c.txt"])
+
+    assert results["crash.txt"]["limit"] == "crash"
+    assert all(results[name]["chunks"] for name in ("a.txt", "b.txt", "c.txt"))
+    assert quarantined() == {"crash.txt": "crash"}
+
+
+def test_a_file_over_the_memory_limit_is_quarantined(pool, monkeypatch):
+    resource = pytest.importorskip("resource")
+    try:
+        with open("/proc/self/statm") as f:
+            address_space = int(f.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        pytest.skip("needs /proc to size the limit above the worker's inherited address space")
+    monkeypatch.setattr(Config, "INGEST_MAX_MEMORY_MB", address_space // 2 ** 20 + 512)
+
+    results = run_pool(["a.txt", "memory.txt", "b.txt"])
+
+    assert results["memory.txt"]["limit"] == "memory"
+    assert results["a.txt"]["chunks"] and results["b.txt"]["chunks"]
+    assert quarantined() == {"memory.txt": "memory"}
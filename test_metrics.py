@@ -0,0 +1,67 @@
+import pytest
+from metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_counts_each_value_in_the_first_bucket_that_holds_it():
+    histogram = Histogram(buckets=(0.1, 1, 10))
+    for value in (0.05, 0.1, 0.5, 1, 3, 50):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 2, 1, 1]  # <=0.1, <=1, <=10, +Inf
+    assert histogram.count == 6
+    assert histogram.sum == pytest.approx(54.65)
+
+
+def test_histogram_quantiles_are_bucket_upper_bounds():
+    histogram = Histogram(buckets=(0.1, 1, 10))
+    for value in [0.05] * 50 + [0.5] * 45 + [5] * 5:
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.95) == 1
+    assert histogram.quantile(0.99) == 10
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_prometheus_text_has_cumulative_buckets_sum_count_and_help():
+    registry = MetricsRegistry()
+    registry.inc("rag_queries_total", result="answered")
+    registry.inc("rag_queries_total", 2, result="cached")
+    registry.observe("rag_query_seconds", 0.3, buckets=(0.1, 1))
+    registry.observe("rag_query_seconds", 2, buckets=(0.1, 1))
+
+    lines = registry.to_prometheus().splitlines()
+
+    assert lines == [
+        "# HELP rag_queries_total Queries answered, by result (answered, cached, error)",
+        "# TYPE rag_queries_total counter",
+        'rag_queries_total{result="answered"} 1',
+        'rag_queries_total{result="cached"} 2',
+        "# HELP rag_query_seconds End-to-end query latency",
+        "# TYPE rag_query_seconds histogram",
+        'rag_query_seconds_bucket{le="0.1"} 0',
+        'rag_query_seconds_bucket{le="1.0"} 1',
+        'rag_query_seconds_bucket{le="+Inf"} 2',
+        "rag_query_seconds_sum 2.3",
+        "rag_query_seconds_count 2",
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc("custom_total", path='C:\\kb\\"a"\nb')
+
+    assert 'custom_total{path="C:\\\\kb\\\\\\"a\\"\\nb"} 1' in registry.to_prometheus()
+
+
+def test_stage_timer_records_each_stage():
+    registry = MetricsRegistry()
+    timer = registry.stages("rag_query_stage_seconds")
+    timer.record("embed", 0.02)
+    timer.record("embed", 0.01)
+    timer.record("search", 0.005)
+
+    assert timer.rounded() == {"embed": 0.03, "search": 0.005}
+    histograms = registry.snapshot()["histograms"]["rag_query_stage_seconds"]
+    assert histograms["stage=embed"]["count"] == 2
+    assert histograms["stage=search"]["count"] == 1
@@ -0,0 +1,90 @@
+import os
+import pytest
+from config import Config
+from conftest import make_chunks
+from document_processor import DocumentProcessor
+from ingest_manifest import IngestManifest
+from ingest_pipeline import IngestPipeline
+from ocr_cache import OCRCache
+
+
+def write(name: str, data: bytes) -> str:
+    path = os.path.join(Config.KNOWLEDGE_BASE_DIR, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+@pytest.fixture
+def ocr_runs(monkeypatch):
+    """Pages OCR'd for real (rendering and Tesseract are replaced)"""
+    runs = []
+
+    def render_and_ocr(self, file_path, page_index):
+        runs.append((os.path.basename(file_path), page_index))
+        return f"page {page_index + 1} text"
+
+    monkeypatch.setattr(DocumentProcessor, "_render_and_ocr", render_and_ocr)
+    return runs
+
+
+def test_identical_bytes_are_served_from_the_cache(ocr_runs):
+    first, copy = write("scan.pdf", b"%PDF scanned"), write("copy-of-scan.pdf", b"%PDF scanned")
+    processor = DocumentProcessor()
+    assert processor._ocr_pdf_pages(first, [0, 1]) == ["page 1 text", "page 2 text"]
+
+    assert processor._ocr_pdf_pages(copy, [0, 1]) == ["page 1 text", "page 2 text"]
+
+    assert sorted(ocr_runs) == [("scan.pdf", 0), ("scan.pdf", 1)]  # the copy never reached Tesseract
+    assert processor.ocr_stats["hits"] == 2 and processor.ocr_stats["misses"] == 2
+
+
+def test_changed_content_is_ocrd_again(ocr_runs):
+    path = write("scan.pdf", b"%PDF v1")
+    DocumentProcessor()._ocr_pdf_pages(path, [0])
+
+    write("scan.pdf", b"%PDF v2")
+    processor = DocumentProcessor()
+    processor._ocr_pdf_pages(path, [0])
+
+    assert len(ocr_runs) == 2
+    assert processor.ocr_stats["misses"] == 1 and processor.ocr_stats["hits"] == 0
+
+
+def test_changed_ocr_settings_are_ocrd_again(ocr_runs, monkeypatch):
+    path = write("scan.pdf", b"%PDF scanned")
+    DocumentProcessor()._ocr_pdf_pages(path, [0])
+
+    monkeypatch.setattr(Config, "OCR_LANG", "deu")
+    DocumentProcessor()._ocr_pdf_pages(path, [0])
+    monkeypatch.setattr(Config, "OCR_DPI", Config.OCR_DPI + 100)
+    DocumentProcessor()._ocr_pdf_pages(path, [0])
+
+    assert len(ocr_runs) == 3
+
+
+def test_cache_key_covers_page_dpi_and_tesseract_options():
+    cache = OCRCache(lang="eng", config="--psm 3")
+    key = cache.key("hash", 0, 300)
+
+    assert key == OCRCache(lang="eng", config="--psm 3").key("hash", 0, 300)
+    assert key not in {cache.key("other", 0, 300), cache.key("hash", 1, 300), cache.key("hash", 0, 200),
+                       OCRCache(lang="deu", config="--psm 3").key("hash", 0, 300),
+                       OCRCache(lang="eng", config="--psm 6").key("hash", 0, 300)}
+
+
+def test_ingest_report_counts_ocr_cache_hits_and_misses(ocr_runs, vector_db, monkeypatch):
+    def extract_chunks(self, file_path, base_dir=None):
+        return make_chunks(os.path.basename(file_path), self._ocr_pdf_pages(file_path, [0]))
+
+    monkeypatch.setattr(DocumentProcessor, "extract_chunks", extract_chunks)
+    write("a.pdf", b"%PDF same scan")
+    write("b.pdf", b"%PDF same scan")
+    manifest = IngestManifest()
+    plan = manifest.plan(DocumentProcessor().list_documents(Config.KNOWLEDGE_BASE_DIR))
+
+    report = IngestPipeline(DocumentProcessor(), vector_db, manifest).run(plan.changed, Config.KNOWLEDGE_BASE_DIR, 1)
+
+    assert (report["ocr"]["hits"], report["ocr"]["misses"]) == (1, 1)
+    assert report["chunks"] == 2
+    manifest.close()
@@ -0,0 +1,87 @@
+import pytest
+import requests
+from ollama_client import CircuitBreaker, OllamaClient, OllamaUnavailableError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("ollama_client.time.time", clock.time)
+    return clock
+
+
+def test_breaker_opens_after_the_failure_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_lets_a_single_trial_through_when_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()  # the trial is still in progress
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.now += 10
+    assert breaker.allow()
+
+
+def test_successful_trial_closes_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+@pytest.mark.parametrize("error", [requests.exceptions.ChunkedEncodingError,
+                                   requests.exceptions.ContentDecodingError,
+                                   requests.exceptions.TooManyRedirects])
+def test_other_request_errors_end_a_half_open_trial(clock, monkeypatch, error):
+    client = OllamaClient(base_url="http://ollama.invalid", max_retries=1)
+    client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    client.breaker.record_failure()
+    clock.now += 10
+
+    def broken(*args, **kwargs):
+        raise error("broken response")
+
+    monkeypatch.setattr(client.session, "request", broken)
+
+    with pytest.raises(OllamaUnavailableError):
+        client._request("GET", "/api/tags")
+    assert client.breaker.state == "open"
+    clock.now += 10
+    assert client.breaker.allow()  # a new trial is possible
@@ -0,0 +1,74 @@
+import sys
+import types
+import pytest
+from config import Config
+from document_processor import DocumentProcessor
+
+TEXT_PAGE = "Pump P-1 maintenance schedule: replace the seals every 2000 operating hours."
+
+
+@pytest.fixture
+def pdf(monkeypatch):
+    """A PDF whose text layer and OCR output are set per test; records the pages sent to OCR"""
+    pdf = types.SimpleNamespace(text_layer=[], ocr_pages=[], hi_res_calls=0)
+
+    def text_layer(file_path):
+        if isinstance(pdf.text_layer, Exception):
+            raise pdf.text_layer
+        return list(pdf.text_layer)
+
+    def ocr_pdf_pages(self, file_path, page_indexes):
+        pdf.ocr_pages.extend(page_indexes)
+        return [f"OCR text of scanned page {i + 1}, long enough to replace the empty text layer" for i in page_indexes]
+
+    def hi_res(self, file_path):
+        pdf.hi_res_calls += 1
+        return []
+
+    monkeypatch.setattr(DocumentProcessor, "_pdf_text_layer", staticmethod(text_layer))
+    monkeypatch.setattr(DocumentProcessor, "_ocr_pdf_pages", ocr_pdf_pages)
+    monkeypatch.setattr(DocumentProcessor, "_extract_pdf_hi_res", hi_res)
+    # unstructured's text heuristics are not needed to check which tier produced a page
+    monkeypatch.setattr(DocumentProcessor, "_text_blocks", staticmethod(
+        lambda text, page=None: [{"text": text, "category": "NarrativeText", "page": page}] if text.strip() else []))
+    return pdf
+
+
+def test_the_text_layer_is_used_when_every_page_has_one(pdf):
+    pdf.text_layer = [TEXT_PAGE, TEXT_PAGE.replace("P-1", "P-2")]
+
+    blocks = DocumentProcessor().extract_pdf_blocks("manual.pdf")
+
+    assert [(block["page"], block["text"]) for block in blocks] == [(1, pdf.text_layer[0]), (2, pdf.text_layer[1])]
+    assert pdf.ocr_pages == [] and pdf.hi_res_calls == 0
+
+
+def test_only_pages_without_a_text_layer_are_ocrd(pdf):
+    pdf.text_layer = [TEXT_PAGE, "", "  12  ", TEXT_PAGE]
+
+    blocks = DocumentProcessor().extract_pdf_blocks("mixed.pdf")
+
+    assert pdf.ocr_pages == [1, 2]
+    assert [block["page"] for block in blocks] == [1, 2, 3, 4]
+    assert blocks[1]["text"].startswith("OCR text of scanned page 2")
+    assert blocks[0]["text"] == TEXT_PAGE
+
+
+def test_a_broken_text_layer_falls_back_to_ocr_of_every_page(pdf, monkeypatch):
+    pdf.text_layer = ValueError("damaged xref table")
+    monkeypatch.setitem(sys.modules, "pdf2image", types.SimpleNamespace(
+        pdfinfo_from_path=lambda file_path, poppler_path=None: {"Pages": 3}))
+
+    blocks = DocumentProcessor().extract_pdf_blocks("damaged.pdf")
+
+    assert pdf.ocr_pages == [0, 1, 2]
+    assert len(blocks) == 3
+
+
+def test_hi_res_strategy_skips_the_tiers(pdf, monkeypatch):
+    monkeypatch.setattr(Config, "PDF_EXTRACTION_STRATEGY", "hi_res")
+    pdf.text_layer = [TEXT_PAGE]
+
+    DocumentProcessor().extract_pdf_blocks("manual.pdf")
+
+    assert pdf.hi_res_calls == 1 and pdf.ocr_pages == []
@@ -0,0 +1,53 @@
+from query_cache import LRUCache, TTLCache
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")  # "b" is now the oldest
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2
+
+
+def test_lru_put_refreshes_an_existing_key():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    cache.put("c", 3)
+
+    assert cache.get("a") == 10 and cache.get("b") is None
+
+
+def test_lru_counts_hits_and_misses():
+    cache = LRUCache(4)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("missing")
+
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+
+def test_zero_size_lru_stores_nothing():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+
+    assert cache.get("a") is None and len(cache) == 0
+
+
+def test_ttl_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("query_cache.time.time", lambda: now[0])
+    cache = TTLCache(4, ttl=60)
+    cache.put("answer", "restart the HMI")
+
+    now[0] += 59
+    assert cache.get("answer") == "restart the HMI"
+    now[0] += 1
+    assert cache.get("answer", "expired") == "expired"
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)  # the expired lookup counts as a miss
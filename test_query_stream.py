@@ -0,0 +1,114 @@
+import json
+import pytest
+import requests
+from conftest import HashingEncoder, make_chunks
+from benchmark import FakeOllama
+from ollama_client import OllamaClient
+from rag_pipeline import RAGPipeline, OLLAMA_ERROR_MESSAGES
+
+
+@pytest.fixture
+def ollama():
+    server = FakeOllama(prefill_ms=1, token_ms=0, tokens=4).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def rag(ollama):
+    pipeline = RAGPipeline()
+    pipeline.vector_db._embedding_model = HashingEncoder()
+    pipeline.ollama = OllamaClient(base_url=ollama.url, max_retries=1)
+    pipeline.vector_db.add_documents(make_chunks("hmi.txt", [
+        "HMI station restart procedure: hold the power button for ten seconds",
+        "Pump pressure alarms are reset from the maintenance panel"
+    ]))
+    yield pipeline
+    pipeline.vector_db.close()
+
+
+def test_query_stream_yields_metadata_tokens_then_done(rag, ollama):
+    events = list(rag.query_stream("How do I restart the HMI station?"))
+
+    assert [event["type"] for event in events] == ["metadata"] + ["token"] * 4 + ["done"]
+    assert events[0]["context_used"] is True
+    assert "hmi.txt" in events[0]["sources"]
+    assert events[-1]["answer"] == "".join(event["text"] for event in events[1:-1])
+    assert events[-1]["time_to_first_token"] is not None
+    assert {"search", "slot_wait", "generate"} <= set(events[-1]["timings"])
+    assert ollama.requests == 1
+
+
+def test_query_stream_serves_a_repeated_question_from_cache(rag, ollama):
+    first = list(rag.query_stream("How do I restart the HMI station?"))
+    second = list(rag.query_stream("How do I restart the HMI station?"))
+
+    assert second[0]["cached"] is True
+    assert second[-1]["answer"] == first[-1]["answer"]
+    assert ollama.requests == 1
+
+
+def test_query_stream_reports_ollama_outage_as_a_message(rag, ollama):
+    ollama.stop()
+
+    events = list(rag.query_stream("How do I restart the HMI station?"))
+
+    assert events[-1]["type"] == "done"
+    assert events[-1]["answer"] in OLLAMA_ERROR_MESSAGES.values()
+
+
+def test_ollama_errors_are_not_cached(rag, ollama):
+    ollama.stop()
+    assert rag.query("How do I restart the HMI station?")["answer"] in OLLAMA_ERROR_MESSAGES.values()
+    list(rag.query_stream("How do I restart the HMI station?"))
+
+    assert len(rag.answer_cache) == 0
+
+
+def test_answer_cache_is_cleared_when_the_index_changes(rag, ollama):
+    rag.query("How do I restart the HMI station?")
+    assert rag.query("How do I restart the HMI station?")["cached"] is True
+
+    rag.vector_db.add_documents(make_chunks("hmi-v2.txt", ["HMI restart now needs the supervisor key"]))
+
+    assert rag.query("How do I restart the HMI station?")["cached"] is False
+    assert ollama.requests == 2
+    assert len(rag.answer_cache) == 1  # the answer over the old index was dropped, not just bypassed
+
+
+def test_query_matches_streamed_answer(rag):
+    streamed = list(rag.query_stream("pump pressure alarm reset"))[-1]["answer"]
+    rag.answer_cache.clear()
+
+    result = rag.query("pump pressure alarm reset")
+
+    assert result["answer"] == streamed.strip()
+    assert result["context_used"] is True
+
+
+def test_bulk_query_skips_lines_that_are_not_objects(rag, tmp_path):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text('[1, 2]\n"restart the HMI?"\nnot json\n{"id": "q1", "question": "pump alarm reset"}\n',
+                         encoding="utf-8")
+    answers = tmp_path / "answers.jsonl"
+
+    assert rag.bulk_query(str(questions), str(answers)) == 1
+    assert [json.loads(line)["id"] for line in answers.read_text(encoding="utf-8").splitlines()] == ["q1"]
+
+
+def test_connect_timeout_is_retried_not_reported_as_a_generation_timeout(ollama, monkeypatch):
+    client = OllamaClient(base_url=ollama.url, max_retries=3)
+    monkeypatch.setattr(OllamaClient, "_backoff", staticmethod(lambda attempt: 0.0))
+    send = client.session.request
+    attempts = []
+
+    def flaky(*args, **kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise requests.exceptions.ConnectTimeout("connect timed out")
+        return send(*args, **kwargs)
+
+    monkeypatch.setattr(client.session, "request", flaky)
+
+    assert client.generate("hello")["done"] is True
+    assert len(attempts) == 2
@@ -0,0 +1,86 @@
+import time
+import pytest
+from config import Config
+from reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how many question words the chunk contains"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=None, show_progress_bar=False):
+        if self.error:
+            raise self.error
+        time.sleep(self.delay)
+        self.pairs.extend(pairs)
+        return [float(len(set(question.split()) & set(text.split()))) for question, text in pairs]
+
+
+def docs():
+    return [{"id": "a", "text": "pump seal"}, {"id": "b", "text": "pump seal pressure alarm reset"},
+            {"id": "c", "text": "alarm reset"}, {"id": "d", "text": "conveyor belt"}]
+
+
+def reranker(model, **kwargs):
+    reranker = CrossEncoderReranker(**{"batch_size": 2, "budget_ms": 1000, **kwargs})
+    reranker._model = model
+    return reranker
+
+
+def test_best_scored_candidates_are_kept():
+    ranked = reranker(FakeCrossEncoder()).rerank("pressure alarm reset", docs(), 2)
+
+    assert [doc["id"] for doc in ranked] == ["b", "c"]
+    assert [doc["rerank_score"] for doc in ranked] == [3.0, 2.0]
+
+
+def test_scores_are_cached_per_question_and_chunk_text():
+    model = FakeCrossEncoder()
+    ranker = reranker(model)
+    ranker.rerank("pressure alarm reset", docs(), 2)
+
+    assert [doc["id"] for doc in ranker.rerank("Pressure  alarm reset", docs(), 2)] == ["b", "c"]
+    assert len(model.pairs) == 4  # the repeat (differing only in case and spacing) scored nothing
+
+    changed = docs()
+    changed[3]["text"] = "pressure alarm reset on the conveyor"
+    assert {doc["id"] for doc in ranker.rerank("pressure alarm reset", changed, 2)} == {"b", "d"}
+    assert len(model.pairs) == 5
+
+
+def test_over_budget_keeps_the_retriever_order_and_caches_what_was_scored():
+    model = FakeCrossEncoder(delay=0.02)
+    ranker = reranker(model, batch_size=1, budget_ms=10)
+
+    assert ranker.rerank("pressure alarm reset", docs(), 2) == docs()[:2]
+    assert len(model.pairs) == 1  # the first batch always runs, then the budget is spent
+    assert len(ranker.cache) == 1
+
+
+@pytest.mark.parametrize("error", [RuntimeError("CUDA out of memory"), ValueError("bad input")])
+def test_a_failing_model_keeps_the_retriever_order(error):
+    assert reranker(FakeCrossEncoder(error=error)).rerank("pressure alarm reset", docs(), 2) == docs()[:2]
+
+
+def test_a_model_that_cannot_load_keeps_the_retriever_order(monkeypatch):
+    def missing_model(self):
+        raise OSError("cross-encoder/ms-marco-MiniLM-L-6-v2 not found")
+
+    monkeypatch.setattr(CrossEncoderReranker, "model", property(missing_model))
+
+    assert CrossEncoderReranker().rerank("pressure alarm reset", docs(), 2) == docs()[:2]
+
+
+def test_disabled_reranking_retrieves_top_k_in_retriever_order(monkeypatch):
+    from rag_pipeline import RAGPipeline
+    monkeypatch.setattr(Config, "RERANK_ENABLED", False)
+    rag = RAGPipeline()
+
+    assert rag.reranker is None
+    assert rag._candidate_count(5) == 5
+    rag.vector_db.close()
+    rag.manifest.close()
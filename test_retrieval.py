@@ -0,0 +1,224 @@
+import numpy as np
+import pytest
+from config import Config
+from conftest import make_chunks
+from bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+from vector_backends import NumpyBackend
+
+
+def unit(*values) -> np.ndarray:
+    vector = np.zeros(4, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector
+
+
+@pytest.fixture
+def backend(tmp_path):
+    store = NumpyBackend(str(tmp_path / "numpy"))
+    store.upsert(
+        ["a", "b", "c"],
+        np.stack([unit(1, 0), unit(0.9, 0.1), unit(0, 1)]),
+        ["alpha", "beta", "gamma"],
+        [{"site": "Pune"}, {"site": "Ohio"}, {"site": "Pune"}]
+    )
+    yield store
+    store.close()
+
+
+def test_numpy_backend_returns_nearest_first(backend):
+    results = backend.search(unit(1, 0), 2)[0]
+
+    assert [doc["id"] for doc in results] == ["a", "b"]
+    assert results[0]["similarity"] == pytest.approx(1.0)
+    assert results[0]["text"] == "alpha"
+    assert results[0]["metadata"] == {"site": "Pune"}
+
+
+def test_numpy_backend_searches_many_queries_at_once(backend):
+    results = backend.search(np.stack([unit(1, 0), unit(0, 1)]), 1)
+
+    assert [[doc["id"] for doc in docs] for docs in results] == [["a"], ["c"]]
+
+
+def test_numpy_backend_upsert_replaces_in_place_and_delete_hides_rows(backend):
+    backend.upsert(["a"], unit(0, 1)[None], ["alpha v2"], [{"site": "Pune"}])
+    backend.delete(["c"])
+
+    results = backend.search(unit(0, 1), 3)[0]
+
+    assert backend.count() == 2
+    assert [doc["id"] for doc in results] == ["a", "b"]
+    assert results[0]["text"] == "alpha v2"
+    assert backend.get(["c"]) == {}
+
+
+def test_numpy_backend_where_filter(backend):
+    results = backend.search(unit(1, 0), 5, where={"site": "Pune"})[0]
+
+    assert [doc["id"] for doc in results] == ["a", "c"]
+    assert backend.search(unit(1, 0), 5, where={"site": "Nowhere"})[0] == []
+
+
+def test_numpy_backend_where_in_filter(backend):
+    results = backend.search(unit(0, 1), 5, where={"site": {"$in": ["Ohio", "Pune"]}})[0]
+
+    assert [doc["id"] for doc in results] == ["c", "b", "a"]
+    assert [doc["id"] for doc in backend.search(unit(1, 0), 5, where={"site": {"$in": ["Ohio"]}})[0]] == ["b"]
+    assert backend.search(unit(1, 0), 5, where={"site": {"$in": []}})[0] == []
+
+
+def test_numpy_backend_persists_and_clears(backend, tmp_path):
+    backend.close()
+    reopened = NumpyBackend(str(tmp_path / "numpy"))
+
+    assert reopened.count() == 3
+    assert reopened.get(["b"], include_embeddings=True)["b"]["embedding"].shape == (4,)
+    reopened.clear()
+    assert reopened.count() == 0
+    assert reopened.search(unit(1, 0), 3)[0] == []
+    reopened.close()
+
+
+def test_numpy_backend_rejects_other_dimensions(backend, tmp_path):
+    backend.close()
+    with pytest.raises(ValueError):
+        NumpyBackend(str(tmp_path / "numpy"), dim=8)
+
+
+def test_numpy_backend_sees_rows_written_by_another_process(backend, tmp_path):
+    reader = NumpyBackend(str(tmp_path / "numpy"))
+    assert reader.count() == 3
+    assert reader.search(unit(1, 0), 1, where={"site": "Ohio"})[0][0]["id"] == "b"
+
+    # past the initial capacity, so the reader has to remap the grown file
+    ids = [f"new{i}" for i in range(1100)]
+    backend.upsert(ids, np.tile(unit(0, 0, 1), (len(ids), 1)), ["delta"] * len(ids), [{"site": "Ohio"}] * len(ids))
+    backend.delete(["b"])
+
+    assert reader.count() == 1102
+    assert reader.search(unit(0, 0, 1), 1)[0][0]["text"] == "delta"
+    assert reader.search(unit(1, 0), 1, where={"site": "Ohio"})[0][0]["id"].startswith("new")
+    assert reader.get(["new1099"], include_embeddings=True)["new1099"]["embedding"][2] == pytest.approx(1.0)
+    reader.close()
+
+
+def test_numpy_backend_writers_in_two_processes_do_not_share_rows(backend, tmp_path):
+    other = NumpyBackend(str(tmp_path / "numpy"))
+    other.upsert(["d"], unit(0, 0, 1)[None], ["delta"], [{"site": "Noida"}])
+    backend.upsert(["e"], unit(0, 0, 0, 1)[None], ["epsilon"], [{"site": "Noida"}])
+
+    for store in (backend, other):
+        assert store.count() == 5
+        assert store.get(["d", "e"]).keys() == {"d", "e"}
+        results = store.search(np.stack([unit(0, 0, 1), unit(0, 0, 0, 1)]), 1)
+        assert [docs[0]["id"] for docs in results] == ["d", "e"]
+    other.close()
+
+
+def test_bm25_ranks_by_term_frequency_and_rarity(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.db"))
+    index.add(["1", "2", "3"], ["pump pump seal", "pump valve", "error code E-204 on HMI"])
+
+    assert [doc_id for doc_id, _ in index.search("pump", 3)] == ["1", "2"]
+    assert [doc_id for doc_id, _ in index.search("E-204", 3)] == ["3"]
+
+    index.delete(["1"])
+    assert index.count() == 2
+    assert [doc_id for doc_id, _ in index.search("pump", 3)] == ["2"]
+    index.close()
+
+
+def test_tokenize_keeps_codes_together():
+    assert "e-204" in tokenize("Error E-204 occurred")
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]])
+
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b"]
+    assert fused[0][1] > fused[1][1] > fused[2][1]
+
+
+def test_hybrid_search_adds_exact_keyword_matches(vector_db):
+    docs = make_chunks("a.txt", ["pump maintenance schedule", "pump pressure readings", "fault code E-204"])
+    vector_db.add_documents(docs)
+
+    results = vector_db.search_similar("E-204", 3, mode="hybrid")
+
+    assert results[0]["text"] == "fault code E-204"
+    assert results[0]["lexical_match"] is True
+    assert "similarity" in results[0] and "score" in results[0]
+
+
+def test_lexical_mode_needs_no_embedding(vector_db):
+    vector_db.add_documents(make_chunks("a.txt", ["pump maintenance", "valve maintenance"]))
+    vector_db._embedding_model = None  # would raise if the model were loaded
+
+    results = vector_db.search_similar("valve", 2, mode="lexical")
+
+    assert [doc["text"] for doc in results] == ["valve maintenance"]
+    assert results[0]["similarity"] == pytest.approx(1.0)
+
+
+def test_search_partitions_only_returns_requested_sites(vector_db):
+    vector_db.add_documents(make_chunks("Pune/a.txt", ["pump pressure low", "pump seal leak"], site="Pune"))
+    vector_db.add_documents(make_chunks("Ohio/b.txt", ["pump pressure high"], site="Ohio"))
+    vector_db.add_documents(make_chunks("Noida/c.txt", ["pump pressure normal"], site="Noida"))
+
+    for mode in ("vector", "lexical", "hybrid"):
+        results = vector_db.search_partitions("pump pressure", ["Pune", "Ohio"], 5, mode=mode)
+        assert {doc["metadata"]["site"] for doc in results} == {"Pune", "Ohio"}, mode
+        assert vector_db.search_partitions("pump pressure", ["Nowhere"], 5, mode=mode) == []
+
+
+def test_search_partitions_scans_once_for_several_sites(vector_db, monkeypatch):
+    vector_db.add_documents(make_chunks("Pune/a.txt", ["pump pressure low"], site="Pune"))
+    vector_db.add_documents(make_chunks("Ohio/b.txt", ["pump pressure high"], site="Ohio"))
+    searches = []
+    search = vector_db.backend.search
+    monkeypatch.setattr(vector_db.backend, "search", lambda *args: searches.append(args[2]) or search(*args))
+
+    vector_db.search_partitions("pump pressure", ["Pune", "Ohio"], 5, mode="vector")
+
+    assert searches == [{Config.PARTITION_KEY: {"$in": ["Pune", "Ohio"]}}]
+
+
+def test_search_similar_batch_matches_single_searches(vector_db):
+    vector_db.add_documents(make_chunks("a.txt", ["pump pressure", "valve seal", "boiler temperature"]))
+
+    batch = vector_db.search_similar_batch(["valve", "boiler"], 1, mode="vector")
+
+    assert [[doc["text"] for doc in docs] for docs in batch] == [["valve seal"], ["boiler temperature"]]
+
+
+def test_cached_embeddings_do_not_load_the_model(vector_db):
+    texts = ["pump pressure", "valve seal", "pump pressure"]
+    expected = vector_db.generate_embeddings(texts)
+    vector_db._embedding_model = None  # would raise if the model were loaded
+
+    embeddings = vector_db.generate_embeddings(texts)
+
+    assert embeddings.dtype == np.float32
+    np.testing.assert_array_equal(embeddings, expected)
+
+
+def test_length_sorted_batches_keep_the_input_order(vector_db):
+    from conftest import HashingEncoder
+
+    class RecordingEncoder(HashingEncoder):
+        def __init__(self):
+            self.batches = []
+
+        def encode(self, texts, **kwargs):
+            self.batches.append(list(texts))
+            return super().encode(texts, **kwargs)
+
+    encoder = vector_db._embedding_model = RecordingEncoder()
+    texts = ["pump", "valve seal leak on line four", "alarm reset", "pump", "conveyor belt tension check", "seal"]
+    vector_db.generate_embeddings(texts[:1])  # one cached row among the rest
+
+    embeddings = vector_db.generate_embeddings(texts, batch_size=2)
+
+    np.testing.assert_array_equal(embeddings, HashingEncoder().encode(texts))
+    assert encoder.batches[1:] == [["valve seal leak on line four", "conveyor belt tension check"],
+                                   ["alarm reset", "seal"]]
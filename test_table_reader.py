@@ -0,0 +1,80 @@
+import os
+import pytest
+from config import Config
+from table_reader import TableChunker
+
+pytest.importorskip("pandas")
+
+
+def write_csv(tmp_path, content: str) -> str:
+    path = str(tmp_path / "export.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+def test_csv_chunks_repeat_the_header_and_record_row_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TABLE_READ_ROWS", 3)  # rows span several pandas chunks
+    rows = "".join(f"P-{i},{i * 10}\n" for i in range(7))
+    path = write_csv(tmp_path, "tag,pressure\n" + rows)
+
+    chunks = TableChunker(max_rows=3).chunk(path, "export.csv", "Pune/export.csv")
+
+    assert [chunk["text"].split("\n")[0] for chunk in chunks] == ["tag | pressure"] * 3
+    assert chunks[0]["text"] == "tag | pressure\nP-0 | 0\nP-1 | 10\nP-2 | 20"
+    assert [(c["metadata"]["row_start"], c["metadata"]["row_end"]) for c in chunks] == [(2, 4), (5, 7), (8, 8)]
+    assert [c["metadata"]["chunk_id"] for c in chunks] == [0, 1, 2]
+    assert chunks[0]["metadata"]["file_path"] == "Pune/export.csv"
+    assert chunks[0]["metadata"]["category"] == "table"
+
+
+def test_csv_blank_header_cells_get_column_names(tmp_path):
+    path = write_csv(tmp_path, "tag,,unit\nP-1,5,bar\n")
+
+    chunks = TableChunker().chunk(path, "export.csv")
+
+    assert chunks[0]["text"] == "tag | column_2 | unit\nP-1 | 5 | bar"
+
+
+def test_empty_csv_has_no_chunks(tmp_path):
+    assert TableChunker().chunk(write_csv(tmp_path, ""), "export.csv") == []
+    assert TableChunker().chunk(write_csv(tmp_path, "tag,pressure\n"), "export.csv") == []
+
+
+def test_xlsx_chunks_every_sheet(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "Pumps"
+    workbook.active.append(["tag", "pressure"])
+    workbook.active.append(["P-1", 4.0])
+    workbook.create_sheet("Empty")
+    valves = workbook.create_sheet("Valves")
+    valves.append([None])
+    valves.append(["tag", None])
+    valves.append(["V-7", "open"])
+    path = str(tmp_path / "plant.xlsx")
+    workbook.save(path)
+
+    chunks = TableChunker().chunk(path, "plant.xlsx")
+
+    assert [chunk["metadata"]["sheet"] for chunk in chunks] == ["Pumps", "Valves"]
+    assert chunks[0]["text"] == "Sheet: Pumps\ntag | pressure\nP-1 | 4"
+    assert chunks[1]["text"] == "Sheet: Valves\ntag | column_2\nV-7 | open"
+    assert (chunks[1]["metadata"]["row_start"], chunks[1]["metadata"]["row_end"]) == (3, 3)
+    assert [chunk["metadata"]["chunk_id"] for chunk in chunks] == [0, 1]
+
+
+def test_large_csv_is_streamed_in_parts_past_the_size_limit(tmp_path, monkeypatch):
+    from document_processor import DocumentProcessor
+    monkeypatch.setattr(Config, "MAX_FILE_SIZE", 10)
+    monkeypatch.setattr(Config, "UPSERT_BATCH_SIZE", 2)
+    monkeypatch.setattr(Config, "TABLE_MAX_ROWS_PER_CHUNK", 1)
+    path = write_csv(tmp_path, "tag\nP-1\nP-2\nP-3\n")
+
+    results = list(DocumentProcessor().process_files([path], str(tmp_path), workers=1))
+
+    assert [len(result["chunks"]) for result in results] == [2, 1, 0]
+    assert [bool(result.get("partial")) for result in results] == [True, True, False]
+    assert results[-1]["error"] is None
+    assert results[0]["chunks"][0]["metadata"][Config.PARTITION_KEY] == Config.DEFAULT_PARTITION
+    assert os.path.basename(results[-1]["path"]) == "export.csv"
@@ -0,0 +1,520 @@
+import os
+import json
+import shutil
+import sqlite3
+import logging
+import threading
+import numpy as np
+from typing import List, Dict, Iterator, Tuple, Optional
+from collection_registry import active_collection, collection_paths
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SQLITE_MAX_PARAMS = 500  # keep IN (...) lists under SQLite's variable limit
+INITIAL_CAPACITY = 1024  # rows allocated in the vector files of a new store
+SCAN_BLOCK_ROWS = 16384  # rows scored at a time while scanning
+MAX_SCORE_CELLS = 1 << 24  # queries * rows scored in one pass (64MB of float32 scores)
+
+
+def _normalize(vectors) -> np.ndarray:
+    """Scale rows to unit length so cosine similarity is a dot product"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorBackend:
+    """Storage and nearest-neighbour search for chunk embeddings.
+
+    Search results are lists of {"id", "text", "metadata", "similarity"}
+    dicts (one list per query), where similarity is cosine similarity.
+    """
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        """Insert new chunks"""
+        self.upsert(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        """Insert chunks, replacing any with the same ids"""
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        """Delete chunks by id"""
+        raise NotImplementedError
+
+    def search(self, query_embeddings: np.ndarray, top_k: int, where: Dict = None) -> List[List[Dict]]:
+        """Nearest chunks for each query embedding, best first.
+
+        where restricts the search to chunks whose metadata equals every
+        {key: value} given (e.g. {"site": "Pune"}); a value of {"$in": [...]}
+        matches any of the listed values.
+        """
+        raise NotImplementedError
+
+    def get(self, ids: List[str], include_embeddings: bool = False) -> Dict[str, Dict]:
+        """Stored chunks by id ({"id", "text", "metadata"} plus "embedding" if asked)"""
+        raise NotImplementedError
+
+    def iter_documents(self, page_size: int = 1000) -> Iterator[Tuple[List[str], List[str]]]:
+        """Page through every stored chunk as (ids, texts)"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Number of stored chunks"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Delete every chunk"""
+        raise NotImplementedError
+
+    def drop(self):
+        """Delete the whole collection; the backend cannot be used afterwards"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release files and connections"""
+
+
+class ChromaBackend(VectorBackend):
+    """Persistent Chroma collection with an HNSW cosine index"""
+
+    def __init__(self, path: str = None, collection_name: str = None):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.client = chromadb.PersistentClient(
+            path=path or Config.VECTOR_DB_PATH,
+            settings=Settings(anonymized_telemetry=False)
+        )
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name or Config.COLLECTION_NAME,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.collection.add(ids=ids, embeddings=self._to_lists(embeddings), documents=documents, metadatas=metadatas)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=ids, embeddings=self._to_lists(embeddings), documents=documents, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def search(self, query_embeddings, top_k, where=None):
+        results = self.collection.query(
+            query_embeddings=self._to_lists(np.atleast_2d(query_embeddings)),
+            n_results=top_k,
+            where=self._where(where),
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                {
+                    "id": results["ids"][q][i],
+                    "text": results["documents"][q][i],
+                    "metadata": results["metadatas"][q][i],
+                    "similarity": 1 - results["distances"][q][i]  # Convert distance to similarity
+                }
+                for i in range(len(results["documents"][q]))
+            ]
+            for q in range(len(results["documents"]))
+        ]
+
+    def get(self, ids, include_embeddings=False):
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        results = self.collection.get(ids=ids, include=include)
+        docs = {}
+        for i, doc_id in enumerate(results["ids"]):
+            docs[doc_id] = {"id": doc_id, "text": results["documents"][i], "metadata": results["metadatas"][i]}
+            if include_embeddings:
+                docs[doc_id]["embedding"] = np.asarray(results["embeddings"][i], dtype=np.float32)
+        return docs
+
+    def iter_documents(self, page_size=1000):
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield page["ids"], page["documents"]
+            offset += len(page["ids"])
+
+    def count(self):
+        return self.collection.count()
+
+    def clear(self, page_size=5000):
+        """Delete every document page by page (VectorDatabase.clear_collection swaps in a new collection instead)"""
+        while True:
+            ids = self.collection.get(include=[], limit=page_size)["ids"]
+            if not ids:
+                return
+            self.collection.delete(ids=ids)
+
+    def drop(self):
+        self.client.delete_collection(self.collection.name)
+
+    @staticmethod
+    def _where(where: Optional[Dict]) -> Optional[Dict]:
+        """Chroma filter syntax: several conditions must be wrapped in $and"""
+        if not where:
+            return None
+        if len(where) == 1:
+            return dict(where)
+        return {"$and": [{key: value} for key, value in where.items()]}
+
+    @staticmethod
+    def _to_lists(embeddings) -> List[List[float]]:
+        """Chroma only accepts embeddings as Python lists"""
+        return embeddings.tolist() if isinstance(embeddings, np.ndarray) else embeddings
+
+
+class NumpyBackend(VectorBackend):
+    """Exact cosine search over a memory-mapped float32 matrix.
+
+    Vectors are stored unit-normalized, one row per chunk, in vectors.f32;
+    ids, text and metadata live in SQLite next to it. Deleted rows are only
+    marked dead and skipped by search; upserting an existing id rewrites its
+    row in place. Opening a store maps the file without reading it, so it is
+    ready in milliseconds whatever its size.
+
+    Filtered searches (where) only score blocks of rows containing a match;
+    chunks of one directory are ingested together, so a partition occupies
+    a few contiguous blocks rather than the whole file.
+
+    Rows committed by another process (a CLI ingest while the API server
+    is serving) are picked up on the next call: SQLite's data_version
+    tells when to reload the live rows and remap the vector file.
+    """
+
+    quantization: Optional[str] = None
+
+    def __init__(self, path: str = None, dim: int = None):
+        self.path = path or Config.NUMPY_STORE_PATH
+        self.dim = dim
+        self._lock = threading.RLock()
+        os.makedirs(self.path, exist_ok=True)
+        self._check_layout()
+
+        self.conn = sqlite3.connect(os.path.join(self.path, "meta.db"), check_same_thread=False)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                document TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                live INTEGER NOT NULL
+            )"""
+        )
+        self.conn.commit()
+
+        self._f32: Optional[np.memmap] = None
+        self._where_masks: Dict[tuple, np.ndarray] = {}  # rows matching each filter, reset on writes
+        self._data_version = self._read_data_version()
+        self._load_rows()
+        if self.dim is not None:
+            self._open_arrays(max(self.size, INITIAL_CAPACITY))
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        vectors = _normalize(embeddings)
+        with self._lock:
+            # Hold SQLite's write lock from row allocation to commit, so a writer
+            # in another process can't hand out the same new rows
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._upsert(ids, vectors, documents, metadatas)
+            except BaseException:
+                self.conn.rollback()
+                self._data_version = None  # reload the rows this call allocated
+                raise
+
+    def _upsert(self, ids, vectors, documents, metadatas):
+        self._refresh()
+        if self._f32 is None:
+            # New store opened without a dimension: the first vectors decide it
+            self.dim = self.dim or vectors.shape[1]
+            self._check_layout()
+            self._open_arrays(INITIAL_CAPACITY)
+        existing = self._rows_for_ids(ids)
+        rows = []
+        for doc_id in ids:
+            row = existing.get(doc_id)
+            if row is None:
+                row = self.size
+                self.size += 1
+                existing[doc_id] = row
+            rows.append(row)
+
+        if self.size > self._capacity:
+            self._open_arrays(max(self.size, self._capacity * 2))
+        if self.size > len(self._live):
+            self._live = np.concatenate([self._live, np.zeros(self.size - len(self._live), dtype=bool)])
+
+        rows_array = np.asarray(rows)
+        self._write_vectors(rows_array, vectors)
+        self._live[rows_array] = True
+        self._where_masks.clear()
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO rows (row, id, document, metadata, live) VALUES (?, ?, ?, ?, 1)",
+            [
+                (row, doc_id, document, json.dumps(metadata))
+                for row, doc_id, document, metadata in zip(rows, ids, documents, metadatas)
+            ]
+        )
+        self.conn.commit()
+        self._flush()
+
+    def delete(self, ids):
+        with self._lock:
+            self._refresh()
+            rows = list(self._rows_for_ids(ids).values())
+            if not rows:
+                return
+            self._live[rows] = False
+            self._where_masks.clear()
+            for start in range(0, len(rows), SQLITE_MAX_PARAMS):
+                batch = rows[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                self.conn.execute(f"UPDATE rows SET live = 0 WHERE row IN ({placeholders})", batch)
+            self.conn.commit()
+
+    def search(self, query_embeddings, top_k, where=None):
+        queries = _normalize(query_embeddings)
+        with self._lock:
+            self._refresh()
+            searchable = self._live[:self.size]
+            if where:
+                searchable = searchable & self._where_mask(where)
+            live_count = int(searchable.sum())
+            if live_count == 0 or top_k <= 0:
+                return [[] for _ in queries]
+
+            n_results = min(top_k, live_count)
+            excluded = ~searchable
+            group_size = max(1, MAX_SCORE_CELLS // self.size)
+            hits = []
+            for group_start in range(0, len(queries), group_size):
+                group = queries[group_start:group_start + group_size]
+                scores = np.empty((len(group), self.size), dtype=np.float32)
+                for start in range(0, self.size, SCAN_BLOCK_ROWS):
+                    end = min(start + SCAN_BLOCK_ROWS, self.size)
+                    if where and not searchable[start:end].any():
+                        scores[:, start:end] = -np.inf  # no matching rows: skip the scan
+                        continue
+                    scores[:, start:end] = self._block_scores(start, end, group)
+                scores[:, excluded] = -np.inf
+                hits.extend(
+                    self._top_rows(query, row_scores, n_results, live_count)
+                    for query, row_scores in zip(group, scores)
+                )
+
+            results = []
+            for rows, similarities in hits:
+                records = self._records(rows)
+                results.append([{**records[row], "similarity": sim} for row, sim in zip(rows, similarities)])
+            return results
+
+    def get(self, ids, include_embeddings=False):
+        with self._lock:
+            self._refresh()
+            by_id = self._rows_for_ids(ids, live_only=True)
+            records = self._records(list(by_id.values()))
+            docs = {}
+            for doc_id in ids:
+                row = by_id.get(doc_id)
+                if row is None:
+                    continue
+                docs[doc_id] = records[row]
+                if include_embeddings:
+                    docs[doc_id]["embedding"] = np.array(self._f32[row])
+            return docs
+
+    def iter_documents(self, page_size=1000):
+        last_row = -1
+        while True:
+            with self._lock:
+                page = self.conn.execute(
+                    "SELECT row, id, document FROM rows WHERE live = 1 AND row > ? ORDER BY row LIMIT ?",
+                    (last_row, page_size)
+                ).fetchall()
+            if not page:
+                return
+            last_row = page[-1][0]
+            yield [doc_id for _, doc_id, _ in page], [document for _, _, document in page]
+
+    def count(self):
+        with self._lock:
+            self._refresh()
+            return int(self._live.sum())
+
+    def clear(self):
+        """Drop every row and shrink the vector files"""
+        with self._lock:
+            self.conn.execute("DELETE FROM rows")
+            self.conn.commit()
+            self.size = 0
+            self._live = np.zeros(0, dtype=bool)
+            self._where_masks.clear()
+            if self._f32 is not None:
+                self._open_arrays(INITIAL_CAPACITY, truncate=True)
+
+    def drop(self):
+        """Close the store and delete its directory"""
+        with self._lock:
+            self.close()
+            # Unmap the vector files first: Windows cannot delete mapped files
+            for name, value in list(vars(self).items()):
+                if isinstance(value, np.memmap):
+                    setattr(self, name, None)
+            shutil.rmtree(self.path)
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self.conn.close()
+
+    # -- Scoring -------------------------------------------------------------
+
+    def _block_scores(self, start: int, end: int, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of queries to rows start:end, shape (queries, rows)"""
+        return queries @ self._f32[start:end].T
+
+    def _top_rows(self, query: np.ndarray, scores: np.ndarray, n_results: int, live_count: int):
+        """Best n_results rows for one query as (rows, similarities)"""
+        rows = np.argpartition(-scores, n_results - 1)[:n_results]
+        rows = rows[np.argsort(-scores[rows])]
+        return rows.tolist(), scores[rows].tolist()
+
+    # -- Storage -------------------------------------------------------------
+
+    def _read_data_version(self) -> int:
+        """Changes whenever another connection commits to meta.db"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load_rows(self):
+        self.size = self.conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+        self._live = np.zeros(self.size, dtype=bool)
+        live_rows = [row for (row,) in self.conn.execute("SELECT row FROM rows WHERE live = 1")]
+        self._live[live_rows] = True
+
+    def _refresh(self):
+        """Reload rows and remap the vector file if another process has written since the last call"""
+        version = self._read_data_version()
+        if version == self._data_version:
+            return
+        self._data_version = version
+        self._load_rows()
+        self._where_masks.clear()
+        if self._f32 is None:
+            self._check_layout()  # the other process may have decided the dimension
+            if self.dim is None:
+                return
+        # Remapped even without growth: a clear elsewhere may have truncated the file
+        self._open_arrays(max(self.size, INITIAL_CAPACITY))
+
+    def _write_vectors(self, rows: np.ndarray, vectors: np.ndarray):
+        self._f32[rows] = vectors
+
+    def _open_arrays(self, capacity: int, truncate: bool = False):
+        """(Re)map the vector files with room for `capacity` rows"""
+        self._capacity = capacity
+        self._f32 = self._map("vectors.f32", np.float32, (capacity, self.dim), truncate)
+
+    def _map(self, name: str, dtype, shape: tuple, truncate: bool) -> np.memmap:
+        file_path = os.path.join(self.path, name)
+        required = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(file_path, "ab") as f:
+            if truncate or f.tell() < required:
+                f.truncate(required)
+        return np.memmap(file_path, dtype=dtype, mode="r+", shape=shape)
+
+    def _flush(self):
+        if self._f32 is not None:
+            self._f32.flush()
+
+    def _check_layout(self):
+        """Refuse to open files written with a different dimension or quantization"""
+        layout_path = os.path.join(self.path, "layout.json")
+        if os.path.exists(layout_path):
+            with open(layout_path, "r", encoding="utf-8") as f:
+                existing = json.load(f)
+            if self.dim is None:
+                self.dim = existing["dim"]
+            layout = {"dim": self.dim, "quantization": self.quantization}
+            if existing != layout:
+                raise ValueError(
+                    f"Vector store at {self.path} was built with {existing}, not {layout}; "
+                    "clear it and re-ingest with --full"
+                )
+        elif self.dim is not None:
+            with open(layout_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "quantization": self.quantization}, f)
+
+    def _where_mask(self, where: Dict) -> np.ndarray:
+        """Rows whose metadata matches every {key: value} or {key: {"$in": values}} in where
+        (cached until the next write)"""
+        cache_key = tuple(sorted(
+            (key, tuple(sorted(value["$in"])) if isinstance(value, dict) else value) for key, value in where.items()
+        ))
+        mask = self._where_masks.get(cache_key)
+        if mask is None:
+            conditions, params = [], []
+            for key, value in cache_key:
+                if isinstance(value, tuple):
+                    conditions.append(f"json_extract(metadata, ?) IN ({','.join('?' * len(value)) or 'NULL'})")
+                    params.extend((f'$."{key}"',) + value)
+                else:
+                    conditions.append("json_extract(metadata, ?) = ?")
+                    params.extend((f'$."{key}"', value))
+            conditions = " AND ".join(conditions)
+            mask = np.zeros(self.size, dtype=bool)
+            rows = [row for (row,) in self.conn.execute(
+                f"SELECT row FROM rows WHERE live = 1 AND {conditions}", params
+            )]
+            mask[rows] = True
+            self._where_masks[cache_key] = mask
+        return mask
+
+    def _rows_for_ids(self, ids: List[str], live_only: bool = False) -> Dict[str, int]:
+        found = {}
+        for start in range(0, len(ids), SQLITE_MAX_PARAMS):
+            batch = ids[start:start + SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            sql = f"SELECT id, row FROM rows WHERE id IN ({placeholders})"
+            if live_only:
+                sql += " AND live = 1"
+            found.update(self.conn.execute(sql, batch).fetchall())
+        return found
+
+    def _records(self, rows: List[int]) -> Dict[int, Dict]:
+        records = {}
+        for start in range(0, len(rows), SQLITE_MAX_PARAMS):
+            batch = rows[start:start + SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            for row, doc_id, document, metadata in self.conn.execute(
+                f"SELECT row, id, document, metadata FROM rows WHERE row IN ({placeholders})", batch
+            ):
+                records[row] = {"id": doc_id, "text": document, "metadata": json.loads(metadata)}
+        return records
+
+
+def create_backend(dim: int = None, name: str = None, collection: str = None) -> VectorBackend:
+    """Backend selected by Config.VECTOR_BACKEND ("chroma" or "numpy").
+
+    dim may be omitted: NumPy stores take it from their files, or from the
+    first vectors written, so opening one never needs the embedding model.
+    collection defaults to the active one (see collection_registry).
+    """
+    name = (name or Config.VECTOR_BACKEND).lower()
+    collection = collection or active_collection()
+    paths = collection_paths(collection)
+    if name == "chroma":
+        return ChromaBackend(collection_name=collection)
+    if name == "numpy":
+        if Config.VECTOR_STORE_QUANTIZATION:
+            from compact_store import CompactVectorStore
+            return CompactVectorStore(paths["compact"], dim, Config.VECTOR_STORE_QUANTIZATION)
+        return NumpyBackend(paths["numpy"], dim)
+    raise ValueError(f"Unknown vector backend '{name}', expected 'chroma' or 'numpy'")
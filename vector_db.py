@@ -1,82 +1,509 @@
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+import time
+import atexit
 import logging
+import threading
+import numpy as np
 from typing import List, Dict
+from embedding_cache import EmbeddingCache
+from query_cache import LRUCache
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from vector_backends import create_backend
+from collection_registry import (active_collection, active_collection_info, set_active_collection, collection_paths,
+                                 list_collections, new_collection_name, remove_collection_files)
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 class VectorDatabase:
-    def __init__(self):
-        logger.info("Initializing Vector Database...")
-        self.embedding_model = SentenceTransformer(Config.EMBEDDING_MODEL)
-        
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=Config.VECTOR_DB_PATH,
-            settings=Settings(anonymized_telemetry=False)
-        )
+    def __init__(self, collection: str = None):
+        # The embedding model and the backend are loaded on first use (see the
+        # properties below), so constructing this is cheap
+        # With no collection, serve the active one and follow swaps made by other processes
+        self.collection = collection
+        self._follow_active = collection is None
+        self._next_collection_check = 0.0
+        self._embedding_model = None
+        self._backend = None
+        self._lexical_index = None
+        self._load_lock = threading.RLock()
+        self._encode_pool = None
+        self.embedding_cache = EmbeddingCache(Config.EMBEDDING_MODEL) if Config.EMBEDDING_CACHE_ENABLED else None
+        self.query_embedding_cache = LRUCache(Config.QUERY_EMBEDDING_CACHE_SIZE)
+        # Bumped on every write so callers can invalidate results derived from the collection
+        self.version = 0
+    
+    @property
+    def embedding_model(self):
+        """SentenceTransformer, loaded on first use"""
+        if self._embedding_model is None:
+            with self._load_lock:
+                if self._embedding_model is None:
+                    from sentence_transformers import SentenceTransformer
+                    logger.info(f"Loading embedding model {Config.EMBEDDING_MODEL}...")
+                    self._embedding_model = SentenceTransformer(Config.EMBEDDING_MODEL)
+        return self._embedding_model
+    
+    @property
+    def embedding_dim(self) -> int:
+        return self.embedding_model.get_sentence_embedding_dimension()
+    
+    @property
+    def backend(self):
+        """Vector backend of the collection being served, opened on first use"""
+        if self._backend is None:
+            with self._load_lock:
+                if self._backend is None:
+                    self._open_collection(self.collection or active_collection())
+        elif self._follow_active and time.monotonic() >= self._next_collection_check:
+            self._check_active_collection()
+        return self._backend
+    
+    def _open_collection(self, name: str):
+        logger.info(f"Initializing Vector Database (collection {name})...")
+        backend = create_backend(collection=name)
+        lexical_index = BM25Index(collection_paths(name)["lexical"]) if Config.LEXICAL_INDEX_ENABLED else None
+        self.collection = name
+        self._backend, self._lexical_index = backend, lexical_index
+        self._next_collection_check = time.monotonic() + Config.COLLECTION_CHECK_INTERVAL
+        if lexical_index is not None and lexical_index.count() == 0 and backend.count() > 0:
+            self.rebuild_lexical_index()
+        logger.info(f"Vector Database initialized successfully ({type(backend).__name__})")
+    
+    def _check_active_collection(self):
+        """Switch to the active collection if another process (e.g. a CLI reindex) swapped it"""
+        with self._load_lock:
+            if time.monotonic() < self._next_collection_check:
+                return
+            self._next_collection_check = time.monotonic() + Config.COLLECTION_CHECK_INTERVAL
+            name = active_collection()
+            if name == self.collection:
+                return
+            logger.info(f"Active collection changed from {self.collection} to {name}")
+            replaced = (self.collection, self._backend, self._lexical_index)
+            self._open_collection(name)
+            self.version += 1
+        # The process that swapped drops the old collection; this one only lets go of it
+        self._retire(*replaced, drop=False, delay=Config.REINDEX_DROP_DELAY)
+    
+    def shadow(self, collection: str) -> "VectorDatabase":
+        """Database writing to another collection while this one keeps serving, sharing the model and caches"""
+        shadow = VectorDatabase(collection)
+        if shadow.embedding_cache is not None:
+            shadow.embedding_cache.close()
+        shadow._embedding_model = self.embedding_model
+        shadow.embedding_cache = self.embedding_cache
+        shadow.query_embedding_cache = self.query_embedding_cache
+        if Config.EMBEDDING_PROCESSES > 1:
+            shadow._encode_pool = self._get_encode_pool()
+        return shadow
+    
+    def swap(self, shadow: "VectorDatabase", drop_delay: float = None, drop_previous: bool = True, **info) -> str:
+        """Serve shadow's collection from now on and drop the replaced one; returns the replaced name.
+
+        The collection pointer is rewritten (atomically) under the load lock,
+        so this process never follows its own swap. The old collection is
+        dropped drop_delay seconds later (default Config.REINDEX_DROP_DELAY)
+        so queries already running against it, here or in processes that
+        have not yet noticed the swap, can finish. With drop_previous=False
+        it is only closed, and the next reindex's drop_stale_collections
+        deletes it.
+        """
+        with self._load_lock:
+            replaced = (self.collection or active_collection(), self._backend, self._lexical_index)
+            set_active_collection(shadow.collection, previous=replaced[0], **info)
+            self.collection = shadow.collection
+            self._backend, self._lexical_index = shadow.backend, shadow.lexical_index
+            self._next_collection_check = time.monotonic() + Config.COLLECTION_CHECK_INTERVAL
+            self.version += 1
+        logger.info(f"Now serving collection {self.collection} (replaced {replaced[0]}"
+                    f"{'' if drop_previous else ', left for the next reindex to drop'})")
+        self._retire(*replaced, drop=drop_previous,
+                     delay=Config.REINDEX_DROP_DELAY if drop_delay is None else drop_delay)
+        return replaced[0]
+    
+    def drop_collection(self):
+        """Delete this database's collection (an abandoned shadow); the embedding model is left loaded"""
+        self._retire(self.collection, self._backend, self._lexical_index, drop=True, delay=0)
+        self._backend = self._lexical_index = None
+    
+    def drop_stale_collections(self):
+        """Delete collections left behind by interrupted reindexes or drops that failed.
+
+        Call with collection_lock held, so no other process is still building one of
+        them. The collection replaced by the last swap is kept for REINDEX_DROP_DELAY
+        seconds, while the process that swapped may still be serving queries from it.
+        """
+        self.backend
+        info = active_collection_info()
+        in_use = {self.collection}
+        if time.time() - info.get("activated_at", 0) < Config.REINDEX_DROP_DELAY + Config.COLLECTION_CHECK_INTERVAL:
+            in_use.add(info.get("previous"))
+        for name in list_collections():
+            if name not in in_use:
+                logger.info(f"Dropping stale collection {name}")
+                self._retire(name, None, None, drop=True, delay=0)
+    
+    def _retire(self, name: str, backend, lexical_index, drop: bool, delay: float):
+        """Close (and with drop, delete) a collection that is no longer served, after delay seconds"""
+        def retire():
+            try:
+                if lexical_index is not None:
+                    lexical_index.close()
+                if not drop:
+                    if backend is not None:
+                        backend.close()
+                    return
+                target = backend
+                if target is None and Config.VECTOR_BACKEND.lower() == "chroma":
+                    target = create_backend(collection=name)  # Chroma keeps every collection in one store
+                if target is not None:
+                    target.drop()
+                remove_collection_files(name)
+                logger.info(f"Dropped collection {name}")
+            except Exception as e:
+                logger.warning(f"Could not drop collection {name}: {e}; the next reindex retries")
         
-        self.collection = self.client.get_or_create_collection(
-            name=Config.COLLECTION_NAME,
-            metadata={"hnsw:space": "cosine"}
-        )
+        if delay <= 0:
+            retire()
+            return
+        timer = threading.Timer(delay, retire)
+        timer.name = f"retire-{name}"
+        timer.daemon = True
+        timer.start()
+    
+    def warm_up(self):
+        """Load the embedding model and open the backend now rather than on first use"""
+        self.embedding_model
+        self.backend
+    
+    @property
+    def lexical_index(self):
+        """BM25 index (None when disabled), opened together with the backend"""
+        self.backend
+        return self._lexical_index
+    
+    def generate_embeddings(self, texts: List[str], batch_size: int = None, use_cache: bool = True) -> np.ndarray:
+        """Generate float32 embeddings for texts, one row per text.
+
+        Vectors found in the embedding cache are reused; only the remaining
+        texts are sent to the model.
+        """
+        if self.embedding_cache is None or not use_cache or not texts:
+            return self._encode(texts, batch_size)
+        
+        keys = [self.embedding_cache.key(text) for text in texts]
+        cached = self.embedding_cache.get_many(keys)
         
-        logger.info("Vector Database initialized successfully")
+        # Encode each distinct uncached text once
+        missing = {}
+        for i, key in enumerate(keys):
+            if key not in cached:
+                missing.setdefault(key, i)
+        
+        if missing:
+            missing_keys = list(missing)
+            computed = self._encode([texts[missing[key]] for key in missing_keys], batch_size)
+            self.embedding_cache.put_many(missing_keys, computed)
+            cached.update(zip(missing_keys, computed))
+        
+        # Rows are stacked from the vectors themselves: when every text was cached
+        # the model is not loaded, not even for its dimension
+        return np.stack([cached[key] for key in keys]).astype(np.float32, copy=False)
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for texts"""
-        return self.embedding_model.encode(texts).tolist()
+    def _encode(self, texts: List[str], batch_size: int = None) -> np.ndarray:
+        """Run the embedding model.
+
+        Texts are sorted by length and encoded in batches of
+        Config.EMBEDDING_BATCH_SIZE so each batch pads to similar lengths.
+        Large inputs are spread over several processes when
+        Config.EMBEDDING_PROCESSES > 1.
+        """
+        batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        if not texts:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        
+        if Config.EMBEDDING_PROCESSES > 1 and len(texts) >= Config.EMBEDDING_MULTIPROCESS_MIN_TEXTS:
+            embeddings = self.embedding_model.encode_multi_process(
+                texts, self._get_encode_pool(), batch_size=batch_size
+            )
+            return np.asarray(embeddings, dtype=np.float32)
+        
+        # Longest first, like SentenceTransformer.encode does within one call
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        
+        for start in range(0, len(texts), batch_size):
+            batch_idx = order[start:start + batch_size]
+            embeddings[batch_idx] = self.embedding_model.encode(
+                [texts[i] for i in batch_idx],
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        
+        return embeddings
+    
+    def _get_encode_pool(self):
+        """Start the multi-process encoding pool on first use"""
+        if self._encode_pool is None:
+            devices = ["cpu"] * Config.EMBEDDING_PROCESSES
+            logger.info(f"Starting {len(devices)} embedding processes...")
+            self._encode_pool = self.embedding_model.start_multi_process_pool(target_devices=devices)
+            atexit.register(self.close)
+        return self._encode_pool
     
-    def add_documents(self, documents: List[Dict]):
-        """Add documents to vector database"""
+    def close(self):
+        """Stop background embedding processes and release the vector backend"""
+        if self._encode_pool is not None:
+            self.embedding_model.stop_multi_process_pool(self._encode_pool)
+            self._encode_pool = None
+        if self._backend is not None:
+            self._backend.close()
+    
+    @staticmethod
+    def document_id(metadata: Dict) -> str:
+        """Stable chunk id derived from the file path and chunk number"""
+        return f"{metadata.get('file_path', metadata['source'])}_{metadata['chunk_id']}"
+    
+    def add_documents(self, documents: List[Dict], embeddings: np.ndarray = None) -> List[str]:
+        """Add (or replace) documents in vector database and return their ids.
+
+        Embeddings are generated unless precomputed ones are passed, and the
+        collection is written in batches of Config.UPSERT_BATCH_SIZE.
+        """
         if not documents:
             logger.warning("No documents to add")
+            return []
+        
+        ids = []
+        batch_size = Config.UPSERT_BATCH_SIZE
+        
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            texts = [doc["text"] for doc in batch]
+            metadatas = [doc["metadata"] for doc in batch]
+            batch_ids = [self.document_id(md) for md in metadatas]
+            
+            if embeddings is None:
+                batch_embeddings = self.generate_embeddings(texts)
+            else:
+                batch_embeddings = embeddings[start:start + batch_size]
+            
+            # Upsert so re-ingesting a modified file overwrites its chunks in place
+            self.backend.upsert(batch_ids, batch_embeddings, texts, metadatas)
+            if self.lexical_index is not None:
+                self.lexical_index.add(batch_ids, texts)
+            ids.extend(batch_ids)
+        
+        self.version += 1
+        logger.info(f"Added {len(documents)} documents to vector database")
+        return ids
+    
+    def delete_documents(self, ids: List[str]):
+        """Delete documents by id"""
+        if not ids:
             return
         
-        texts = [doc["text"] for doc in documents]
-        metadatas = [doc["metadata"] for doc in documents]
-        ids = [f"{md['source']}_{md['chunk_id']}" for md in metadatas]
+        self.backend.delete(ids)
+        if self.lexical_index is not None:
+            self.lexical_index.delete(ids)
+        self.version += 1
+        logger.info(f"Deleted {len(ids)} documents from vector database")
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a search query, reusing recent query embeddings"""
+        key = " ".join(query.split())
+        embedding = self.query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.generate_embeddings([key], use_cache=False)[0]
+            self.query_embedding_cache.put(key, embedding)
+        return embedding
+    
+    def search_similar(self, query: str, top_k: int = 5, query_embedding: np.ndarray = None,
+                       mode: str = None, where: Dict = None) -> List[Dict]:
+        """Search for similar documents.
+
+        mode (default Config.SEARCH_MODE) is "vector" for dense retrieval,
+        "lexical" for BM25 only (no embedding needed), or "hybrid" to fuse
+        both rankings with reciprocal rank fusion. where restricts results to
+        chunks whose metadata matches, e.g. {"site": "Pune"}.
+        """
+        mode = mode or Config.SEARCH_MODE
+        if mode != "vector" and self.lexical_index is None:
+            logger.warning(f"Search mode '{mode}' needs the lexical index; falling back to vector search")
+            mode = "vector"
         
-        # Generate embeddings
-        logger.info("Generating embeddings...")
-        embeddings = self.generate_embeddings(texts)
+        if mode == "lexical":
+            return self._search_lexical(query, top_k, where)
+        if mode == "hybrid":
+            return self._search_hybrid(query, top_k, query_embedding, where)
+        return self._search_vector(query, top_k, query_embedding, where)
+    
+    def search_partitions(self, query: str, partitions: List[str] = None, top_k: int = 5,
+                          query_embedding: np.ndarray = None, mode: str = None) -> List[Dict]:
+        """Search only the given partitions (sites); no partitions means the whole knowledge base.
+
+        Several partitions are searched together in one filtered search
+        ({"site": {"$in": partitions}}), so the vectors are scanned once and
+        results are ranked on one scale.
+        """
+        if not partitions:
+            return self.search_similar(query, top_k, query_embedding, mode)
         
-        # Add to collection
-        self.collection.add(
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=metadatas,
-            ids=ids
-        )
+        partitions = list(dict.fromkeys(partitions))
+        value = partitions[0] if len(partitions) == 1 else {"$in": partitions}
+        return self.search_similar(query, top_k, query_embedding, mode, {Config.PARTITION_KEY: value})
+    
+    def _search_vector(self, query: str, top_k: int, query_embedding: np.ndarray = None,
+                       where: Dict = None) -> List[Dict]:
+        """Dense retrieval from the vector backend"""
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        return self._vector_query(np.atleast_2d(query_embedding), top_k, where)[0]
+    
+    def _vector_query(self, query_embeddings: np.ndarray, top_k: int, where: Dict = None) -> List[List[Dict]]:
+        """One backend search for any number of query embeddings"""
+        return self.backend.search(query_embeddings, top_k, where)
+    
+    def search_similar_batch(self, queries: List[str], top_k: int = 5, mode: str = None) -> List[List[Dict]]:
+        """Search for many queries at once; returns one result list per query.
+
+        All queries are embedded in a single encode call and sent to the
+        backend in a single search, instead of one round trip each.
+        """
+        if not queries:
+            return []
         
-        logger.info(f"Added {len(documents)} documents to vector database")
+        mode = mode or Config.SEARCH_MODE
+        if mode != "vector" and self.lexical_index is None:
+            mode = "vector"
+        if mode == "lexical":
+            return [self._search_lexical(query, top_k) for query in queries]
+        
+        keys = [" ".join(query.split()) for query in queries]
+        embeddings = self.generate_embeddings(keys, use_cache=False)
+        for key, embedding in zip(keys, embeddings):
+            self.query_embedding_cache.put(key, embedding)
+        
+        if mode == "hybrid":
+            candidates = top_k * Config.HYBRID_CANDIDATE_MULTIPLIER
+            vector_results = self._vector_query(embeddings, candidates)
+            return [
+                self._fuse(query, results, top_k, embedding)
+                for query, results, embedding in zip(queries, vector_results, embeddings)
+            ]
+        return self._vector_query(embeddings, top_k)
     
-    def search_similar(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Search for similar documents"""
-        query_embedding = self.generate_embeddings([query])[0]
+    def _search_lexical(self, query: str, top_k: int, where: Dict = None) -> List[Dict]:
+        """BM25 retrieval; similarity is the score relative to the best hit"""
+        # The BM25 index has no metadata: over-fetch, then keep the hits that match the filter
+        hits = self.lexical_index.search(query, top_k * Config.HYBRID_CANDIDATE_MULTIPLIER if where else top_k)
+        if not hits:
+            return []
         
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            include=["documents", "metadatas", "distances"]
-        )
+        docs = self._get_documents([doc_id for doc_id, _ in hits])
+        if where:
+            hits = [(doc_id, score) for doc_id, score in hits
+                    if doc_id in docs and self._matches(docs[doc_id], where)][:top_k]
+            if not hits:
+                return []
+        best_score = hits[0][1]
+        results = []
+        for doc_id, score in hits:
+            if doc_id in docs:
+                results.append({
+                    **docs[doc_id],
+                    "similarity": score / best_score,
+                    "score": score,
+                    "lexical_match": True
+                })
+        return results
+    
+    def _search_hybrid(self, query: str, top_k: int, query_embedding: np.ndarray = None,
+                       where: Dict = None) -> List[Dict]:
+        """Fuse vector and BM25 rankings with reciprocal rank fusion"""
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
         
-        return [
-            {
-                "text": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i],
-                "similarity": 1 - results["distances"][0][i]  # Convert distance to similarity
-            }
-            for i in range(len(results["documents"][0]))
-        ]
+        candidates = top_k * Config.HYBRID_CANDIDATE_MULTIPLIER
+        vector_results = self._search_vector(query, candidates, query_embedding, where)
+        return self._fuse(query, vector_results, top_k, query_embedding, where)
+    
+    def _fuse(self, query: str, vector_results: List[Dict], top_k: int, query_embedding: np.ndarray,
+              where: Dict = None) -> List[Dict]:
+        """Combine vector results with the BM25 ranking for the same query"""
+        vector_hits = {doc["id"]: doc for doc in vector_results}
+        lexical_hits = self.lexical_index.search(query, top_k * Config.HYBRID_CANDIDATE_MULTIPLIER)
+        
+        fetched = {}
+        if where:
+            # Vector hits already match the filter; look the others up before they can be ranked
+            others = [doc_id for doc_id, _ in lexical_hits if doc_id not in vector_hits]
+            fetched = self._get_documents(others, query_embedding) if others else {}
+            lexical_hits = [(doc_id, score) for doc_id, score in lexical_hits
+                            if doc_id in vector_hits or (doc_id in fetched and self._matches(fetched[doc_id], where))]
+        lexical_ids = {doc_id for doc_id, _ in lexical_hits}
+        
+        fused = reciprocal_rank_fusion([list(vector_hits), [doc_id for doc_id, _ in lexical_hits]])[:top_k]
+        
+        # Exact-token matches the vector search missed still get a real cosine similarity
+        missing = [doc_id for doc_id, _ in fused if doc_id not in vector_hits and doc_id not in fetched]
+        if missing:
+            fetched.update(self._get_documents(missing, query_embedding))
+        
+        results = []
+        for doc_id, score in fused:
+            doc = vector_hits.get(doc_id) or fetched.get(doc_id)
+            if doc is None:
+                continue
+            results.append({**doc, "score": score, "lexical_match": doc_id in lexical_ids})
+        return results
+    
+    @staticmethod
+    def _matches(doc: Dict, where: Dict) -> bool:
+        metadata = doc.get("metadata") or {}
+        return all(
+            metadata.get(key) in value["$in"] if isinstance(value, dict) else metadata.get(key) == value
+            for key, value in where.items()
+        )
+    
+    def _get_documents(self, ids: List[str], query_embedding: np.ndarray = None) -> Dict[str, Dict]:
+        """Fetch stored chunks by id, with cosine similarity to query_embedding if given"""
+        docs = self.backend.get(ids, include_embeddings=query_embedding is not None)
+        if query_embedding is not None:
+            for doc in docs.values():
+                embedding = doc.pop("embedding")
+                norm = np.linalg.norm(embedding) * np.linalg.norm(query_embedding)
+                doc["similarity"] = float(embedding @ query_embedding / norm) if norm else 0.0
+        return docs
+    
+    def rebuild_lexical_index(self, page_size: int = 1000):
+        """Index every chunk already in the collection (one-off after enabling hybrid search)"""
+        logger.info("Building lexical index from existing collection...")
+        self.lexical_index.clear()
+        indexed = 0
+        for ids, texts in self.backend.iter_documents(page_size):
+            self.lexical_index.add(ids, texts)
+            indexed += len(ids)
+        logger.info(f"Lexical index built for {indexed} documents")
+    
+    def get_cache_stats(self) -> Dict:
+        """Embedding cache statistics (empty when the cache is disabled)"""
+        return self.embedding_cache.stats() if self.embedding_cache else {}
     
     def get_collection_stats(self) -> Dict:
         """Get collection statistics"""
-        return self.collection.count()
+        return self.backend.count()
     
-    def clear_collection(self):
-        """Clear all documents from collection"""
-        self.collection.delete(where={})
+    def clear_collection(self, drop_delay: float = None, drop_previous: bool = True):
+        """Clear all documents by swapping in a new, empty collection and dropping the old one whole.
+
+        Nothing is deleted row by row, and no store is emptied under another
+        process: other processes follow the pointer like after a reindex.
+        drop_delay and drop_previous work as in swap.
+        """
+        empty = VectorDatabase(new_collection_name())
+        if empty.embedding_cache is not None:
+            empty.embedding_cache.close()  # only its backend and lexical index are used
+        self.swap(empty, drop_delay, drop_previous, cleared=True)
         logger.info("Vector database cleared")
\ No newline at end of file